@@ -1,24 +1,24 @@
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, StreamingResponse
 try:
     from fastapi.templating import Jinja2Templates
     templates = Jinja2Templates(directory="templates")
 except Exception:
     templates = None
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 import pymysql
-import sqlalchemy as sa
-from sqlalchemy.orm import sessionmaker
+import storage
 from config_manager import load_config, get_system_settings_by_prefix, get_db_connection, get_database_config, get_all_system_settings, get_system_setting, set_system_setting
-from db_manager import init_site_task_tables, add_site, add_task, list_sites, list_tasks, get_site, ensure_torrents_crawled_at, ensure_torrents_is_upload, get_setting, set_setting, update_task, delete_task, update_site, delete_site, update_torrent, delete_torrent
+from db_manager import bootstrap_schema, add_site, add_task, list_sites, list_tasks, list_runs, get_run, get_site, get_task, get_setting, set_setting, update_task, delete_task, update_site, delete_site, update_torrent, delete_torrent, get_torrent_data, list_torrent_files, torrent_file_stats, search_torrent_files
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
     from apscheduler.triggers.cron import CronTrigger
     from apscheduler.triggers.interval import IntervalTrigger
+    # 调度器在 startup 事件中启动，导入 app 模块时不创建后台线程
     scheduler = BackgroundScheduler()
-    scheduler.start()
 except Exception:
     BackgroundScheduler = None
     CronTrigger = None
@@ -29,19 +29,30 @@ import os
 import shutil
 import logging
 import sys
-from crawler import run_crawler
+from tracing import setup_logging
+from progress import PROGRESS_HUB, format_sse
+from run_manager import RunManager
+from db_pool import ConnectionPool, DatabaseUnavailable
+from response_cache import RESPONSE_CACHE
+from ui_assets import FingerprintedStaticFiles, UIPage
 
 app = FastAPI()
 
-app.mount("/static", StaticFiles(directory="static", check_dir=False), name="static")
+# /static 下的资源以内容指纹文件名引用并长期缓存；页面只在文件变化时读取并预压缩
+STATIC_FILES = FingerprintedStaticFiles(directory="static", check_dir=False)
+app.mount("/static", STATIC_FILES, name="static")
+UI_PAGE = UIPage("templates/index.html", STATIC_FILES)
+
+# JSON 等较大的响应按 Accept-Encoding 压缩；已压缩的页面与 SSE 不受影响
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     try:
-        with open("templates/index.html", "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
+        response = UI_PAGE.response(request)
     except Exception:
-        return HTMLResponse(content="<html><body>index.html missing</body></html>")
+        response = None
+    return response or HTMLResponse(content="<html><body>index.html missing</body></html>")
 
 # CORS 配置
 app.add_middleware(
@@ -68,13 +79,11 @@ try:
     DB_CONFIG = get_database_config()
     
     LOG_LEVEL = str(CONFIG.get('log_level', 'INFO')).upper()
-    logging.basicConfig(
-        level=getattr(logging, LOG_LEVEL, logging.INFO),
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
-    logger = logging.getLogger("pt-crawler")
-    logger.info(f"使用配置文件中的数据库配置: {DB_CONFIG['host']}:{DB_CONFIG['port']}")
+    logger = setup_logging(LOG_LEVEL, CONFIG.get('log_file'))
+    if storage.backend_of(DB_CONFIG) == 'sqlite':
+        logger.info(f"使用 SQLite 数据库: {DB_CONFIG['path']}")
+    else:
+        logger.info(f"使用配置文件中的数据库配置: {DB_CONFIG['host']}:{DB_CONFIG['port']}")
 except Exception as e:
     logger = logging.getLogger("pt-crawler")
     logger.error(f"加载数据库配置失败: {e}")
@@ -90,12 +99,109 @@ except Exception as e:
 engine = None
 Session = None
 
+def get_engine():
+    """按需创建 SQLAlchemy 引擎，sqlalchemy 延迟到首次使用时导入"""
+    global engine, Session
+    if engine is None:
+        import sqlalchemy as sa
+        from sqlalchemy.orm import sessionmaker
+        engine = sa.create_engine(
+            f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+        )
+        Session = sessionmaker(bind=engine)
+    return engine
+
+_run_manager = None
+
+def get_run_manager() -> RunManager:
+    """手动与定时运行共用的运行池，并发数取系统设置 max_concurrent_runs（默认 2）"""
+    global _run_manager
+    if _run_manager is None:
+        try:
+            workers = int(get_system_setting('max_concurrent_runs', 2) or 2)
+        except Exception:
+            workers = 2
+        _run_manager = RunManager(workers)
+    return _run_manager
+
+_db_pool = None
+
+def get_db_pool() -> ConnectionPool:
+    """端点共用的连接池与线程池，大小取 config.yaml 的 db_pool_size（默认 8）"""
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = ConnectionPool(DB_CONFIG, int(CONFIG.get('db_pool_size', 8) or 8))
+    return _db_pool
+
+async def run_db(fn, *args, **kwargs):
+    """在线程池中以池连接执行 fn(conn, *args, **kwargs)，不阻塞事件循环"""
+    return await get_db_pool().run(fn, *args, **kwargs)
+
+async def run_blocking(fn, *args, **kwargs):
+    """在线程池中执行自行建连的阻塞函数（如 get_system_setting）"""
+    return await get_db_pool().run_blocking(fn, *args, **kwargs)
+
+# 列表类接口的响应缓存：写接口按标签失效；种子列表还会被抓取入库失效，TTL 更短
+RESPONSE_CACHE.default_ttl = float(CONFIG.get('response_cache_ttl', 30))
+TORRENTS_CACHE_TTL = float(CONFIG.get('torrents_cache_ttl', 5))
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    return header.strip() == '*' or etag in [t.strip().removeprefix('W/') for t in header.split(',')]
+
+async def cached_json(request: Request, key: str, tags: tuple, load, ttl: float | None = None) -> Response:
+    """
+    读穿缓存：load 为无参协程函数（如 lambda: run_db(list_sites)）；
+    响应带 ETag，浏览器以 If-None-Match 重新验证时内容未变则返回 304
+    """
+    async def loader():
+        return jsonable_encoder(await load())
+
+    entry = await RESPONSE_CACHE.get_or_load(key, loader, tags, ttl)
+    headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+    if _etag_matches(request, entry.etag):
+        RESPONSE_CACHE.not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type='application/json', headers=headers)
+
+def _load_task_and_site(conn, task_id: int):
+    task = get_task(conn, task_id)
+    site = get_site(conn, task['site_id']) if task else None
+    return task, site
+
+def _run_scheduled_crawl(task_id: int):
+    """
+    调度任务入口：触发时才从数据库读取任务行与站点行（以及 crawl 内读取的系统设置），
+    修改任务、站点或系统设置后无需重新注册；提交到运行池后立即返回
+    """
+    try:
+        conn = storage.connect(DB_CONFIG)
+        try:
+            task, site = _load_task_and_site(conn, task_id)
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error(f"读取定时任务 {task_id} 失败: {e}")
+        return
+    if not task or not site:
+        logger.warning(f"定时任务 {task_id} 或其站点已不存在，跳过")
+        return
+    try:
+        get_run_manager().submit(
+            task_id, lambda control: run_single_task(task_id, task, site, None, control),
+            task.get('max_runtime'), task.get('max_items'),
+        )
+    except RuntimeError as e:
+        logger.info(f"跳过本次调度: {e}")
+
 # 服务启动后自动恢复定时任务（只注册非手动任务）
 def _register_existing_scheduled_tasks():
     if not scheduler or not (CronTrigger and IntervalTrigger):
         return
     try:
-        conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
+        conn = storage.connect(DB_CONFIG)
         tasks = list_tasks(conn)  # [{'id', 'site_id', 'name', 'schedule_type', 'schedule_value', 'status', 'last_run'}]
         for t in tasks:
             stype = (t.get('schedule_type') or '').lower()
@@ -113,20 +219,12 @@ def _register_existing_scheduled_tasks():
                     trigger = IntervalTrigger(seconds=int(svalue or '0') or 0)
                     if trigger.interval.total_seconds() <= 0:
                         continue
-                # 合并站点基础配置
-                site_row = get_site(conn, t['site_id'])
-                base = dict(CONFIG)
-                if site_row:
-                    for k in ['base_url','list_path','cookie','user_agent']:
-                        if site_row.get(k):
-                            base[k] = site_row[k]
-                base['start_page'] = int((t.get('start_page') or 1))
                 # 避免重复注册：如已存在同 id 任务，替换之
                 try:
                     scheduler.remove_job(str(t['id']))
                 except Exception:
                     pass
-                scheduler.add_job(lambda: asyncio.run(run_crawler(base)), trigger, id=str(t['id']))
+                scheduler.add_job(_run_scheduled_crawl, trigger, args=[t['id']], id=str(t['id']))
             except Exception:
                 # 单条任务注册失败时跳过，不影响其他任务
                 continue
@@ -136,31 +234,34 @@ def _register_existing_scheduled_tasks():
 
 @app.on_event("startup")
 async def _on_startup():
-    global engine, Session
     try:
-        engine = sa.create_engine(
-            f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        )
-        Session = sessionmaker(bind=engine)
-        from db_manager import ensure_torrents_table
-        ensure_torrents_table(DB_CONFIG)
-        init_site_task_tables(DB_CONFIG)
-        ensure_torrents_crawled_at(DB_CONFIG)
-        ensure_torrents_is_upload(DB_CONFIG)
-        from db_manager import ensure_torrents_mediainfo
-        ensure_torrents_mediainfo(DB_CONFIG)
-    except Exception:
-        pass
+        summary = bootstrap_schema(DB_CONFIG)
+        if summary['created'] or summary['altered']:
+            logger.info(f"数据库结构已更新: {summary}")
+    except Exception as e:
+        logger.error(f"数据库结构初始化失败: {e}")
+    if scheduler and not scheduler.running:
+        scheduler.start()
     try:
         _register_existing_scheduled_tasks()
     except Exception:
         pass
 
-def get_conn():
-    try:
-        return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, connect_timeout=5)
-    except Exception:
-        raise HTTPException(status_code=503, detail="数据库连接失败")
+@app.on_event("shutdown")
+async def _on_shutdown():
+    global _db_pool
+    if scheduler and scheduler.running:
+        scheduler.shutdown(wait=False)
+    if _run_manager is not None:
+        # 取消正在执行的运行并等待检查点落库
+        await asyncio.to_thread(_run_manager.shutdown)
+    if _db_pool is not None:
+        pool, _db_pool = _db_pool, None
+        await asyncio.to_thread(pool.close)
+
+@app.exception_handler(DatabaseUnavailable)
+async def _database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    return JSONResponse(status_code=503, content={"detail": "数据库连接失败"})
 
 # 调度器
 
@@ -170,6 +271,10 @@ class Site(BaseModel):
     list_path: str | None = None
     cookie: str | None = None
     user_agent: str | None = None
+    active: bool | None = None
+    extract_profile: str | None = None
+    adapter: str | None = None
+    feed_url: str | None = None  # RSS 地址（可为相对路径，含 passkey），feed_ingest 使用
 
 class Task(BaseModel):
     name: str
@@ -177,24 +282,24 @@ class Task(BaseModel):
     schedule_type: str  # 'cron' or 'interval'
     schedule_value: str  # cron字符串或间隔秒
     start_page: int | None = 1
+    extract_profile: str | None = None
+    max_runtime: int | None = None  # 单次运行的时间预算（秒），0 表示不限制
+    max_items: int | None = None  # 单次运行最多新增的种子数，0 表示不限制
 
 # API 端点示例
 @app.post("/sites/")
 async def add_site_endpoint(site: Site):
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    site_id = add_site(conn, site.dict())
-    conn.close()
+    site_id = await run_db(add_site, site.dict())
+    RESPONSE_CACHE.invalidate('sites')
     return {"id": site_id}
 
 @app.post("/tasks/")
 async def add_task_endpoint(task: Task):
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
     payload = task.dict()
     if payload.get('start_page') is None:
         payload['start_page'] = 1
-    task_id = add_task(conn, payload)
-    site_row = get_site(conn, task.site_id)
-    conn.close()
+    task_id = await run_db(add_task, payload)
+    RESPONSE_CACHE.invalidate('tasks')
 
     # 添加到调度器（只有当调度器可用且非手动任务时才添加）
     if scheduler and CronTrigger and IntervalTrigger and task.schedule_type != 'manual':
@@ -203,14 +308,7 @@ async def add_task_endpoint(task: Task):
                 trigger = CronTrigger.from_crontab(task.schedule_value)
             else:
                 trigger = IntervalTrigger(seconds=int(task.schedule_value))
-
-            base = dict(CONFIG)
-            if site_row:
-                for k in ['base_url','list_path','cookie','user_agent']:
-                    if site_row.get(k):
-                        base[k] = site_row[k]
-            base['start_page'] = int(payload.get('start_page') or 1)
-            scheduler.add_job(lambda: asyncio.run(run_crawler(base)), trigger, id=str(task_id))
+            scheduler.add_job(_run_scheduled_crawl, trigger, args=[task_id], id=str(task_id))
         except Exception as e:
             logger = logging.getLogger("pt-crawler")
             logger.warning(f"添加任务到调度器失败: {e}")
@@ -221,67 +319,127 @@ async def add_task_endpoint(task: Task):
     return {"id": task_id}
 
 @app.get("/sites")
-async def list_sites_endpoint():
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    rows = list_sites(conn)
-    conn.close()
-    return rows
+async def list_sites_endpoint(request: Request):
+    return await cached_json(request, 'sites', ('sites',), lambda: run_db(list_sites))
 
 @app.get("/tasks")
-async def list_tasks_endpoint():
-    conn = get_conn()
-    rows = list_tasks(conn)
-    conn.close()
-    return rows
+async def list_tasks_endpoint(request: Request):
+    return await cached_json(request, 'tasks', ('tasks',), lambda: run_db(list_tasks))
+
+@app.get("/runs")
+async def list_runs_endpoint(task_id: int | None = None, limit: int = 50):
+    """抓取运行历史（含检查点进度）"""
+    try:
+        return await run_db(list_runs, task_id, limit)
+    except pymysql.err.ProgrammingError:
+        return []
+
+@app.get("/runs/{run_id}/profile")
+async def download_run_profile_endpoint(run_id: int, kind: str = 'folded'):
+    """下载运行的剖析产物：kind=folded 为折叠栈（火焰图），kind=top 为热点排行"""
+    from profiling import top_path
+    run = await run_db(get_run, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="运行记录未找到")
+    path = run.get('profile_path')
+    if not path:
+        raise HTTPException(status_code=404, detail="该运行没有剖析结果")
+    if kind == 'top':
+        path = top_path(path)
+    elif kind != 'folded':
+        raise HTTPException(status_code=400, detail="kind 只能为 folded 或 top")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="剖析文件不存在")
+    return FileResponse(path, media_type='text/plain; charset=utf-8', filename=os.path.basename(path))
+
+def _latest_torrents(conn, limit: int):
+    cur = conn.cursor()
+    cur.execute("SHOW COLUMNS FROM torrents LIKE 'crawledAt'")
+    has_crawled_at = cur.fetchone() is not None
+    select_cols = "id, info_hash, name, title, size, standard, crawl_site" + (", crawledAt" if has_crawled_at else "")
+    cur.execute(f"SELECT {select_cols} FROM torrents ORDER BY id DESC LIMIT %s", (limit,))
+    return cur.fetchall()
 
 @app.get("/torrents")
-async def list_torrents_endpoint(limit: int = 50):
+async def list_torrents_endpoint(request: Request, limit: int = 50):
     try:
-        conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-        cur = conn.cursor()
-        cur.execute("SHOW COLUMNS FROM torrents LIKE 'crawledAt'")
-        has_crawled_at = cur.fetchone() is not None
-        select_cols = "id, info_hash, name, title, size, standard, crawl_site" + (", crawledAt" if has_crawled_at else "")
-        cur.execute(f"SELECT {select_cols} FROM torrents ORDER BY id DESC LIMIT %s", (limit,))
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        return await cached_json(request, f'torrents:{limit}', ('torrents',),
+                                 lambda: run_db(_latest_torrents, limit), TORRENTS_CACHE_TTL)
     except pymysql.err.ProgrammingError:
         try:
-            from db_manager import ensure_torrents_table
-            ensure_torrents_table(DB_CONFIG)
+            await run_blocking(bootstrap_schema, DB_CONFIG, ['torrents'])
         except Exception:
             pass
         return []
 
+@app.get("/torrents/export")
+async def export_torrents_endpoint(format: str = 'ndjson', columns: str | None = None,
+                                   site: str | None = None, category: str | None = None,
+                                   since: str | None = None, until: str | None = None,
+                                   is_upload: bool | None = None,
+                                   min_id: int | None = None, max_id: int | None = None):
+    """流式导出种子库（ndjson / csv / parquet），服务端游标逐批读取，内存占用与行数无关"""
+    from exporter import FORMATS, export_stream
+    filters = {'crawl_site': site, 'category': category, 'since': since, 'until': until,
+               'is_upload': is_upload, 'min_id': min_id, 'max_id': max_id}
+    try:
+        stream = export_stream(DB_CONFIG, format, columns, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ext = {'ndjson': 'jsonl'}.get(format, format)
+    return StreamingResponse(
+        stream,
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="torrents.{ext}"'},
+    )
+
+@app.get("/torrents/files/search")
+async def search_torrent_files_endpoint(name: str | None = None, ext: str | None = None,
+                                        min_size: int | None = None, limit: int = 50):
+    """按文件名（末尾 * 为前缀匹配）、扩展名、最小大小查找种子内的文件"""
+    if not (name or ext or min_size):
+        raise HTTPException(status_code=400, detail="至少需要 name、ext、min_size 之一")
+    return await run_db(search_torrent_files, name, ext, min_size, min(max(1, limit), 1000))
+
+def _torrent_files_with_stats(conn, info_hash: str):
+    files = list_torrent_files(conn, info_hash)
+    if not files and not get_torrent_data(conn, info_hash):
+        return None
+    return {"files": files, "stats": torrent_file_stats(conn, info_hash)}
+
+@app.get("/torrents/{info_hash}/files")
+async def list_torrent_files_endpoint(info_hash: str):
+    """种子的文件列表与统计（文件数、最大文件、剧集数）"""
+    result = await run_db(_torrent_files_with_stats, info_hash)
+    if result is None:
+        raise HTTPException(status_code=404, detail="种子未找到")
+    return result
+
 @app.get("/settings/{key}")
 async def get_setting_endpoint(key: str):
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    value = get_setting(conn, key)
-    conn.close()
+    value = await run_db(get_setting, key)
     return {"key": key, "value": value}
 
 @app.post("/settings/{key}")
 async def set_setting_endpoint(key: str, payload: dict):
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    set_setting(conn, key, payload.get("value"), payload.get("description"))
-    conn.close()
+    await run_db(set_setting, key, payload.get("value"), payload.get("description"))
+    RESPONSE_CACHE.invalidate('settings')
     return {"key": key, "value": payload.get("value")}
 
-@app.get("/settings")
-async def get_all_settings_endpoint():
-    """获取所有系统设置"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
+def _list_settings(conn):
     cursor = conn.cursor()
     cursor.execute("SELECT key_name, value, description FROM settings ORDER BY key_name")
-    settings = cursor.fetchall()
-    conn.close()
-    return {item['key_name']: {'value': item['value'], 'description': item['description']} for item in settings}
+    return cursor.fetchall()
 
-@app.post("/settings")
-async def set_all_settings_endpoint(payload: dict):
-    """批量设置系统配置"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
+@app.get("/settings")
+async def get_all_settings_endpoint(request: Request):
+    """获取所有系统设置"""
+    async def load():
+        settings = await run_db(_list_settings)
+        return {item['key_name']: {'value': item['value'], 'description': item['description']} for item in settings}
+    return await cached_json(request, 'settings', ('settings',), load)
+
+def _set_settings(conn, payload: dict) -> dict:
     results = {}
     for key, data in payload.items():
         if isinstance(data, dict):
@@ -292,12 +450,16 @@ async def set_all_settings_endpoint(payload: dict):
             description = None
         set_setting(conn, key, value, description)
         results[key] = value
-    conn.close()
+    return results
+
+@app.post("/settings")
+async def set_all_settings_endpoint(payload: dict):
+    """批量设置系统配置"""
+    results = await run_db(_set_settings, payload)
+    RESPONSE_CACHE.invalidate('settings')
     return {"updated": results}
 
-@app.post("/test-db-connection")
-async def test_db_connection_endpoint(payload: dict):
-    """测试数据库连接"""
+def _test_db_connection(payload: dict) -> dict:
     try:
         # 从payload中获取数据库配置
         db_config = {
@@ -327,13 +489,17 @@ async def test_db_connection_endpoint(payload: dict):
     except Exception as e:
         return {"success": False, "message": f"连接错误: {str(e)}"}
 
+@app.post("/test-db-connection")
+async def test_db_connection_endpoint(payload: dict):
+    """测试数据库连接"""
+    return await run_blocking(_test_db_connection, payload)
+
 # 新增：任务操作API
 @app.post("/tasks/{task_id}")
 async def update_task_endpoint(task_id: int, task: Task):
     """更新任务"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    success = update_task(conn, task_id, task.dict())
-    conn.close()
+    success = await run_db(update_task, task_id, task.dict())
+    RESPONSE_CACHE.invalidate('tasks')
     if success:
         return {"message": "任务更新成功", "id": task_id}
     else:
@@ -342,65 +508,61 @@ async def update_task_endpoint(task_id: int, task: Task):
 @app.post("/tasks/{task_id}/delete")
 async def delete_task_endpoint(task_id: int):
     """删除任务"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    success = delete_task(conn, task_id)
-    conn.close()
+    success = await run_db(delete_task, task_id)
+    RESPONSE_CACHE.invalidate('tasks')
     if success:
         return {"message": "任务删除成功", "id": task_id}
     else:
         raise HTTPException(status_code=404, detail="任务未找到")
 
 @app.post("/tasks/{task_id}/execute")
-async def execute_task_endpoint(task_id: int):
-    """手动执行任务"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    
-    # 获取任务信息
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-    task = cursor.fetchone()
-    
+async def execute_task_endpoint(task_id: int, profile: str | None = None,
+                                max_runtime: int | None = None, max_items: int | None = None):
+    """
+    手动执行任务：提交到运行池后立即返回，进度见 /tasks/{task_id}/events。
+    profile=cpu|alloc 时对本次运行做性能剖析；max_runtime / max_items 覆盖任务上配置的运行预算
+    """
+    if profile is not None and profile not in ('cpu', 'alloc'):
+        raise HTTPException(status_code=400, detail="profile 只能为 cpu 或 alloc")
+    task, site = await run_db(_load_task_and_site, task_id)
     if not task:
-        conn.close()
         raise HTTPException(status_code=404, detail="任务未找到")
-    
-    # 获取对应的站点信息
-    cursor.execute("SELECT * FROM sites WHERE id = %s", (task['site_id'],))
-    site = cursor.fetchone()
-    
     if not site:
-        conn.close()
         raise HTTPException(status_code=404, detail="关联站点未找到")
     
-    conn.close()
-    
-    # 异步执行爬虫任务
+    # 在运行池线程中执行爬虫，不阻塞事件循环
+    max_runtime = max_runtime if max_runtime is not None else task.get('max_runtime')
+    max_items = max_items if max_items is not None else task.get('max_items')
     try:
-        # 创建后台任务执行爬虫
-        import asyncio
-        asyncio.create_task(run_single_task(task_id, task, site))
-        
-        return {
-            "message": "任务已开始执行", 
-            "id": task_id,
-            "task_name": task['name'],
-            "site_name": site['name']
-        }
+        handle = get_run_manager().submit(
+            task_id, lambda control: run_single_task(task_id, task, site, profile, control),
+            max_runtime, max_items,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"任务执行失败: {str(e)}")
 
-async def run_single_task(task_id: int, task: dict, site: dict):
-    """运行单个任务"""
+    return {
+        "message": "任务已开始执行", 
+        "id": task_id,
+        "handle_id": handle.id,
+        "task_name": task['name'],
+        "site_name": site['name'],
+        "profile": profile,
+        "max_runtime": handle.control.max_seconds,
+        "max_items": handle.control.max_items,
+    }
+
+def run_single_task(task_id: int, task: dict, site: dict, profile: str | None = None, control=None):
+    """运行单个任务（在运行池线程中执行）"""
     try:
         logger = logging.getLogger("pt-crawler")
         logger.info(f"开始执行任务 {task_id}: {task['name']} - 站点: {site['name']}")
         
-        # 这里调用实际的爬虫逻辑
-        # 可以复用现有的爬虫代码
         from crawler import run_crawler_for_site
         
-        # 执行爬虫（这里简化处理，实际应该调用完整的爬虫逻辑）
-        result = await run_crawler_for_site(site, task)
+        result = asyncio.run(run_crawler_for_site(site, task, profile, control))
         
         logger.info(f"任务 {task_id} 执行完成")
         return result
@@ -410,13 +572,59 @@ async def run_single_task(task_id: int, task: dict, site: dict):
         logger.error(f"任务 {task_id} 执行失败: {str(e)}")
         raise e
 
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """响应缓存的命中、未命中、304 与失效次数"""
+    return RESPONSE_CACHE.stats()
+
+@app.get("/runs/active")
+async def list_active_runs_endpoint():
+    """运行池中正在执行的运行"""
+    return get_run_manager().active()
+
+@app.post("/runs/{handle_id}/cancel")
+async def cancel_run_endpoint(handle_id: int):
+    """
+    取消运行（handle_id 为执行任务时返回的 handle_id）：排队中的直接取消，
+    执行中的在当前详情页处理完后停止，保存检查点，下次运行从断点继续
+    """
+    try:
+        handle = get_run_manager().cancel_run(handle_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if handle is None:
+        raise HTTPException(status_code=404, detail="运行不存在")
+    return handle.to_dict()
+
+@app.get("/tasks/{task_id}/events")
+async def task_events_endpoint(task_id: int, request: Request):
+    """任务运行进度（Server-Sent Events）：started / progress / finished 事件，每 15 秒发送一次心跳"""
+    sub = PROGRESS_HUB.subscribe(task_id)
+
+    async def stream():
+        try:
+            last = PROGRESS_HUB.last(task_id)
+            if last:
+                yield format_sse(last)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            PROGRESS_HUB.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # 新增：站点操作API
 @app.post("/sites/{site_id}")
 async def update_site_endpoint(site_id: int, site: Site):
     """更新站点"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    success = update_site(conn, site_id, site.dict())
-    conn.close()
+    success = await run_db(update_site, site_id, site.dict())
+    RESPONSE_CACHE.invalidate('sites')
     if success:
         return {"message": "站点更新成功", "id": site_id}
     else:
@@ -425,9 +633,8 @@ async def update_site_endpoint(site_id: int, site: Site):
 @app.post("/sites/{site_id}/delete")
 async def delete_site_endpoint(site_id: int):
     """删除站点"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    success = delete_site(conn, site_id)
-    conn.close()
+    success = await run_db(delete_site, site_id)
+    RESPONSE_CACHE.invalidate('sites')
     if success:
         return {"message": "站点删除成功", "id": site_id}
     else:
@@ -437,9 +644,8 @@ async def delete_site_endpoint(site_id: int):
 @app.post("/torrents/{torrent_id}")
 async def update_torrent_endpoint(torrent_id: int, payload: dict):
     """更新种子信息"""
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    success = update_torrent(conn, torrent_id, payload)
-    conn.close()
+    success = await run_db(update_torrent, torrent_id, payload)
+    RESPONSE_CACHE.invalidate('torrents')
     if success:
         return {"message": "种子更新成功", "id": torrent_id}
     else:
@@ -447,9 +653,8 @@ async def update_torrent_endpoint(torrent_id: int, payload: dict):
 
 @app.post("/torrents/{torrent_id}/delete")
 async def delete_torrent_endpoint(torrent_id: int):
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    success = delete_torrent(conn, torrent_id)
-    conn.close()
+    success = await run_db(delete_torrent, torrent_id)
+    RESPONSE_CACHE.invalidate('torrents')
     if success:
         return {"message": "种子删除成功", "id": torrent_id}
     else:
@@ -457,9 +662,8 @@ async def delete_torrent_endpoint(torrent_id: int):
 
 @app.delete("/torrents/{torrent_id}")
 async def delete_torrent_endpoint_delete(torrent_id: int):
-    conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-    success = delete_torrent(conn, torrent_id)
-    conn.close()
+    success = await run_db(delete_torrent, torrent_id)
+    RESPONSE_CACHE.invalidate('torrents')
     if success:
         return {"message": "种子删除成功", "id": torrent_id}
     else:
@@ -467,11 +671,12 @@ async def delete_torrent_endpoint_delete(torrent_id: int):
 
 # 系统设置管理API
 @app.get("/api/system-settings")
-async def get_system_settings():
+async def get_system_settings(request: Request):
     """获取所有系统设置"""
+    async def load():
+        return {"success": True, "data": await run_blocking(get_all_system_settings)}
     try:
-        settings = get_all_system_settings()
-        return {"success": True, "data": settings}
+        return await cached_json(request, 'system_settings', ('system_settings',), load)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取系统设置失败: {str(e)}")
 
@@ -479,7 +684,7 @@ async def get_system_settings():
 async def get_system_setting_endpoint(setting_key: str):
     """获取单个系统设置"""
     try:
-        value = get_system_setting(setting_key)
+        value = await run_blocking(get_system_setting, setting_key)
         if value is not None:
             return {"success": True, "key": setting_key, "value": value}
         else:
@@ -495,7 +700,8 @@ async def set_system_setting_endpoint(setting_key: str, payload: dict):
         setting_type = payload.get("type", "string")
         description = payload.get("description", "")
         
-        success = set_system_setting(setting_key, value, setting_type, description)
+        success = await run_blocking(set_system_setting, setting_key, value, setting_type, description)
+        RESPONSE_CACHE.invalidate('system_settings')
         if success:
             return {"success": True, "message": "设置保存成功"}
         else:
@@ -520,8 +726,9 @@ async def set_system_settings_batch(payload: dict):
                 setting_type = "string"
                 description = None
             
-            success = set_system_setting(key, value, setting_type, description)
+            success = await run_blocking(set_system_setting, key, value, setting_type, description)
             results[key] = "success" if success else "failed"
+        RESPONSE_CACHE.invalidate('system_settings')
         
         return {"success": True, "results": results}
     except Exception as e:
@@ -546,13 +753,13 @@ async def get_system_settings_by_category(category: str):
             crawler_keys = ["out_dir", "torrent_download_dir", "delay", "test_mode", "test_limit", "allow_v2"]
             settings = {}
             for key in crawler_keys:
-                value = get_system_setting(key)
+                value = await run_blocking(get_system_setting, key)
                 if value is not None:
                     settings[key] = value
         elif category == "sites":
-            settings = get_system_settings_by_prefix("sites")
+            settings = await run_blocking(get_system_settings_by_prefix, "sites")
         else:
-            settings = get_system_settings_by_prefix(category)
+            settings = await run_blocking(get_system_settings_by_prefix, category)
         
         return {"success": True, "category": category, "settings": settings}
     except Exception as e:
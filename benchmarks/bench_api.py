@@ -0,0 +1,216 @@
+"""API 并发基准：在同一服务上对比「端点内直接同步查库」（旧写法）与「连接池 + 线程池」（db_pool）的吞吐。
+
+在独立进程中启动 uvicorn，并发客户端按比例混合请求：
+- 慢请求：/torrents/files/search?min_size=1（torrent_files 上的全表扫描 + 排序）
+- 快请求：/sites
+旧写法的对照端点只在本基准中注册（/bench/inline/...），实现与改造前的端点相同：每个请求在事件循环中建连并查询。
+默认使用临时目录中的 SQLite 库，--mysql 改用 config.yaml 中的 MySQL（会写入模拟数据，建议配合 --db-name）。
+
+用法：
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --files 500000 --concurrency 64 --slow-ratio 0.05 --json
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def seed(db_config: dict, files: int, sites: int):
+    import storage
+    from db_manager import add_site, bootstrap_schema
+
+    bootstrap_schema(db_config)
+    conn = storage.connect(db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) AS n FROM torrent_files WHERE info_hash LIKE %s", ('bench%',))
+        have = cursor.fetchone()['n']
+        rng = random.Random(1)
+        batch = []
+        for i in range(have, files):
+            batch.append((f'bench{i // 20:08d}', i % 20, f'dir/file{i}.mkv', f'file{i}.mkv', 'mkv', rng.randint(1, 1 << 34)))
+            if len(batch) >= 5000:
+                cursor.executemany(
+                    "INSERT IGNORE INTO torrent_files (info_hash, file_index, path, file_name, extension, length) "
+                    "VALUES (%s, %s, %s, %s, %s, %s)", batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                "INSERT IGNORE INTO torrent_files (info_hash, file_index, path, file_name, extension, length) "
+                "VALUES (%s, %s, %s, %s, %s, %s)", batch)
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) AS n FROM sites")
+        for i in range(cursor.fetchone()['n'], sites):
+            add_site(conn, {'name': f'bench-{i}', 'base_url': f'https://bench-{i}.example'})
+    finally:
+        conn.close()
+
+
+def add_inline_routes(app_module):
+    """改造前的写法：async 端点内直接同步建连查询，阻塞事件循环"""
+    import storage
+    from db_manager import list_sites, search_torrent_files
+
+    app = app_module.app
+
+    @app.get("/bench/inline/sites")
+    async def inline_sites():
+        conn = storage.connect(app_module.DB_CONFIG)
+        rows = list_sites(conn)
+        conn.close()
+        return rows
+
+    @app.get("/bench/inline/torrents/files/search")
+    async def inline_search(min_size: int | None = None, limit: int = 50):
+        conn = storage.connect(app_module.DB_CONFIG)
+        try:
+            return search_torrent_files(conn, None, None, min_size, limit)
+        finally:
+            conn.close()
+
+
+def serve(db_config: dict, port: int, pool_size: int):
+    import uvicorn
+    import app as app_module
+    from tracing import setup_logging
+
+    # 服务启动前替换数据库配置，连接池在首个请求时按此创建
+    app_module.DB_CONFIG = db_config
+    app_module.CONFIG['db_pool_size'] = pool_size
+    setup_logging('WARNING')
+    add_inline_routes(app_module)
+    uvicorn.run(app_module.app, host='127.0.0.1', port=port, log_level='warning')
+
+
+def wait_for_port(port: int, process, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError('服务进程已退出')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError('等待服务启动超时')
+
+
+def load(port: int, prefix: str, concurrency: int, duration: float, slow_ratio: float) -> dict:
+    latencies = {'slow': [], 'fast': []}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(idx: int):
+        rng = random.Random(idx)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local = {'slow': [], 'fast': []}
+        failed = 0
+        while time.perf_counter() < deadline:
+            kind = 'slow' if rng.random() < slow_ratio else 'fast'
+            path = f'{prefix}/torrents/files/search?min_size=1' if kind == 'slow' else f'{prefix}/sites'
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                continue
+            local[kind].append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            for k in local:
+                latencies[k].extend(local[k])
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    total = len(latencies['slow']) + len(latencies['fast'])
+    result = {'requests': total, 'errors': errors[0], 'rps': round(total / elapsed, 1)}
+    for kind, samples in latencies.items():
+        if samples:
+            q = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+            result[kind] = {'count': len(samples), 'p50_ms': round(q[49] * 1000, 1), 'p99_ms': round(q[98] * 1000, 1)}
+    return result
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='API 并发基准：同步查库 vs 连接池 + 线程池')
+    p.add_argument('--files', type=int, default=200000, help='torrent_files 中的模拟行数（慢查询的扫描量）')
+    p.add_argument('--sites', type=int, default=20)
+    p.add_argument('--concurrency', type=int, default=32)
+    p.add_argument('--duration', type=float, default=5.0, help='每种模式的压测秒数')
+    p.add_argument('--slow-ratio', type=float, default=0.1, help='慢请求占比')
+    p.add_argument('--pool-size', type=int, default=8)
+    p.add_argument('--mysql', action='store_true', help='使用 config.yaml 中的 MySQL 而不是临时 SQLite')
+    p.add_argument('--db-name', help='配合 --mysql 使用的数据库名')
+    p.add_argument('--json', action='store_true')
+    args = p.parse_args(argv)
+
+    from config_manager import get_database_config
+
+    if args.mysql:
+        db_config = get_database_config()
+        if args.db_name:
+            db_config['database'] = args.db_name
+    else:
+        db_config = {'backend': 'sqlite', 'path': os.path.join(tempfile.mkdtemp(prefix='bench-api-'), 'bench.sqlite3')}
+    seed(db_config, args.files, args.sites)
+
+    # 服务端在独立进程中运行，避免压测客户端线程与服务端争用 GIL
+    port = free_port()
+    server = multiprocessing.Process(target=serve, args=(db_config, port, args.pool_size), daemon=True)
+    server.start()
+    try:
+        wait_for_port(port, server)
+        results = {}
+        for mode, prefix in (('inline', '/bench/inline'), ('pooled', '')):
+            results[mode] = load(port, prefix, args.concurrency, args.duration, args.slow_ratio)
+    finally:
+        server.terminate()
+        server.join(timeout=10)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    print(f"并发 {args.concurrency}，慢请求占比 {args.slow_ratio:.0%}，torrent_files {args.files} 行，每种模式 {args.duration:g}s")
+    print(f"{'模式':<10}{'请求/秒':>10}{'快 p50':>10}{'快 p99':>10}{'慢 p50':>10}{'慢 p99':>10}{'错误':>8}")
+    for mode, r in results.items():
+        fast, slow = r.get('fast', {}), r.get('slow', {})
+        print(f"{mode:<10}{r['rps']:>10}{fast.get('p50_ms', 0):>10}{fast.get('p99_ms', 0):>10}"
+              f"{slow.get('p50_ms', 0):>10}{slow.get('p99_ms', 0):>10}{r['errors']:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
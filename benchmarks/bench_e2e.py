@@ -0,0 +1,124 @@
+"""端到端吞吐基准：对本地模拟站点（mock_tracker.py）运行完整的 crawl()，报告种子/秒、各阶段 p50/p99 与峰值 RSS。
+
+需要可写的 MySQL（默认 config.yaml 中的数据库，可用 --db-name 指向专用的测试库），
+或用 --sqlite 写入临时目录中的 SQLite 数据库，无需数据库服务。
+模拟站点的每个种子 info_hash 都带有本次运行的随机 nonce，重复运行不会被去重跳过。
+
+用法：
+    python benchmarks/bench_e2e.py --pages 10 --per-page 50
+    python benchmarks/bench_e2e.py --pages 20 --latency-ms 50 --error-rate 0.02 --throttle-rate 0.01 --json
+    python benchmarks/bench_e2e.py --sqlite --pages 10
+    python benchmarks/bench_e2e.py --sqlite --pages 40 --latency-ms 50 --backfill-workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_tracker import add_arguments, from_args  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run(args) -> dict:
+    from crawler import build_site_opts, crawl
+
+    tracker = from_args(args).start()
+    work_dir = tempfile.mkdtemp(prefix='bench-e2e-')
+    try:
+        site = {'id': None, 'name': 'mock', 'base_url': tracker.base_url, 'list_path': '/torrents.php',
+                'cookie': '', 'user_agent': 'bench-e2e'}
+        config = {
+            'out_dir': os.path.join(work_dir, 'output'),
+            'torrent_download_dir': os.path.join(work_dir, 'torrents'),
+            'delay': args.delay,
+            'use_seen_set': not args.no_seen_set,
+            'archive_pages': args.archive_pages,
+            'extract_profile': args.extract_profile,
+            'retry_base_delay': 0.2,
+        }
+        opts = build_site_opts(site, None, config)
+        if args.db_name:
+            opts.db_name = args.db_name
+        if args.sqlite:
+            opts.db_backend = 'sqlite'
+            opts.db_path = os.path.join(work_dir, 'bench.sqlite3')
+        # 基准只关心吞吐：不写检查点，不因连续已存在而提前停止
+        opts.run_key = None
+        opts.stop_on_seen = False
+        opts.stats = {}
+        started = time.perf_counter()
+        if args.backfill_workers:
+            # 回填模式：由分页条确定最后一页，按段并发抓取
+            from orchestrator import SiteBackfill
+            backfill = SiteBackfill(opts, workers=args.backfill_workers, max_inflight=args.backfill_workers * 2,
+                                    site_max_rps=args.site_max_rps)
+            opts.stats = asyncio.run(backfill.run())
+            created = opts.stats['created']
+        else:
+            created = asyncio.run(crawl(opts))
+        elapsed = time.perf_counter() - started
+    finally:
+        tracker.stop()
+    stats = opts.stats
+    return {
+        'torrents': created,
+        'skipped': stats.get('skipped', 0),
+        'errors': stats.get('errors', 0),
+        'pages': stats.get('pages', 0),
+        'retries': stats.get('retries', 0),
+        'elapsed_s': round(elapsed, 3),
+        'torrents_per_s': round(created / elapsed, 2) if elapsed > 0 else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'server': dict(tracker.counters),
+        'stages': {
+            stage: {'count': s['count'], 'p50_ms': s['p50_ms'], 'p99_ms': s['p99_ms'], 'max_ms': s['max_ms']}
+            for stage, s in stats.get('stages', {}).items()
+        },
+        'work_dir': work_dir,
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='对本地模拟站点运行 crawl() 的端到端基准')
+    add_arguments(p)
+    p.add_argument('--delay', type=float, default=0.0, help='种子之间的等待秒数（crawl 的 delay）')
+    p.add_argument('--extract-profile', default='full', help='字段提取配置：full / core / minimal 或字段列表')
+    p.add_argument('--archive-pages', action='store_true', help='同时测量原始页面归档的开销')
+    p.add_argument('--no-seen-set', action='store_true', help='关闭内存去重集合，逐条查库')
+    p.add_argument('--db-name', help='写入的数据库名，默认 config.yaml 中的 db_name')
+    p.add_argument('--sqlite', action='store_true', help='写入临时目录中的 SQLite 数据库（不需要 MySQL）')
+    p.add_argument('--backfill-workers', type=int, default=0, help='大于 0 时以回填模式并发抓取（orchestrator.SiteBackfill）')
+    p.add_argument('--site-max-rps', type=float, default=0.0, help='回填模式的站点限速，0 为不限')
+    p.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = p.parse_args(argv)
+    from tracing import setup_logging
+    setup_logging('WARNING')
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    print(f"种子: {result['torrents']} 新增 / {result['skipped']} 跳过 / {result['errors']} 错误, "
+          f"{result['pages']} 页, 重试 {result['retries']} 次")
+    print(f"用时 {result['elapsed_s']}s, {result['torrents_per_s']} 种子/秒, 峰值 RSS {result['peak_rss_mb']} MB")
+    print(f"模拟站点请求: {result['server']}")
+    print(f"{'阶段':<14}{'次数':>8}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for stage, s in result['stages'].items():
+        print(f"{stage:<14}{s['count']:>8}{s['p50_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""启动耗时基准：测量 app 模块冷导入时间，以及数据库结构检查（新旧两种路径）的耗时。
+
+用法：
+    python benchmarks/startup_bench.py                # 仅测量冷导入
+    python benchmarks/startup_bench.py --with-db      # 同时对 config.yaml 中的数据库测量结构检查耗时
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def measure_import(module: str, repeat: int) -> list[float]:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def legacy_bootstrap(db_config: dict):
+    """复现旧的启动流程：每个 ensure_* 单独建连 + SHOW COLUMNS，并每次 MODIFY crawledAt"""
+    import pymysql
+    from db_manager import TABLE_DEFINITIONS
+    steps = [
+        [TABLE_DEFINITIONS['torrents']],
+        [TABLE_DEFINITIONS['sites'], "SHOW COLUMNS FROM sites LIKE 'name'", TABLE_DEFINITIONS['tasks'],
+         "SHOW COLUMNS FROM tasks LIKE 'start_page'", TABLE_DEFINITIONS['settings']],
+        ["SHOW COLUMNS FROM torrents LIKE 'crawledAt'", "ALTER TABLE torrents MODIFY crawledAt DATETIME DEFAULT CURRENT_TIMESTAMP"],
+        ["SHOW COLUMNS FROM torrents LIKE 'is_upload'"],
+        ["SHOW COLUMNS FROM torrents LIKE 'mediainfo'"],
+    ]
+    for statements in steps:
+        conn = pymysql.connect(**db_config)
+        cursor = conn.cursor()
+        for sql in statements:
+            cursor.execute(sql)
+            cursor.fetchall()
+        conn.commit()
+        conn.close()
+
+
+def measure_db(repeat: int) -> dict:
+    from config_manager import get_database_config
+    from db_manager import bootstrap_schema
+    db_config = get_database_config()
+    results = {}
+    for name, fn in (('bootstrap_schema', bootstrap_schema), ('legacy ensure_*', legacy_bootstrap)):
+        samples = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            fn(db_config)
+            samples.append(time.perf_counter() - t)
+        results[name] = samples
+    return results
+
+
+def report(name: str, samples: list[float]):
+    print(f"{name:<24} median={statistics.median(samples) * 1000:8.1f}ms  "
+          f"min={min(samples) * 1000:8.1f}ms  max={max(samples) * 1000:8.1f}ms  n={len(samples)}")
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='启动耗时基准')
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--with-db', action='store_true', help='同时测量数据库结构检查耗时')
+    args = p.parse_args(argv)
+
+    for module in ('app', 'crawler'):
+        report(f'import {module}', measure_import(module, args.repeat))
+    if args.with_db:
+        for name, samples in measure_db(args.repeat).items():
+            report(name, samples)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
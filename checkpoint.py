@@ -0,0 +1,195 @@
+"""抓取运行检查点：按 run_key 将当前页、待处理链接与在途链接持久化到 crawl_runs 表。
+
+进程中途退出后，下一次相同 run_key 的运行会从上次停下的位置继续：
+先处理在途链接，再处理当前页剩余链接，然后继续后续页码。
+状态仍为 running 的记录只有在检查点超过 stale_after 秒未更新时才被接管（视为原进程已退出），
+否则说明同一 run_key 正在其他进程中运行，open() 抛出 CheckpointBusy。
+"""
+import json
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+
+from tracing import get_logger
+
+logger = get_logger('checkpoint')
+
+# cancelled：被取消或超出运行预算，下次运行同样从断点继续；running 只在检查点过期时恢复
+RESUMABLE_STATUSES = ('running', 'interrupted', 'cancelled')
+
+# running 记录的检查点超过该时长未更新时视为进程已退出
+DEFAULT_STALE_AFTER = 900.0
+
+
+class CheckpointBusy(RuntimeError):
+    """同一 run_key 的运行正在其他进程中进行"""
+
+
+class CrawlCheckpoint:
+    """
+    单次抓取运行的检查点。
+
+    - frontier 为 None 表示当前页尚未抓取列表；为列表时表示当前页剩余未开始处理的详情页链接
+    - inflight 为已开始处理但尚未完成的链接，恢复时优先重新处理
+    - 每处理 every 个链接或每隔 interval 秒落库一次
+    - guard 为可选的 guard(db_conn) -> bool，在每次写入的同一事务中先调用；返回 False 时检查点已不属于
+      本次运行（如 worker 租约被回收），此后不再写入，避免覆盖新持有者的进度
+    """
+
+    def __init__(self, db_conn: pymysql.connections.Connection, run_id: int, current_page: int,
+                 frontier: list[str] | None = None, inflight: list[str] | None = None,
+                 created: int = 0, skipped: int = 0, resumed: bool = False,
+                 interval: float = 10.0, every: int = 20, guard=None):
+        self.db_conn = db_conn
+        self.run_id = run_id
+        self.current_page = current_page
+        self.frontier = frontier
+        self.inflight = list(inflight or [])
+        self.created = created
+        self.skipped = skipped
+        self.resumed = resumed
+        self.interval = interval
+        self.every = max(1, int(every))
+        self._dirty = 0
+        self._saved_at = time.monotonic()
+        self.guard = guard
+        self.detached = False
+
+    @classmethod
+    def open(cls, db_conn: pymysql.connections.Connection, run_key: str, start_page: int,
+             task_id: int | None = None, site_id: int | None = None,
+             interval: float = 10.0, every: int = 20, stale_after: float = DEFAULT_STALE_AFTER,
+             guard=None) -> 'CrawlCheckpoint':
+        """
+        打开检查点：存在未完成的同 run_key 运行时恢复之，否则新建一条运行记录。
+        恢复时以条件 UPDATE 认领记录，并发打开同一记录时只有一方成功，另一方抛出 CheckpointBusy
+        """
+        cursor = db_conn.cursor()
+        placeholders = ', '.join(['%s'] * len(RESUMABLE_STATUSES))
+        cursor.execute(
+            f"""SELECT * FROM crawl_runs WHERE run_key = %s AND status IN ({placeholders})
+                ORDER BY id DESC LIMIT 1""",
+            (run_key, *RESUMABLE_STATUSES),
+        )
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(
+                """UPDATE crawl_runs SET status = 'running', resumed_count = resumed_count + 1, checkpoint_at = NOW()
+                   WHERE id = %s AND (status IN ('interrupted', 'cancelled')
+                         OR (status = 'running' AND COALESCE(checkpoint_at, started_at) < %s))""",
+                (row['id'], datetime.now() - timedelta(seconds=stale_after)),
+            )
+            claimed = cursor.rowcount > 0
+            db_conn.commit()
+            if not claimed:
+                raise CheckpointBusy(f'运行 {row["id"]} ({run_key}) 正在其他进程中进行')
+            logger.info('[checkpoint] 恢复运行 %s (%s)，从第 %s 页继续', row['id'], run_key, row['current_page'])
+            return cls(
+                db_conn, row['id'], int(row['current_page'] or start_page),
+                frontier=json.loads(row['frontier']) if row['frontier'] is not None else None,
+                inflight=json.loads(row['inflight'] or '[]'),
+                created=int(row['created'] or 0), skipped=int(row['skipped'] or 0),
+                resumed=True, interval=interval, every=every, guard=guard,
+            )
+        cursor.execute(
+            """INSERT INTO crawl_runs (run_key, task_id, site_id, status, start_page, current_page)
+               VALUES (%s, %s, %s, 'running', %s, %s)""",
+            (run_key, task_id, site_id, start_page, start_page),
+        )
+        db_conn.commit()
+        return cls(db_conn, cursor.lastrowid, start_page, interval=interval, every=every, guard=guard)
+
+    def pending_links(self) -> list[str] | None:
+        """
+        恢复时待处理的链接（在途优先）；当前页尚未抓取列表时返回 None
+        """
+        if self.frontier is None and not self.inflight:
+            return None
+        links = list(self.inflight)
+        for link in self.frontier or []:
+            if link not in links:
+                links.append(link)
+        return links
+
+    def set_page(self, page: int, links: list[str]):
+        self.current_page = page
+        self.frontier = list(links)
+        self.inflight = []
+        self.save()
+
+    def begin(self, link: str):
+        if self.frontier and link in self.frontier:
+            self.frontier.remove(link)
+        if link not in self.inflight:
+            self.inflight.append(link)
+
+    def done(self, link: str, created: int, skipped: int):
+        if link in self.inflight:
+            self.inflight.remove(link)
+        self.created = created
+        self.skipped = skipped
+        self._dirty += 1
+        self.maybe_save()
+
+    def advance(self, next_page: int):
+        """当前页处理完毕，移动到下一页（列表尚未抓取）"""
+        self.current_page = next_page
+        self.frontier = None
+        self.inflight = []
+        self.save()
+
+    def maybe_save(self):
+        if self._dirty >= self.every or time.monotonic() - self._saved_at >= self.interval:
+            self.save()
+
+    def _owned(self) -> bool:
+        if self.detached:
+            return False
+        if self.guard is not None and not self.guard(self.db_conn):
+            self.db_conn.commit()
+            self.detached = True
+            logger.warning('[checkpoint] 运行 %s 的检查点已不属于本进程，不再写入', self.run_id)
+            return False
+        return True
+
+    def save(self, status: str = 'running') -> bool:
+        """写入检查点；检查点已不属于本次运行时不写入并返回 False"""
+        if not self._owned():
+            return False
+        cursor = self.db_conn.cursor()
+        cursor.execute(
+            """UPDATE crawl_runs
+               SET status = %s, current_page = %s, frontier = %s, inflight = %s,
+                   created = %s, skipped = %s, checkpoint_at = NOW()
+               WHERE id = %s""",
+            (
+                status,
+                self.current_page,
+                json.dumps(self.frontier, ensure_ascii=False) if self.frontier is not None else None,
+                json.dumps(self.inflight, ensure_ascii=False),
+                self.created,
+                self.skipped,
+                self.run_id,
+            ),
+        )
+        self.db_conn.commit()
+        self._dirty = 0
+        self._saved_at = time.monotonic()
+        return True
+
+    def finish(self, status: str, created: int, skipped: int, error: str | None = None):
+        """
+        结束运行。status 为 'done' 时清空检查点；'interrupted' / 'cancelled' 时保留以便下次恢复
+        """
+        self.created = created
+        self.skipped = skipped
+        if not self.save(status):
+            return
+        cursor = self.db_conn.cursor()
+        if status == 'done':
+            cursor.execute("UPDATE crawl_runs SET frontier = NULL, inflight = NULL, finished_at = NOW(), error = %s WHERE id = %s",
+                           (error, self.run_id))
+        else:
+            cursor.execute("UPDATE crawl_runs SET error = %s WHERE id = %s", (error, self.run_id))
+        self.db_conn.commit()
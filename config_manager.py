@@ -1,10 +1,79 @@
 import os
+import threading
+import time
 import yaml
 import json
 import pymysql
+import storage
 from typing import Optional, Dict, Any
 from datetime import datetime
 
+# 进程内设置版本号：本进程修改系统设置或站点时递增，运行中的抓取据此立即重新加载
+_settings_version = 0
+_settings_version_lock = threading.Lock()
+
+
+def bump_settings_version() -> int:
+    global _settings_version
+    with _settings_version_lock:
+        _settings_version += 1
+        return _settings_version
+
+
+def settings_version() -> int:
+    return _settings_version
+
+
+def settings_fingerprint(db_conn) -> tuple:
+    """
+    system_settings 与 sites 的最后修改时间；其他进程（如 worker 容器）修改设置时据此发现变化
+    """
+    cursor = db_conn.cursor()
+    cursor.execute(
+        """SELECT (SELECT MAX(updated_at) FROM system_settings) AS settings_at,
+                  (SELECT COUNT(*) FROM system_settings) AS settings_count,
+                  (SELECT MAX(updated_at) FROM sites) AS sites_at"""
+    )
+    row = cursor.fetchone()
+    return tuple(row.values()) if isinstance(row, dict) else tuple(row)
+
+
+class SettingsWatcher:
+    """
+    设置变更检测：本进程内的修改通过版本号立即发现；
+    其他进程的修改每隔 interval 秒查询一次 settings_fingerprint 发现
+    """
+
+    def __init__(self, db_conn, interval: float = 5.0):
+        self.interval = float(interval)
+        self._version = settings_version()
+        self._fingerprint = self._query(db_conn)
+        self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _query(db_conn):
+        try:
+            return settings_fingerprint(db_conn)
+        except pymysql.err.Error:
+            return None
+
+    def changed(self, db_conn) -> bool:
+        version = settings_version()
+        now = time.monotonic()
+        if version != self._version:
+            self._version = version
+            self._fingerprint = self._query(db_conn)
+            self._checked_at = now
+            return True
+        if now - self._checked_at < self.interval:
+            return False
+        self._checked_at = now
+        fingerprint = self._query(db_conn)
+        if fingerprint is None or fingerprint == self._fingerprint:
+            return False
+        self._fingerprint = fingerprint
+        return True
+
 def load_config(path: Optional[str]) -> dict:
     """
     读取 YAML 配置文件。
@@ -30,16 +99,7 @@ def get_db_connection():
     """
     获取数据库连接，只使用配置文件中的数据库配置
     """
-    cfg = load_config('/config/config.yaml')
-    return pymysql.connect(
-        host=cfg.get('db_host', 'localhost'),
-        port=cfg.get('db_port', 3306),
-        user=cfg.get('db_user', 'root'),
-        password=cfg.get('db_password', ''),
-        database=cfg.get('db_name', 'pt_crawler'),
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return storage.connect(get_database_config(), charset='utf8mb4')
 
 def get_system_setting(key: str, default: Any = None) -> Any:
     """
@@ -90,6 +150,7 @@ def set_system_setting(key: str, value: Any, setting_type: str = 'string', descr
                     (key, str_value, setting_type, description)
                 )
                 conn.commit()
+                bump_settings_version()
                 return True
     except Exception as e:
         print(f"设置系统设置 {key} 失败: {e}")
@@ -163,16 +224,24 @@ def get_all_system_settings() -> Dict[str, Dict[str, Any]]:
 
 def get_database_config() -> Dict[str, Any]:
     """
-    从配置文件获取数据库配置
+    从配置文件获取数据库配置；db_backend 为 sqlite 时使用 db_path 指定的本地数据库文件
     """
     cfg = load_config('/config/config.yaml')
-    return {
+    config = {
         'host': cfg.get('db_host', 'localhost'),
         'port': cfg.get('db_port', 3306),
         'user': cfg.get('db_user', 'root'),
         'password': cfg.get('db_password', ''),
         'database': cfg.get('db_name', 'pt_crawler'),
     }
+    if str(cfg.get('db_backend', 'mysql')).lower() == 'sqlite':
+        config.update({
+            'backend': 'sqlite',
+            'path': cfg.get('db_path', './output/pt_crawler.sqlite3'),
+            'commit_every': cfg.get('db_commit_batch', 50),
+            'commit_interval': cfg.get('db_commit_interval', 0.5),
+        })
+    return config
 
 def parse_setting_value(value: str, setting_type: str) -> Any:
     """
@@ -1,89 +1,176 @@
 """PT crawler runtime for NexusPHP-based sites."""
 import asyncio
+import logging
 import os
 import time
 import json
 import argparse
+from contextlib import nullcontext
+from datetime import datetime
 import requests
 import pymysql
 import pymysql.cursors
 from bs4 import BeautifulSoup
 
-from config_manager import load_config, get_database_config, get_system_setting
-from db_manager import init_db, save_torrent_to_db, get_torrent_data, torrent_exists, crawl_link_exists
+from config_manager import load_config, get_database_config, get_system_settings_by_prefix, SettingsWatcher
+from db_manager import ensure_schema, save_torrent_to_db, get_torrent_data, torrent_exists, crawl_link_exists, set_run_profile, save_torrent_files, torrent_file_rows, get_site, get_task
+from checkpoint import DEFAULT_STALE_AFTER, CheckpointBusy, CrawlCheckpoint
+from extraction import DetailExtractor, resolve_fields
+from page_archive import get_archive
+from progress import RunProgress
+from promotion_queue import prioritize
+from response_cache import RESPONSE_CACHE
+from seen_set import get_seen_set, save_seen_set
+import storage
+from site_adapters import SiteAdapter, get_adapter
+from profiling import start_profiler, stop_profiler
+from resilience import ResilientFetcher
+from tracing import Tracer, get_logger, redact, setup_logging
 from parser_utils import (
     absolute_url,
+    extract_promotion,
     get_headers,
-    find_detail_links,
-    find_torrent_link,
-    extract_descr_html,
     parse_torrent,
-    extract_text_from_td_sibling,
     ensure_dir,
-    extract_title,
-    extract_subtitle,
-    extract_basic_info,
-    extract_tags,
-    extract_description,
-    extract_mediainfo,
 )
 
-async def run_crawler_for_site(site: dict, task: dict) -> dict:
+logger = get_logger('crawler')
+
+def build_site_opts(site: dict, task: dict | None = None, config: dict | None = None) -> argparse.Namespace:
+    """
+    根据站点行、任务行与系统设置构造 crawl() 所需的参数对象
+    """
+    task = task or {}
+    db_config = get_database_config()
+    # 一次查询取出全部系统设置，避免每个键单独建连
+    if config is None:
+        config = get_system_settings_by_prefix('')
+
+    return argparse.Namespace(
+        base_url=site['base_url'],
+        list_path=site.get('list_path') or '/torrents.php',
+        cookie=site.get('cookie', ''),
+        user_agent=site.get('user_agent', ''),
+        out_dir=config.get('out_dir', './output'),
+        torrent_download_dir=config.get('torrent_download_dir', './torrents'),
+        db_host=db_config.get('host', 'localhost'),
+        db_port=db_config.get('port', 3306),
+        db_user=db_config.get('user', 'root'),
+        db_password=db_config.get('password', ''),
+        db_name=db_config.get('database', 'pt_crawler'),
+        db_backend=db_config.get('backend', 'mysql'),
+        db_path=db_config.get('path'),
+        db_commit_batch=db_config.get('commit_every', 50),
+        db_commit_interval=db_config.get('commit_interval', 0.5),
+        delay=config.get('delay', 0.5),
+        test_mode=config.get('test_mode', False),
+        test_limit=config.get('test_limit', 5),
+        allow_v2=config.get('allow_v2', False),
+        start_page=int(task.get('start_page') or 1),
+        task_id=task.get('id'),
+        site_id=site.get('id'),
+        run_key=f"task:{task['id']}" if task.get('id') is not None else f"site:{site.get('id') or site['base_url']}",
+        checkpoint_interval=float(config.get('checkpoint_interval', 10.0)),
+        retry_max_attempts=int(config.get('retry_max_attempts', 4)),
+        retry_base_delay=float(config.get('retry_base_delay', 1.0)),
+        retry_max_delay=float(config.get('retry_max_delay', 60.0)),
+        breaker_failure_threshold=int(config.get('breaker_failure_threshold', 5)),
+        breaker_reset_timeout=float(config.get('breaker_reset_timeout', 60.0)),
+        trace_sample_rate=float(config.get('trace_sample_rate', 0.0)),
+        use_seen_set=bool(config.get('use_seen_set', True)),
+        archive_pages=bool(config.get('archive_pages', False)),
+        settings_poll_interval=float(config.get('settings_poll_interval', 5.0)),
+        # 提取配置：任务 > 站点 > 系统设置
+        extract_fields=resolve_fields(task.get('extract_profile') or site.get('extract_profile')
+                                      or config.get('extract_profile')),
+        adapter=get_adapter(site.get('adapter')),
+        feed_url=site.get('feed_url') or '/torrentrss.php?rows=50',
+        feed_details=bool(config.get('feed_details', False)),
+    )
+
+# 运行中可热更新的参数；其余参数（输出目录、数据库等）只在运行开始时读取
+HOT_RELOAD_KEYS = (
+    'cookie', 'user_agent', 'delay', 'test_mode', 'test_limit', 'allow_v2',
+    'trace_sample_rate', 'archive_pages', 'checkpoint_interval', 'extract_fields', 'adapter',
+    'retry_max_attempts', 'retry_base_delay', 'retry_max_delay',
+    'breaker_failure_threshold', 'breaker_reset_timeout',
+)
+
+
+def reload_site_opts(opts, db_conn) -> list[str]:
+    """
+    重新读取站点行、任务行与系统设置，把 HOT_RELOAD_KEYS 中有变化的参数应用到运行中的 opts，返回变化的参数名。
+    编排器的全局并发闸门与站点限速（max_inflight_requests / parse_workers / site_max_rps）一并调整
+    """
+    site = get_site(db_conn, opts.site_id)
+    if not site:
+        return []
+    task = get_task(db_conn, opts.task_id) if getattr(opts, 'task_id', None) else None
+    config = get_system_settings_by_prefix('')
+    fresh = build_site_opts(site, task, config)
+    changed = []
+    for key in HOT_RELOAD_KEYS:
+        value = getattr(fresh, key)
+        if getattr(opts, key, None) != value:
+            setattr(opts, key, value)
+            changed.append(key)
+    if 'trace_sample_rate' in changed:
+        opts.tracer.sample_rate = max(0.0, min(1.0, opts.trace_sample_rate))
+    if 'checkpoint_interval' in changed and getattr(opts, 'checkpoint', None) is not None:
+        opts.checkpoint.interval = opts.checkpoint_interval
+    if 'archive_pages' in changed:
+        opts.page_archive = get_archive(os.path.join(opts.out_dir, 'page_archive')) if opts.archive_pages else None
+    if any(k.startswith(('retry_', 'breaker_')) for k in changed):
+        policy = opts.fetcher.policy
+        policy.max_attempts = max(1, int(opts.retry_max_attempts))
+        policy.base_delay = float(opts.retry_base_delay)
+        policy.max_delay = float(opts.retry_max_delay)
+        opts.fetcher.breaker.failure_threshold = max(1, int(opts.breaker_failure_threshold))
+        opts.fetcher.breaker.reset_timeout = float(opts.breaker_reset_timeout)
+    limiter = getattr(opts, 'rate_limiter', None)
+    if limiter is not None and hasattr(limiter, 'set_rate') and config.get('site_max_rps') is not None:
+        limiter.set_rate(float(config['site_max_rps']))
+    for gate_name, key in (('http_gate', 'max_inflight_requests'), ('parse_gate', 'parse_workers')):
+        gate = getattr(opts, gate_name, None)
+        if hasattr(gate, 'set_limit') and config.get(key) and int(config[key]) != gate.limit:
+            gate.set_limit(int(config[key]))
+            changed.append(key)
+    return changed
+
+
+async def run_crawler_for_site(site: dict, task: dict, profile: str | None = None, control=None) -> dict:
     """
     为单个站点执行任务爬虫
-    用于手动执行功能
+    用于手动执行功能；profile 为 'cpu' 或 'alloc' 时剖析本次运行，control 为 RunControl（取消与预算）
     """
-    print(f"开始为站点 {site['name']} 执行任务 {task['name']}")
+    logger.info(f"开始为站点 {site['name']} 执行任务 {task['name']}")
+    progress = RunProgress(task['id'])
     
     try:
-        db_config = get_database_config()
-        config = {}
-        crawler_keys = ['out_dir', 'torrent_download_dir', 'delay', 'test_mode', 'test_limit', 'allow_v2']
-        for key in crawler_keys:
-            value = get_system_setting(key)
-            if value is not None:
-                config[key] = value
-        
-        db_host = db_config.get('host', 'localhost')
-        db_port = db_config.get('port', 3306)
-        db_user = db_config.get('user', 'root')
-        db_password = db_config.get('password', '')
-        db_name = db_config.get('database', 'pt_crawler')
-
-        class MockArgs:
-            def __init__(self):
-                self.base_url = site['base_url']
-                self.list_path = site.get('list_path', '/torrents.php')
-                self.cookie = site.get('cookie', '')
-                self.user_agent = site.get('user_agent', '')
-                self.out_dir = config.get('out_dir', './output')
-                self.torrent_download_dir = config.get('torrent_download_dir', './torrents')
-                self.db_host = db_host
-                self.db_port = db_port
-                self.db_user = db_user
-                self.db_password = db_password
-                self.db_name = db_name
-                self.delay = config.get('delay', 0.5)
-                self.test_mode = config.get('test_mode', False)
-                self.test_limit = config.get('test_limit', 5)
-                self.allow_v2 = config.get('allow_v2', False)
-                self.start_page = int(task.get('start_page') or 1)
-        
-        opts = MockArgs()
+        opts = build_site_opts(site, task)
+        opts.profile = profile
+        opts.progress = progress
+        opts.control = control
+        opts.stats = {}
         
         # 调用现有的爬虫函数
         result = await crawl(opts)
         
         return {
             "success": True,
+            "status": opts.stats.get('status'),
             "message": f"任务执行完成，处理了 {result} 个种子",
             "task_id": task['id'],
-            "site_name": site['name']
+            "site_name": site['name'],
+            "run_id": opts.stats.get('run_id'),
+            "profile_path": opts.stats.get('profile_path'),
         }
         
-    except (requests.exceptions.RequestException, ValueError, OSError, pymysql.err.Error) as e:
+    except (requests.exceptions.RequestException, ValueError, OSError, pymysql.err.Error, CheckpointBusy) as e:
         error_msg = f"任务执行失败: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
+        # crawl 尚未开始时（如连不上数据库）也要让进度订阅方收到结束事件
+        progress.finish('failed', str(e))
         return {
             "success": False,
             "message": error_msg,
@@ -93,199 +180,549 @@ async def run_crawler_for_site(site: dict, task: dict) -> dict:
         }
 
 
+def _fetch(session: requests.Session, url: str, headers: dict, opts, stream: bool = False) -> requests.Response:
+    """
+    发起一次 GET 请求。
+    - 若 opts 上挂有 rate_limiter（站点级限速）或 http_gate（全局并发上限），每次尝试前后遵守之；
+    - 若 opts 上挂有 fetcher（ResilientFetcher），由其负责重试、退避与熔断；
+    - stream 为 True 时只读取响应头，响应体由调用方按块读取（不计入 http_gate 的在途时间）。
+    """
+    limiter = getattr(opts, 'rate_limiter', None)
+    gate = getattr(opts, 'http_gate', None)
+
+    def send() -> requests.Response:
+        if limiter is not None:
+            limiter.wait()
+        with gate or nullcontext():
+            return session.get(url, headers=headers, timeout=30, stream=stream)
+
+    fetcher = getattr(opts, 'fetcher', None)
+    if fetcher is None:
+        return send()
+    return fetcher.request(url, send)
+
+
+def _list_url(opts, page: int) -> str:
+    list_url = absolute_url(opts.base_url, opts.list_path)
+    query = opts.adapter.page_query(page)
+    if '?' in list_url:
+        return list_url + f'&{query}'
+    return list_url + f'?{query}'
+
+
+def _fetch_list_page(session: requests.Session, headers: dict, opts, page: int, parse_gate) -> list[str] | None:
+    """
+    抓取并解析一页列表，返回按促销优先级排序的详情页链接；页面为空时返回空列表，请求失败时返回 None
+    """
+    list_url = _list_url(opts, page)
+    logger.info('[list] %s', list_url)
+    try:
+        with opts.tracer.span('fetch_list', list_url):
+            r = _fetch(session, list_url, headers, opts)
+        if r.status_code != 200:
+            logger.warning('HTTP %s for %s', r.status_code, list_url)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('List page response: %s', r.text[:500])
+            return None
+    except requests.exceptions.RequestException as e:
+        logger.warning('Request failed for %s: %s', list_url, e)
+        return None
+    archive = getattr(opts, 'page_archive', None)
+    if archive is not None:
+        archive.put('list', opts.base_url, list_url, r.text)
+    with parse_gate, opts.tracer.span('parse', list_url):
+        soup = BeautifulSoup(r.text, 'html.parser')
+        detail_links = opts.adapter.find_detail_links(soup, opts.base_url)
+        last_page = opts.adapter.last_page(soup)
+        opts.list_promotions = opts.adapter.list_promotions(soup, opts.base_url)
+    if last_page is not None:
+        # 末页的分页条只链接到之前的页，当前页本身也计入
+        opts.last_page = max(last_page, page)
+    logger.debug('Found %d detail links.', len(detail_links))
+    if not detail_links:
+        logger.warning('no detail links found on %s', list_url)
+    return detail_links
+
+
+def _init_runtime(opts):
+    """补齐运行期对象：tracer、fetcher 与编译后的 adapter"""
+    if getattr(opts, 'tracer', None) is None:
+        opts.tracer = Tracer(getattr(opts, 'trace_sample_rate', 0.0))
+    if getattr(opts, 'fetcher', None) is None:
+        opts.fetcher = ResilientFetcher.for_site(opts.base_url, opts)
+    # adapter 可为编译后的适配器，也可为 sites.adapter 中的配置文本
+    if not isinstance(getattr(opts, 'adapter', None), SiteAdapter):
+        opts.adapter = get_adapter(getattr(opts, 'adapter', None))
+
+
+def site_db_config(opts) -> dict:
+    """由 opts 中的 db_* 参数构造数据库配置"""
+    db_config = {
+        'host': opts.db_host,
+        'port': opts.db_port,
+        'user': opts.db_user,
+        'password': opts.db_password,
+        'database': opts.db_name,
+    }
+    if getattr(opts, 'db_backend', 'mysql') == 'sqlite':
+        db_config.update(backend='sqlite', path=getattr(opts, 'db_path', None) or storage.DEFAULT_SQLITE_PATH,
+                         commit_every=getattr(opts, 'db_commit_batch', storage.DEFAULT_COMMIT_EVERY),
+                         commit_interval=getattr(opts, 'db_commit_interval', storage.DEFAULT_COMMIT_INTERVAL))
+    return db_config
+
+
+def page_limit(opts) -> int | None:
+    """
+    由 end_page 与 pages（从 start_page 起最多抓取的页数）得到最后一页；都未设置时返回 None
+    """
+    end_page = getattr(opts, 'end_page', None)
+    pages = getattr(opts, 'pages', None)
+    if pages:
+        limit = getattr(opts, 'start_page', 1) + int(pages) - 1
+        end_page = min(end_page, limit) if end_page else limit
+    return end_page
+
+
+def discover_last_page(opts) -> int | None:
+    """
+    抓取 start_page 所在的列表页，从分页条读取站点当前的最后一页；请求失败或页面没有分页条时返回 None
+    """
+    _init_runtime(opts)
+    opts.last_page = None
+    session = requests.Session()
+    headers = get_headers(opts.cookie, opts.user_agent)
+    links = _fetch_list_page(session, headers, opts, getattr(opts, 'start_page', 1), nullcontext())
+    if links is None:
+        return None
+    return opts.last_page
+
+
+def _save_first_detail_page(opts, text: str):
+    """保存首个详情页快照供调试；每次运行只检查一次文件是否存在"""
+    if getattr(opts, 'first_page_saved', False):
+        return
+    opts.first_page_saved = True
+    detail_page_path = os.path.join(opts.out_dir, 'first_torrent_detail_page.html')
+    if os.path.exists(detail_page_path):
+        return
+    try:
+        with open(detail_page_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        logger.info('Saved first torrent detail page to %s', detail_page_path)
+    except OSError as e:
+        logger.warning('Error saving first torrent detail page to %s: %s', detail_page_path, e)
+
+
+def _fetch_detail(session: requests.Session, headers: dict, opts, durl: str, parse_gate) -> tuple[BeautifulSoup, str] | None:
+    """
+    抓取详情页，返回 (详情页 soup, 种子下载链接)；失败时返回 None
+    """
+    with opts.tracer.span('fetch_detail', durl):
+        dr = _fetch(session, durl, headers, opts)
+    if dr.status_code != 200:
+        logger.warning('detail HTTP %s %s', dr.status_code, durl)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Detail page response for %s: %s', durl, dr.text[:500])
+        return None
+    _save_first_detail_page(opts, dr.text)
+    with parse_gate, opts.tracer.span('parse', durl):
+        dsoup = BeautifulSoup(dr.text, 'html.parser')
+        turl = opts.adapter.find_torrent_link(dsoup, opts.base_url)
+    if not turl:
+        logger.warning('no torrent link on %s', durl)
+        return None
+    archive = getattr(opts, 'page_archive', None)
+    if archive is not None:
+        archive.put('detail', opts.base_url, durl, dr.text, torrent_url=turl)
+    return dsoup, turl
+
+
+def _download_torrent(session: requests.Session, headers: dict, opts, turl: str) -> tuple[dict, str] | None:
+    """
+    下载并解析种子文件，保存到 torrent_download_dir，返回 (种子信息, 文件路径)；失败或跳过时返回 None
+    """
+    with opts.tracer.span('download', turl):
+        tr = _fetch(session, turl, headers, opts)
+        if tr.status_code != 200:
+            logger.warning('torrent HTTP %s %s', tr.status_code, redact(turl))
+            return None
+        tbytes = tr.content
+
+        try:
+            info = parse_torrent(tbytes)
+        except ValueError as e:
+            logger.warning('torrent parse error %s: %s', redact(turl), e)
+            return None
+
+        if info['meta_version'] == 'v2' and not opts.allow_v2:
+            logger.info('skip v2/hybrid torrent %s', redact(turl))
+            return None
+
+        # filename from content-disposition or infohash
+        filename = f"{info['info_hash']}.torrent"
+        out_file = os.path.join(opts.torrent_download_dir, filename)
+        with open(out_file, 'wb') as f:
+            f.write(tbytes)
+    return info, out_file
+
+
+def _persist_torrent(db_conn, opts, info: dict, out_file: str, fields: dict, crawl_link: str,
+                     promotion: str | None = None, promotion_until=None):
+    """
+    组装种子记录并入库（info_hash 已存在时跳过），同时追加到 out_dir/metadata.jsonl。
+    入库失败时抛出数据库异常，不写文件列表、不加入已见集合，以便之后重试
+    """
+    if fields.get('size'):
+        info['size'] = fields['size']
+
+    # seeders/leechers/completed removed per new schema
+
+    is_single_file = 1 if len(info['files']) == 1 else 0
+    record = {
+        'name': info['name'],
+        'info_hash': info['info_hash'],
+        'meta_version': info['meta_version'],
+        'size': info['size'],
+        'saved_path': out_file,
+        'category': fields.get('category'),
+        'title': fields.get('title'),
+        'introduction': fields.get('introduction'),
+        'description': fields.get('description') or '',
+        'mediainfo': fields.get('mediainfo') or '',
+        'crawl_site': opts.base_url,
+        'medium': fields.get('medium'),
+        'video_codec': fields.get('video_codec'),
+        'standard': fields.get('standard'),
+        'production_team': fields.get('production_team'),
+        'audiocodec': fields.get('audiocodec'),
+        'is_single_file': is_single_file,
+        'multi_file_list': json.dumps(info['files'], ensure_ascii=False),
+        'crawl_link': crawl_link,
+        'tags': fields.get('tags'),
+        'promotion': promotion,
+        'promotion_until': promotion_until,
+    }
+    with opts.tracer.span('persist', info['info_hash']):
+        seen = getattr(opts, 'seen', None)
+        exists = seen.has_hash(info['info_hash']) if seen is not None else torrent_exists(db_conn, info['info_hash'])
+        if exists:
+            logger.debug('Torrent with info_hash %s already exists, skipping insert.', info['info_hash'])
+        elif save_torrent_to_db(db_conn, record):
+            save_torrent_files(db_conn, torrent_file_rows(info['info_hash'], info['files']))
+            if seen is not None:
+                seen.add(info['info_hash'], crawl_link)
+            # SQLite 批量提交时写入可能尚未可见，等真正提交后再失效，避免缓存住旧列表
+            storage.after_commit(db_conn, RESPONSE_CACHE.invalidate, 'torrents')
+        elif seen is not None:
+            # 已见集合未命中但库中已有（如其他进程刚写入），补进集合
+            seen.add(info['info_hash'], crawl_link)
+
+        # 校验查询只在 DEBUG 级别执行，避免每个种子多一次数据库往返
+        if logger.isEnabledFor(logging.DEBUG):
+            retrieved_data = get_torrent_data(db_conn, info['info_hash'])
+            if retrieved_data:
+                logger.debug('[VERIFY] Tags: %s, Standard: %s', retrieved_data['tags'], retrieved_data['standard'])
+            else:
+                logger.debug('[VERIFY] Could not retrieve data for info_hash: %s', info['info_hash'])
+        meta_path = os.path.join(opts.out_dir, 'metadata.jsonl')
+        with open(meta_path, 'a', encoding='utf-8') as mf:
+            mf.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    logger.info('+ saved %s | %s', os.path.basename(out_file), info['name'])
 
 
+def _extract_fields(opts, dsoup: BeautifulSoup, turl: str, parse_gate,
+                    listed_promotion: tuple | None = None) -> tuple[dict, str | None, datetime | None]:
+    """
+    提取详情页字段与促销信息，返回 (字段, 促销类型, 促销到期时间)。
+    促销信息以详情页为准，详情页没有时使用列表页上的 listed_promotion
+    """
+    # 只计算站点/任务提取配置中声明的字段
+    with parse_gate, opts.tracer.span('parse', turl):
+        fields = DetailExtractor(dsoup, opts.adapter).extract(getattr(opts, 'extract_fields', None))
+        promotion, promotion_until = extract_promotion(dsoup)
+    if promotion is None and listed_promotion:
+        promotion, promotion_until = listed_promotion
+    return fields, promotion, promotion_until
+
+
+def _store_torrent(session: requests.Session, headers: dict, db_conn, opts, turl: str, fields: dict,
+                   promotion: str | None = None, promotion_until=None) -> bool:
+    """
+    下载种子并连同已提取的字段入库，成功返回 True
+    """
+    downloaded = _download_torrent(session, headers, opts, turl)
+    if downloaded is None:
+        return False
+    _persist_torrent(db_conn, opts, *downloaded, fields, turl, promotion, promotion_until)
+    return True
+
+
+def _save_torrent(session: requests.Session, headers: dict, db_conn, opts, dsoup: BeautifulSoup, turl: str, parse_gate,
+                  listed_promotion: tuple | None = None) -> bool:
+    """
+    提取详情页字段、下载种子并入库，成功返回 True
+    """
+    fields, promotion, promotion_until = _extract_fields(opts, dsoup, turl, parse_gate, listed_promotion)
+    return _store_torrent(session, headers, db_conn, opts, turl, fields, promotion, promotion_until)
+
+
+def _finish_profile(profiler, opts, db_conn, checkpoint) -> str | None:
+    """
+    停止剖析并保存产物；有运行记录时把产物路径写入 crawl_runs.profile_path
+    """
+    if profiler is None:
+        return None
+    label = f'run-{checkpoint.run_id}' if checkpoint else time.strftime('run-%Y%m%d-%H%M%S')
+    try:
+        path = stop_profiler(profiler, opts.out_dir, label)
+        if checkpoint:
+            set_run_profile(db_conn, checkpoint.run_id, path)
+        return path
+    except (OSError, pymysql.err.Error) as e:
+        logger.error('保存剖析结果失败: %s', e)
+        return None
+
 async def crawl(opts: argparse.Namespace) -> int:
+    """
+    按列表页逐页抓取站点。可选参数：
+    - end_page: 抓到该页（含）为止
+    - pages: 从 start_page 起最多抓取的页数，与 end_page 同时设置时取较小者
+    - detail_urls: 直接处理给定的详情页链接，不遍历列表页
+    - stop_on_seen: 按列表页顺序连续 10 个已存在的种子链接时停止（默认 True）
+    每页先按列表顺序抓详情页并跳过已存在的链接，再按促销优先级（promotion_queue）下载未入库的种子
+    - run_key: 启用检查点，进程中断后相同 run_key 的下次运行从中断处继续
+    - profile: 'cpu' 或 'alloc'，剖析本次运行，结果写入 out_dir/profiles 并关联到运行记录
+    - progress: progress.RunProgress，实时发布页数、新增、跳过与错误计数
+    - control: run_manager.RunControl，支持取消与时间/条目预算；停止后检查点保留，状态为 cancelled
+    - hot_reload: 站点来自 sites 表时默认开启，运行中按 HOT_RELOAD_KEYS 热更新设置与站点配置
+    列表页带分页条时同时读取站点的最后一页，超过后不再请求空页
+    """
     session = requests.Session()
     headers = get_headers(opts.cookie, opts.user_agent)
+    _init_runtime(opts)
+    if getattr(opts, 'archive_pages', False) and getattr(opts, 'page_archive', None) is None:
+        opts.page_archive = get_archive(os.path.join(opts.out_dir, 'page_archive'))
     out_dir = opts.out_dir
     ensure_dir(out_dir)
     tdir = os.path.join(out_dir, 'torrents')
     ensure_dir(tdir)
     ensure_dir(opts.torrent_download_dir)
-    meta_path = os.path.join(out_dir, 'metadata.jsonl')
 
-    db_config = {
-        'host': opts.db_host,
-        'port': opts.db_port,
-        'user': opts.db_user,
-        'password': opts.db_password,
-        'database': opts.db_name,
-    }
-    init_db(db_config)
-    db_conn = pymysql.connect(**db_config, cursorclass=pymysql.cursors.DictCursor)
+    db_config = site_db_config(opts)
+    ensure_schema(db_config)
+    db_conn = storage.connect(db_config)
+    # 去重查询走内存已见集合；关闭 use_seen_set 时退回逐条查库
+    seen = None
+    if getattr(opts, 'use_seen_set', True):
+        seen = opts.seen = get_seen_set(db_conn, db_config, out_dir)
+    # 站点来自 sites 表时，运行中修改系统设置或站点配置会被热更新
+    watcher = None
+    if getattr(opts, 'site_id', None) is not None and getattr(opts, 'hot_reload', True):
+        watcher = SettingsWatcher(db_conn, getattr(opts, 'settings_poll_interval', 5.0))
 
+    parse_gate = getattr(opts, 'parse_gate', None) or nullcontext()
+    end_page = page_limit(opts)
+    opts.last_page = None
+    opts.list_promotions = {}
+    detail_urls = getattr(opts, 'detail_urls', None)
+    stop_on_seen = getattr(opts, 'stop_on_seen', True)
     created = 0
     skipped = 0
+    errors = 0
+    pages_done = 0
     seen_link_streak = 0
     stop_due_to_seen = False
+    run_status = 'done'
 
     page = getattr(opts, 'start_page', 1)
-    while True:
-        list_url = absolute_url(opts.base_url, opts.list_path)
-        if '?' in list_url:
-            list_url += f'&page={page}'
-        else:
-            list_url += f'?page={page}'
-        print(f'[list] {list_url}')
+    checkpoint = None
+    resumed_links = None
+    run_key = getattr(opts, 'run_key', None)
+    if run_key and detail_urls is None:
         try:
-            r = session.get(list_url, headers=headers, timeout=30)
-            print(f'  [DEBUG] List page status code: {r.status_code}')
-            if r.status_code != 200:
-                print(f'  ! HTTP {r.status_code} for {list_url}')
-                print(f'  [DEBUG] List page response: {r.text[:500]}')
-                skipped += 1
+            checkpoint = CrawlCheckpoint.open(
+                db_conn, run_key, page,
+                task_id=getattr(opts, 'task_id', None), site_id=getattr(opts, 'site_id', None),
+                interval=getattr(opts, 'checkpoint_interval', 10.0),
+                stale_after=getattr(opts, 'checkpoint_stale_after', DEFAULT_STALE_AFTER),
+                guard=getattr(opts, 'checkpoint_guard', None),
+            )
+        except CheckpointBusy:
+            db_conn.close()
+            raise
+        page = checkpoint.current_page
+        opts.checkpoint = checkpoint
+        resumed_links = checkpoint.pending_links()
+        created, skipped = checkpoint.created, checkpoint.skipped
+    # 条目预算只计本次运行新增的种子；续跑时 created 含之前运行的累计值
+    created_at_start = created
+
+    control = getattr(opts, 'control', None)
+    if control is not None and checkpoint:
+        control.run_id = checkpoint.run_id
+    cancelled = False
+    progress = getattr(opts, 'progress', None)
+    if progress is not None:
+        progress.start(checkpoint.run_id if checkpoint else None)
+    profiler = None
+    try:
+        # 在 try 内启动：同一进程已有内存剖析在运行时会抛出 RuntimeError，仍需结束检查点与进度并关闭连接
+        profiler = start_profiler(getattr(opts, 'profile', None))
+        while True:
+            if control is not None and control.should_stop(created - created_at_start):
+                cancelled = True
                 break
-        except requests.exceptions.RequestException as e:
-            print(f'  ! Request failed for {list_url}: {e}')
-            skipped += 1
-            break
-        soup = BeautifulSoup(r.text, 'html.parser')
-        detail_links = find_detail_links(soup, opts.base_url)
-        print(f'  [DEBUG] Found {len(detail_links)} detail links.')
-        if not detail_links:
-            print('  ! no detail links found')
-            skipped += 1
-            break
-
-        limit = len(detail_links)
-        if getattr(opts, 'test_mode', False):
-            limit = min(getattr(opts, 'test_limit', 5) or 5, len(detail_links))
-        for durl in detail_links[:limit]:
-            print(f'  [DEBUG] Processing detail link: {durl}')
-            try:
-                dr = session.get(durl, headers=headers, timeout=30)
-                detail_page_path = os.path.join(out_dir, 'first_torrent_detail_page.html')
-                if not os.path.exists(detail_page_path):
-                    try:
-                        with open(detail_page_path, 'w', encoding='utf-8') as f:
-                            f.write(dr.text)
-                            f.flush()
-                        print(f"Successfully saved first torrent detail page to {detail_page_path}")
-                    except OSError as e:
-                        print(f"Error saving first torrent detail page to {detail_page_path}: {e}")
-
-                print(f'  [DEBUG] Detail page status code for {durl}: {dr.status_code}')
-                if dr.status_code != 200:
-                    print(f'  ! detail HTTP {dr.status_code} {durl}')
-                    print(f'  [DEBUG] Detail page response for {durl}: {dr.text}')
-                    skipped += 1
-                    continue
-                dsoup = BeautifulSoup(dr.text, 'html.parser')
-                turl = find_torrent_link(dsoup, opts.base_url)
-                if not turl:
-                    print('  ! no torrent link')
+            if detail_urls is not None:
+                detail_links = list(detail_urls)
+            elif resumed_links is not None:
+                detail_links = resumed_links
+                resumed_links = None
+            else:
+                if end_page and page > end_page:
+                    break
+                if opts.last_page is not None and page > opts.last_page:
+                    break
+                detail_links = _fetch_list_page(session, headers, opts, page, parse_gate)
+                if detail_links is None:
+                    # 请求失败：保留检查点，下次从本页继续
                     skipped += 1
-                    continue
-                if crawl_link_exists(db_conn, turl):
-                    seen_link_streak += 1
-                else:
-                    seen_link_streak = 0
-                if seen_link_streak >= 10:
-                    stop_due_to_seen = True
-                    print('  [STOP] 连续10个种子链接已存在，停止抓取')
+                    run_status = 'interrupted'
                     break
-
-                tr = session.get(turl, headers=headers, timeout=30)
-                if tr.status_code != 200:
-                    print(f'  ! torrent HTTP {tr.status_code} {turl}')
+                if not detail_links:
                     skipped += 1
-                    continue
-                tbytes = tr.content
+                    break
+                if getattr(opts, 'test_mode', False):
+                    detail_links = detail_links[:getattr(opts, 'test_limit', 5) or 5]
+                if checkpoint:
+                    checkpoint.set_page(page, detail_links)
 
+            # 第一遍按列表页原有顺序抓取详情页：连续已存在数依赖站点由新到旧的排列，
+            # 已存在的链接直接跳过，未入库的只提取字段，留在在途列表中等待下载
+            pending: dict[str, tuple] = {}
+            for durl in detail_links:
+                # 取消或超出预算时，尚未开始的链接留在检查点中，下次运行继续
+                if control is not None and control.should_stop(created - created_at_start):
+                    cancelled = True
+                    break
+                if watcher is not None and watcher.changed(db_conn):
+                    changed = reload_site_opts(opts, db_conn)
+                    if changed:
+                        headers = get_headers(opts.cookie, opts.user_agent)
+                        logger.info('[settings] 已热更新: %s', ', '.join(changed))
+                logger.debug('Processing detail link: %s', durl)
+                if checkpoint:
+                    checkpoint.begin(durl)
+                aborted = False
                 try:
-                    info = parse_torrent(tbytes)
-                except ValueError as e:
-                    print(f'  ! parse error: {e}')
+                    detail = _fetch_detail(session, headers, opts, durl, parse_gate)
+                    if detail is None:
+                        skipped += 1
+                        continue
+                    dsoup, turl = detail
+                    link_seen = seen.has_link(turl) if seen is not None else crawl_link_exists(db_conn, turl)
+                    if not link_seen:
+                        seen_link_streak = 0
+                        listed = opts.list_promotions.get(durl)
+                        pending[durl] = (turl, *_extract_fields(opts, dsoup, turl, parse_gate, listed))
+                        continue
+                    seen_link_streak += 1
                     skipped += 1
-                    continue
+                    if stop_on_seen and seen_link_streak >= 10:
+                        stop_due_to_seen = True
+                        logger.info('[STOP] 连续10个种子链接已存在，停止抓取')
+                        break
+                except (requests.exceptions.RequestException, ValueError, OSError, pymysql.err.DataError) as e:
+                    logger.warning('error processing %s: %s', durl, redact(e))
+                    skipped += 1
+                    errors += 1
+                except BaseException:
+                    # 未处理的异常（如数据库断开）中止本次运行，链接留在在途列表中，下次运行重新处理
+                    aborted = True
+                    raise
+                finally:
+                    if checkpoint and not aborted and durl not in pending:
+                        checkpoint.done(durl, created, skipped)
+                    if progress is not None:
+                        progress.update(pages=pages_done, created=created, skipped=skipped, errors=errors)
 
-                if info['meta_version'] == 'v2' and not opts.allow_v2:
-                    print('  ! skip v2/hybrid torrent')
+            # 第二遍按促销优先级下载入库：免费与即将到期的先下载，其余保持列表顺序
+            order = [] if cancelled else prioritize(list(pending), {d: p[2:] for d, p in pending.items()})
+            for durl in order:
+                if control is not None and control.should_stop(created - created_at_start):
+                    cancelled = True
+                    break
+                turl, fields, promotion, promotion_until = pending[durl]
+                aborted = False
+                try:
+                    if not _store_torrent(session, headers, db_conn, opts, turl, fields, promotion, promotion_until):
+                        skipped += 1
+                        continue
+                    created += 1
+                    if opts.delay > 0:
+                        if control is not None:
+                            control.sleep(opts.delay)
+                        else:
+                            time.sleep(opts.delay)
+                except (requests.exceptions.RequestException, ValueError, OSError, pymysql.err.DataError) as e:
+                    logger.warning('error processing %s: %s', durl, redact(e))
                     skipped += 1
-                    continue
-
-                # filename from content-disposition or infohash
-                filename = f"{info['info_hash']}.torrent"
-                out_file = os.path.join(opts.torrent_download_dir, filename)
-                with open(out_file, 'wb') as f:
-                    f.write(tbytes)
-
-                descr_html = extract_descr_html(dsoup)
-                description = extract_description(dsoup)
-                mediainfo = extract_mediainfo(dsoup)
-                print(f"  [DEBUG] descr_html length: {len(descr_html) if descr_html else 0}")
-                # imdb_url removed per new schema
-
-                basic = extract_basic_info(dsoup)
-                category = basic.get('category') or extract_text_from_td_sibling(dsoup, r'(类型|類型|类别|類別)[：:]?')
-                medium = basic.get('medium') or extract_text_from_td_sibling(dsoup, r'(媒介|音频类|音頻類|音訊類)[：:]?')
-                video_codec = basic.get('video_codec') or extract_text_from_td_sibling(dsoup, r'(编码|編碼|视频编码|視頻編碼|視訊編碼)[：:]?')
-                audiocodec = basic.get('audiocodec') or extract_text_from_td_sibling(dsoup, r'(音频编码|音頻編碼|音訊編碼)[：:]?')
-                standard = basic.get('standard') or extract_text_from_td_sibling(dsoup, r'(分辨率|解析度|标准|標準)[：:]?')
-                production_team = basic.get('production_team') or extract_text_from_td_sibling(dsoup, r'(制作组|製作組)[：:]?')
-                title = extract_title(dsoup)
-                tags = extract_tags(dsoup)
-                # times_completed is already extracted as 'completed'
-                # nfo and technical_info might require more specific selectors or patterns
-                # For now, let's assume they are not directly available as simple td siblings.
-
-                subtitle = extract_subtitle(dsoup)
-                if basic.get('size_bytes'):
-                    info['size'] = basic['size_bytes']
-
-                # seeders/leechers/completed removed per new schema
-
-                is_single_file = 1 if len(info['files']) == 1 else 0
-                record = {
-                    'name': info['name'],
-                    'info_hash': info['info_hash'],
-                    'meta_version': info['meta_version'],
-                    'size': info['size'],
-                    'saved_path': out_file,
-                    'category': category,
-                    'title': title,
-                    'introduction': subtitle,
-                    'description': description or '',
-                    'mediainfo': mediainfo or '',
-                    'crawl_site': opts.base_url,
-                    'medium': medium,
-                    'video_codec': video_codec,
-                    'standard': standard,
-                    'production_team': production_team,
-                    'audiocodec': audiocodec,
-                    'is_single_file': is_single_file,
-                    'multi_file_list': json.dumps(info['files'], ensure_ascii=False),
-                    'crawl_link': turl,
-                    'tags': tags,
-                }
-                if torrent_exists(db_conn, info['info_hash']):
-                    print(f"  [DB] Torrent with info_hash {info['info_hash']} already exists, skipping insert.")
-                else:
-                    save_torrent_to_db(db_conn, record)
-
-                # Verify data
-                retrieved_data = get_torrent_data(db_conn, info['info_hash'])
-                if retrieved_data:
-                    print(f"  [VERIFY] Tags: {retrieved_data['tags']}, Standard: {retrieved_data['standard']}")
-                else:
-                    print(f"  [VERIFY] Could not retrieve data for info_hash: {info['info_hash']}")
-                with open(meta_path, 'a', encoding='utf-8') as mf:
-                    mf.write(json.dumps(record, ensure_ascii=False) + '\n')
-
-                created += 1
-                print(f"  + saved {filename} | {info['name']}")
-                if opts.delay > 0:
-                    time.sleep(opts.delay)
-            except (requests.exceptions.RequestException, ValueError, OSError) as e:
-                print(f'  ! error: {e}')
-                skipped += 1
-        if stop_due_to_seen:
-            break
-        page += 1
+                    errors += 1
+                except BaseException:
+                    aborted = True
+                    raise
+                finally:
+                    if checkpoint and not aborted:
+                        checkpoint.done(durl, created, skipped)
+                    if progress is not None:
+                        progress.update(pages=pages_done, created=created, skipped=skipped, errors=errors)
+            if cancelled:
+                break
+            pages_done += 1
+            if progress is not None:
+                progress.update(pages=pages_done, created=created, skipped=skipped, errors=errors)
+            if stop_due_to_seen or detail_urls is not None:
+                break
+            page += 1
+            if checkpoint:
+                checkpoint.advance(page)
+    except BaseException as e:
+        if checkpoint:
+            checkpoint.finish('interrupted', created, skipped, error=str(e) or type(e).__name__)
+        if progress is not None:
+            progress.finish('interrupted', str(e) or type(e).__name__,
+                            pages=pages_done, created=created, skipped=skipped, errors=errors)
+        _finish_profile(profiler, opts, db_conn, checkpoint)
+        db_conn.close()
+        raise
+    cancel_reason = None
+    if cancelled:
+        run_status = 'cancelled'
+        cancel_reason = control.reason
+        logger.info('[STOP] %s', cancel_reason)
+    if checkpoint:
+        checkpoint.finish(run_status, created, skipped, error=cancel_reason)
+    if progress is not None:
+        progress.finish(run_status, cancel_reason, pages=pages_done, created=created, skipped=skipped, errors=errors)
+    profile_path = _finish_profile(profiler, opts, db_conn, checkpoint)
     db_conn.close()
-    print(f'done. created={created} skipped={skipped}')
-    return 0
+    if seen is not None:
+        save_seen_set(seen, out_dir)
+        logger.info('seen-set: %d entries, %d lookups, %d answered by bloom filter',
+                    len(seen), seen.lookups, seen.bloom_negatives)
+    stages = opts.tracer.summary()
+    logger.info('done. created=%d skipped=%d pages=%d retries=%d', created, skipped, pages_done, opts.fetcher.retries)
+    for stage, s in stages.items():
+        logger.info('  stage %-12s count=%d avg=%.1fms p50=%.1fms p99=%.1fms max=%.1fms',
+                    stage, s['count'], s['avg_ms'], s['p50_ms'], s['p99_ms'], s['max_ms'])
+    stats = getattr(opts, 'stats', None)
+    if isinstance(stats, dict):
+        stats.update(status=run_status, created=created, skipped=skipped, errors=errors, pages=pages_done, retries=opts.fetcher.retries, stages=stages)
+        if checkpoint:
+            stats['run_id'] = checkpoint.run_id
+        if profile_path:
+            stats['profile_path'] = profile_path
+    return created
 
 async def run_crawler(site_config: dict):
     opts = argparse.Namespace()
@@ -299,10 +736,13 @@ async def run_crawler(site_config: dict):
         opts.delay = 0.5
     if not hasattr(opts, 'allow_v2'):
         opts.allow_v2 = False
-    mysql_required_opts = ['db_host', 'db_port', 'db_user', 'db_password', 'db_name']
-    for opt in mysql_required_opts:
-        if not hasattr(opts, opt) or getattr(opts, opt) is None:
-            raise ValueError(f"Missing required MySQL configuration option: {opt}")
+    if not hasattr(opts, 'extract_fields'):
+        opts.extract_fields = resolve_fields(getattr(opts, 'extract_profile', None))
+    if getattr(opts, 'db_backend', 'mysql') != 'sqlite':
+        mysql_required_opts = ['db_host', 'db_port', 'db_user', 'db_password', 'db_name']
+        for opt in mysql_required_opts:
+            if not hasattr(opts, opt) or getattr(opts, opt) is None:
+                raise ValueError(f"Missing required MySQL configuration option: {opt}")
     await crawl(opts)
 
 def main():
@@ -330,12 +770,16 @@ def main():
         opts.delay = 0.5
     if not hasattr(opts, 'allow_v2'):
         opts.allow_v2 = False
+    if not hasattr(opts, 'extract_fields'):
+        opts.extract_fields = resolve_fields(getattr(opts, 'extract_profile', None))
 
-    mysql_required_opts = ['db_host', 'db_port', 'db_user', 'db_password', 'db_name']
-    for opt in mysql_required_opts:
-        if not hasattr(opts, opt) or getattr(opts, opt) is None:
-            raise ValueError(f"Missing required MySQL configuration option: {opt}")
+    if getattr(opts, 'db_backend', 'mysql') != 'sqlite':
+        mysql_required_opts = ['db_host', 'db_port', 'db_user', 'db_password', 'db_name']
+        for opt in mysql_required_opts:
+            if not hasattr(opts, opt) or getattr(opts, opt) is None:
+                raise ValueError(f"Missing required MySQL configuration option: {opt}")
 
+    setup_logging(getattr(opts, 'log_level', None), getattr(opts, 'log_file', None))
     asyncio.run(crawl(opts))
 
 if __name__ == '__main__':
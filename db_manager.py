@@ -1,57 +1,17 @@
 import pymysql
 import pymysql.cursors
+import threading
 import time
 
-def init_db(db_config: dict):
-    conn = pymysql.connect(
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS torrents (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            info_hash VARCHAR(64) UNIQUE,
-            name TEXT,
-            title TEXT,
-            introduction TEXT,
-            description LONGTEXT,
-            mediainfo LONGTEXT,
-            category TEXT,
-            medium TEXT,
-            video_codec TEXT,
-            audiocodec TEXT,
-            standard TEXT,
-            production_team TEXT,
-            size BIGINT,
-            is_single_file TINYINT(1),
-            is_upload TINYINT(1) DEFAULT 0,
-            multi_file_list LONGTEXT,
-            crawl_site TEXT,
-            crawl_link TEXT,
-            saved_path TEXT,
-            meta_version VARCHAR(10),
-            crawledAt DATETIME DEFAULT CURRENT_TIMESTAMP,
-            tags TEXT
-        )''')
-    conn.commit()
-    conn.close()
+import storage
+from config_manager import bump_settings_version
+from tracing import get_logger
 
-def ensure_torrents_table(db_config: dict):
-    conn = pymysql.connect(
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
-    cursor = conn.cursor()
-    cursor.execute('''
+logger = get_logger('db')
+
+# 表结构注册表：CREATE TABLE 语句包含全部最新列，新建的表无需再执行 ALTER
+TABLE_DEFINITIONS = {
+    'torrents': '''
         CREATE TABLE IF NOT EXISTS torrents (
             id INT AUTO_INCREMENT PRIMARY KEY,
             info_hash VARCHAR(64) UNIQUE,
@@ -75,78 +35,11 @@ def ensure_torrents_table(db_config: dict):
             saved_path TEXT,
             meta_version VARCHAR(10),
             crawledAt DATETIME DEFAULT CURRENT_TIMESTAMP,
-            tags TEXT
-        )''')
-    conn.commit()
-    conn.close()
-
-def ensure_torrents_is_upload(db_config: dict):
-    conn = pymysql.connect(
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
-    cursor = conn.cursor()
-    cursor.execute("SHOW COLUMNS FROM torrents LIKE 'is_upload'")
-    row = cursor.fetchone()
-    if not row:
-        cursor.execute("ALTER TABLE torrents ADD COLUMN is_upload TINYINT(1) DEFAULT 0")
-        conn.commit()
-    conn.close()
-
-def ensure_torrents_crawled_at(db_config: dict):
-    conn = pymysql.connect(
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
-    cursor = conn.cursor()
-    cursor.execute("SHOW COLUMNS FROM torrents LIKE 'crawledAt'")
-    row = cursor.fetchone()
-    if not row:
-        cursor.execute("ALTER TABLE torrents ADD COLUMN crawledAt DATETIME DEFAULT CURRENT_TIMESTAMP")
-        conn.commit()
-    else:
-        cursor.execute("ALTER TABLE torrents MODIFY crawledAt DATETIME DEFAULT CURRENT_TIMESTAMP")
-        conn.commit()
-    conn.close()
-
-def ensure_torrents_mediainfo(db_config: dict):
-    conn = pymysql.connect(
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
-    cursor = conn.cursor()
-    cursor.execute("SHOW COLUMNS FROM torrents LIKE 'mediainfo'")
-    row = cursor.fetchone()
-    if not row:
-        cursor.execute("ALTER TABLE torrents ADD COLUMN mediainfo LONGTEXT")
-        conn.commit()
-    conn.close()
-
-def init_site_task_tables(db_config: dict):
-    conn = pymysql.connect(
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
-    cursor = conn.cursor()
-    
-    # 创建 sites 表
-    cursor.execute('''
+            tags TEXT,
+            promotion VARCHAR(32),
+            promotion_until DATETIME
+        )''',
+    'sites': '''
         CREATE TABLE IF NOT EXISTS sites (
             id INT AUTO_INCREMENT PRIMARY KEY,
             base_url TEXT,
@@ -154,16 +47,15 @@ def init_site_task_tables(db_config: dict):
             cookie TEXT,
             user_agent TEXT,
             out_dir TEXT,
-            torrent_download_dir TEXT
-        )''')
-    
-    # 检查并添加 name 字段
-    cursor.execute("SHOW COLUMNS FROM sites LIKE 'name'")
-    if not cursor.fetchone():
-        cursor.execute("ALTER TABLE sites ADD COLUMN name TEXT")
-    
-    # 创建 tasks 表
-    cursor.execute('''
+            torrent_download_dir TEXT,
+            name TEXT,
+            active TINYINT(1) DEFAULT 1,
+            extract_profile VARCHAR(255),
+            adapter TEXT,
+            feed_url TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )''',
+    'tasks': '''
         CREATE TABLE IF NOT EXISTS tasks (
             id INT AUTO_INCREMENT PRIMARY KEY,
             site_id INT,
@@ -171,25 +63,240 @@ def init_site_task_tables(db_config: dict):
             schedule_type VARCHAR(20),
             schedule_value TEXT,
             status VARCHAR(20) DEFAULT 'inactive',
-            last_run DATETIME
-        )''')
-    # 添加 start_page 字段（如不存在）
-    cursor.execute("SHOW COLUMNS FROM tasks LIKE 'start_page'")
-    if not cursor.fetchone():
-        cursor.execute("ALTER TABLE tasks ADD COLUMN start_page INT DEFAULT 1")
-    
-    # 创建 settings 表
-    cursor.execute('''
+            last_run DATETIME,
+            start_page INT DEFAULT 1,
+            extract_profile VARCHAR(255),
+            max_runtime INT,
+            max_items INT
+        )''',
+    'settings': '''
         CREATE TABLE IF NOT EXISTS settings (
             id INT AUTO_INCREMENT PRIMARY KEY,
             key_name VARCHAR(100) UNIQUE,
             value TEXT,
             description TEXT
-        )''')
-    
+        )''',
+    'system_settings': '''
+        CREATE TABLE IF NOT EXISTS system_settings (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            setting_key VARCHAR(100) UNIQUE NOT NULL,
+            setting_value TEXT,
+            setting_type VARCHAR(50) DEFAULT 'string',
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_setting_key (setting_key)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci''',
+    # 分布式抓取工作单元：页码区间（pages）或单个种子 id（torrent）
+    'crawl_work_units': '''
+        CREATE TABLE IF NOT EXISTS crawl_work_units (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            site_id INT NOT NULL,
+            unit_type VARCHAR(16) NOT NULL,
+            page_start INT NOT NULL DEFAULT 0,
+            page_end INT NOT NULL DEFAULT 0,
+            torrent_id VARCHAR(64) NOT NULL DEFAULT '',
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            lease_owner VARCHAR(128),
+            lease_expires_at DATETIME,
+            heartbeat_at DATETIME,
+            attempts INT NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY uniq_unit (site_id, unit_type, page_start, page_end, torrent_id),
+            KEY idx_status_lease (status, lease_expires_at)
+        )''',
+    # 抓取运行历史与检查点
+    'crawl_runs': '''
+        CREATE TABLE IF NOT EXISTS crawl_runs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            run_key VARCHAR(255) NOT NULL,
+            task_id INT,
+            site_id INT,
+            status VARCHAR(20) NOT NULL DEFAULT 'running',
+            start_page INT DEFAULT 1,
+            current_page INT DEFAULT 1,
+            frontier MEDIUMTEXT,
+            inflight MEDIUMTEXT,
+            created INT DEFAULT 0,
+            skipped INT DEFAULT 0,
+            resumed_count INT DEFAULT 0,
+            error TEXT,
+            profile_path VARCHAR(512),
+            started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            checkpoint_at DATETIME,
+            finished_at DATETIME,
+            KEY idx_run_key_status (run_key, status),
+            KEY idx_task_id (task_id)
+        )''',
+    'torrent_files': '''
+        CREATE TABLE IF NOT EXISTS torrent_files (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            info_hash VARCHAR(64) NOT NULL,
+            file_index INT NOT NULL,
+            path VARCHAR(1024) NOT NULL,
+            file_name VARCHAR(255) NOT NULL,
+            extension VARCHAR(32) NOT NULL DEFAULT '',
+            length BIGINT NOT NULL DEFAULT 0,
+            UNIQUE KEY uk_info_hash_index (info_hash, file_index),
+            KEY idx_file_name (file_name),
+            KEY idx_path (path(255)),
+            KEY idx_extension_length (extension, length)
+        )''',
+}
+
+# 旧版本库中可能缺失的列：(表, 列, 列定义)
+COLUMN_MIGRATIONS = [
+    ('torrents', 'is_upload', 'TINYINT(1) DEFAULT 0'),
+    ('torrents', 'crawledAt', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ('torrents', 'mediainfo', 'LONGTEXT'),
+    ('sites', 'name', 'TEXT'),
+    ('sites', 'active', 'TINYINT(1) DEFAULT 1'),
+    ('tasks', 'start_page', 'INT DEFAULT 1'),
+    ('sites', 'extract_profile', 'VARCHAR(255)'),
+    ('tasks', 'extract_profile', 'VARCHAR(255)'),
+    ('sites', 'adapter', 'TEXT'),
+    ('crawl_runs', 'profile_path', 'VARCHAR(512)'),
+    ('tasks', 'max_runtime', 'INT'),
+    ('tasks', 'max_items', 'INT'),
+    ('sites', 'updated_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
+    ('torrents', 'promotion', 'VARCHAR(32)'),
+    ('torrents', 'promotion_until', 'DATETIME'),
+    ('sites', 'feed_url', 'TEXT'),
+]
+
+_schema_lock = threading.Lock()
+_schema_ready: set[tuple] = set()
+
+
+def _connect(db_config: dict) -> pymysql.connections.Connection:
+    return storage.connect(db_config)
+
+
+def _create_table(db_config: dict, table: str):
+    conn = _connect(db_config)
+    cursor = conn.cursor()
+    if storage.backend_of(db_config) == 'sqlite':
+        for statement in storage.sqlite_ddl(TABLE_DEFINITIONS[table]):
+            cursor.execute(statement)
+    else:
+        cursor.execute(TABLE_DEFINITIONS[table])
     conn.commit()
     conn.close()
 
+
+def _bootstrap_sqlite(conn, tables: list[str]) -> dict:
+    """
+    SQLite 版本：按 pragma_table_info 检查，缺失的表与索引按 sqlite_ddl 创建，缺失列逐列 ADD COLUMN
+    """
+    summary = {'created': [], 'altered': []}
+    cursor = conn.cursor()
+    for table in tables:
+        columns = storage.table_columns(conn, table)
+        if not columns:
+            for statement in storage.sqlite_ddl(TABLE_DEFINITIONS[table]):
+                cursor.execute(statement)
+            summary['created'].append(table)
+            continue
+        for t, column, ddl in COLUMN_MIGRATIONS:
+            if t == table and column not in columns:
+                clause = f"ADD COLUMN {column} {storage.sqlite_column(ddl, alter=True)}"
+                cursor.execute(f"ALTER TABLE {table} {clause}")
+                if 'ON UPDATE' in ddl.upper():
+                    cursor.execute(storage.touch_trigger(table, column))
+                summary['altered'].append(f"{table}: {clause}")
+    conn.flush()
+    return summary
+
+
+def bootstrap_schema(db_config: dict, tables: list[str] | None = None) -> dict:
+    """
+    单连接、单次 information_schema 查询检查表结构，只执行缺失的 DDL：
+    - 缺失的表按 TABLE_DEFINITIONS 创建
+    - 已存在的表按 COLUMN_MIGRATIONS 补齐缺失列（同一张表的多个列合并为一条 ALTER）
+    - crawledAt 仅在默认值不是 CURRENT_TIMESTAMP 时才 MODIFY，避免每次启动重建大表
+    返回 {'created': [...], 'altered': [...]}
+    """
+    tables = list(tables or TABLE_DEFINITIONS.keys())
+    conn = _connect(db_config)
+    if storage.backend_of(db_config) == 'sqlite':
+        try:
+            return _bootstrap_sqlite(conn, tables)
+        finally:
+            conn.close()
+    summary = {'created': [], 'altered': []}
+    try:
+        cursor = conn.cursor()
+        placeholders = ', '.join(['%s'] * len(tables))
+        cursor.execute(
+            f"""SELECT TABLE_NAME, COLUMN_NAME, COLUMN_DEFAULT FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})""",
+            tables,
+        )
+        existing: dict[str, dict[str, str | None]] = {}
+        for row in cursor.fetchall():
+            existing.setdefault(row['TABLE_NAME'], {})[row['COLUMN_NAME']] = row['COLUMN_DEFAULT']
+
+        for table in tables:
+            if table not in existing:
+                cursor.execute(TABLE_DEFINITIONS[table])
+                summary['created'].append(table)
+
+        pending: dict[str, list[str]] = {}
+        for table, column, ddl in COLUMN_MIGRATIONS:
+            if table in existing and column not in existing[table]:
+                pending.setdefault(table, []).append(f"ADD COLUMN {column} {ddl}")
+        crawled_default = existing.get('torrents', {}).get('crawledAt', 'CURRENT_TIMESTAMP')
+        if 'torrents' in existing and 'crawledAt' in existing['torrents'] and \
+                'current_timestamp' not in str(crawled_default or '').lower():
+            pending.setdefault('torrents', []).append("MODIFY crawledAt DATETIME DEFAULT CURRENT_TIMESTAMP")
+        for table, clauses in pending.items():
+            cursor.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+            summary['altered'].append(f"{table}: {', '.join(clauses)}")
+        conn.commit()
+    finally:
+        conn.close()
+    return summary
+
+
+def ensure_schema(db_config: dict):
+    """
+    进程内只执行一次 bootstrap_schema，之后直接返回
+    """
+    key = storage.config_key(db_config)
+    if key in _schema_ready:
+        return
+    with _schema_lock:
+        if key not in _schema_ready:
+            bootstrap_schema(db_config)
+            _schema_ready.add(key)
+
+
+def init_db(db_config: dict):
+    _create_table(db_config, 'torrents')
+
+def ensure_torrents_table(db_config: dict):
+    _create_table(db_config, 'torrents')
+
+def ensure_torrents_is_upload(db_config: dict):
+    bootstrap_schema(db_config, ['torrents'])
+
+def ensure_torrents_crawled_at(db_config: dict):
+    bootstrap_schema(db_config, ['torrents'])
+
+def ensure_torrents_mediainfo(db_config: dict):
+    bootstrap_schema(db_config, ['torrents'])
+
+def ensure_work_queue_table(db_config: dict):
+    _create_table(db_config, 'crawl_work_units')
+
+def ensure_crawl_runs_table(db_config: dict):
+    _create_table(db_config, 'crawl_runs')
+
+def init_site_task_tables(db_config: dict):
+    bootstrap_schema(db_config, ['sites', 'tasks', 'settings'])
+
 def add_site(db_conn: pymysql.connections.Connection, site: dict) -> int:
     cursor = db_conn.cursor()
     cols = ['name','base_url','list_path','cookie']
@@ -199,6 +306,18 @@ def add_site(db_conn: pymysql.connections.Connection, site: dict) -> int:
     if site.get('user_agent') is not None:
         cols.append('user_agent')
         vals.append(site.get('user_agent'))
+    if site.get('active') is not None:
+        cols.append('active')
+        vals.append(1 if site.get('active') else 0)
+    if site.get('extract_profile'):
+        cols.append('extract_profile')
+        vals.append(site.get('extract_profile'))
+    if site.get('adapter'):
+        cols.append('adapter')
+        vals.append(site.get('adapter'))
+    if site.get('feed_url'):
+        cols.append('feed_url')
+        vals.append(site.get('feed_url'))
     
     sql = f"INSERT INTO sites ({', '.join(cols)}) VALUES ({', '.join(['%s']*len(cols))})"
     cursor.execute(sql, vals)
@@ -210,11 +329,21 @@ def list_sites(db_conn: pymysql.connections.Connection):
     cursor.execute("SELECT * FROM sites ORDER BY id DESC")
     return cursor.fetchall()
 
+def list_active_sites(db_conn: pymysql.connections.Connection):
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT * FROM sites WHERE active IS NULL OR active = 1 ORDER BY id")
+    return cursor.fetchall()
+
 def get_site(db_conn: pymysql.connections.Connection, site_id: int):
     cursor = db_conn.cursor()
     cursor.execute("SELECT * FROM sites WHERE id = %s", (site_id,))
     return cursor.fetchone()
 
+def get_task(db_conn: pymysql.connections.Connection, task_id: int):
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
+    return cursor.fetchone()
+
 def add_task(db_conn: pymysql.connections.Connection, task: dict) -> int:
     cursor = db_conn.cursor()
     cols = ['site_id','name','schedule_type','schedule_value','status']
@@ -222,11 +351,38 @@ def add_task(db_conn: pymysql.connections.Connection, task: dict) -> int:
     if 'start_page' in task and task.get('start_page') is not None:
         cols.append('start_page')
         vals.append(int(task.get('start_page') or 1))
+    if task.get('extract_profile'):
+        cols.append('extract_profile')
+        vals.append(task.get('extract_profile'))
+    # 运行预算：max_runtime 为秒数，max_items 为新增种子数，0 或空表示不限制
+    for key in ('max_runtime', 'max_items'):
+        if task.get(key) is not None:
+            cols.append(key)
+            vals.append(int(task.get(key) or 0))
     sql = f"INSERT INTO tasks ({', '.join(cols)}) VALUES ({', '.join(['%s']*len(cols))})"
     cursor.execute(sql, vals)
     db_conn.commit()
     return cursor.lastrowid
 
+def list_runs(db_conn: pymysql.connections.Connection, task_id: int | None = None, limit: int = 50):
+    cursor = db_conn.cursor()
+    cols = "id, run_key, task_id, site_id, status, start_page, current_page, created, skipped, resumed_count, error, profile_path, started_at, checkpoint_at, finished_at"
+    if task_id is not None:
+        cursor.execute(f"SELECT {cols} FROM crawl_runs WHERE task_id = %s ORDER BY id DESC LIMIT %s", (task_id, limit))
+    else:
+        cursor.execute(f"SELECT {cols} FROM crawl_runs ORDER BY id DESC LIMIT %s", (limit,))
+    return cursor.fetchall()
+
+def get_run(db_conn: pymysql.connections.Connection, run_id: int):
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT * FROM crawl_runs WHERE id = %s", (run_id,))
+    return cursor.fetchone()
+
+def set_run_profile(db_conn: pymysql.connections.Connection, run_id: int, profile_path: str):
+    cursor = db_conn.cursor()
+    cursor.execute("UPDATE crawl_runs SET profile_path = %s WHERE id = %s", (profile_path, run_id))
+    db_conn.commit()
+
 def list_tasks(db_conn: pymysql.connections.Connection):
     cursor = db_conn.cursor()
     cursor.execute("SELECT * FROM tasks ORDER BY id DESC")
@@ -238,6 +394,9 @@ def update_task(db_conn: pymysql.connections.Connection, task_id: int, task_data
     values = []
     for key, value in task_data.items():
         if key != 'id':  # 不允许更新ID
+            # 未提供提取配置时保留原值；传空字符串表示清除任务级配置
+            if key in ('extract_profile', 'max_runtime', 'max_items') and value is None:
+                continue
             fields.append(f"{key} = %s")
             values.append(value)
     values.append(task_id)
@@ -261,8 +420,8 @@ def update_site(db_conn: pymysql.connections.Connection, site_id: int, site_data
     values = []
     for key, value in site_data.items():
         if key != 'id':  # 不允许更新ID
-            # 如果user_agent为None，跳过更新这个字段
-            if key == 'user_agent' and value is None:
+            # 如果user_agent/active/extract_profile/adapter/feed_url为None，跳过更新这个字段
+            if key in ('user_agent', 'active', 'extract_profile', 'adapter', 'feed_url') and value is None:
                 continue
             fields.append(f"{key} = %s")
             values.append(value)
@@ -272,6 +431,8 @@ def update_site(db_conn: pymysql.connections.Connection, site_id: int, site_data
         sql = f"UPDATE sites SET {', '.join(fields)} WHERE id = %s"
         cursor.execute(sql, values)
         db_conn.commit()
+        # 通知本进程中运行的抓取重新加载站点配置（cookie 等）
+        bump_settings_version()
         return cursor.rowcount > 0
     return False
 
@@ -300,6 +461,8 @@ def update_torrent(db_conn: pymysql.connections.Connection, torrent_id: int, tor
 
 def delete_torrent(db_conn: pymysql.connections.Connection, torrent_id: int) -> bool:
     cursor = db_conn.cursor()
+    cursor.execute("DELETE FROM torrent_files WHERE info_hash = (SELECT info_hash FROM torrents WHERE id = %s)",
+                   (torrent_id,))
     cursor.execute("DELETE FROM torrents WHERE id = %s", (torrent_id,))
     db_conn.commit()
     return cursor.rowcount > 0
@@ -340,13 +503,106 @@ def crawl_link_exists(db_conn: pymysql.connections.Connection, crawl_link: str)
     """, (crawl_link,))
     return cursor.fetchone() is not None
 
-def save_torrent_to_db(db_conn: pymysql.connections.Connection, record: dict):
+VIDEO_EXTENSIONS = ('mkv', 'mp4', 'ts', 'm2ts', 'avi', 'wmv', 'mov', 'flv', 'rmvb', 'webm', 'iso')
+
+def torrent_file_rows(info_hash: str, files: list[dict]) -> list[tuple]:
+    """
+    将 parse_torrent 的 files 列表转换为 torrent_files 的行
+    """
+    rows = []
+    for index, f in enumerate(files):
+        path = (f.get('path') or '')[:1024]
+        file_name = path.rsplit('/', 1)[-1][:255]
+        ext = file_name.rsplit('.', 1)[-1].lower()[:32] if '.' in file_name else ''
+        rows.append((info_hash, index, path, file_name, ext, int(f.get('length') or 0)))
+    return rows
+
+def save_torrent_files(db_conn: pymysql.connections.Connection, rows: list[tuple], commit: bool = True) -> int:
+    """
+    批量写入文件行（executemany 会合并为多行 INSERT），已存在的 (info_hash, file_index) 忽略
+    """
+    if not rows:
+        return 0
+    cursor = db_conn.cursor()
+    cursor.executemany(
+        """INSERT IGNORE INTO torrent_files (info_hash, file_index, path, file_name, extension, length)
+           VALUES (%s, %s, %s, %s, %s, %s)""",
+        rows,
+    )
+    if commit:
+        db_conn.commit()
+    return cursor.rowcount
+
+def list_torrent_files(db_conn: pymysql.connections.Connection, info_hash: str):
+    cursor = db_conn.cursor()
+    cursor.execute(
+        "SELECT file_index, path, file_name, extension, length FROM torrent_files WHERE info_hash = %s ORDER BY file_index",
+        (info_hash,),
+    )
+    return cursor.fetchall()
+
+def torrent_file_stats(db_conn: pymysql.connections.Connection, info_hash: str) -> dict:
+    """
+    单个种子的文件统计：文件数、总大小、最大文件与视频文件数（剧集数）
+    """
+    cursor = db_conn.cursor()
+    placeholders = ', '.join(['%s'] * len(VIDEO_EXTENSIONS))
+    cursor.execute(
+        f"""SELECT COUNT(*) AS file_count, COALESCE(SUM(length), 0) AS total_length,
+                   SUM(extension IN ({placeholders})) AS episode_count
+            FROM torrent_files WHERE info_hash = %s""",
+        (*VIDEO_EXTENSIONS, info_hash),
+    )
+    stats = cursor.fetchone()
+    cursor.execute(
+        "SELECT path, length FROM torrent_files WHERE info_hash = %s ORDER BY length DESC LIMIT 1",
+        (info_hash,),
+    )
+    stats['largest_file'] = cursor.fetchone()
+    stats['total_length'] = int(stats['total_length'] or 0)
+    stats['episode_count'] = int(stats['episode_count'] or 0)
+    return stats
+
+def search_torrent_files(db_conn: pymysql.connections.Connection, name: str | None = None,
+                         extension: str | None = None, min_length: int | None = None, limit: int = 50):
+    """
+    按文件名（精确或前缀，末尾加 * 表示前缀）、扩展名与最小大小查找文件，结果带所属种子
+    """
+    where = []
+    params: list = []
+    if name:
+        if name.endswith('*'):
+            where.append("f.file_name LIKE %s")
+            params.append(name[:-1].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        else:
+            where.append("f.file_name = %s")
+            params.append(name)
+    if extension:
+        where.append("f.extension = %s")
+        params.append(extension.lower().lstrip('.'))
+    if min_length:
+        where.append("f.length >= %s")
+        params.append(int(min_length))
+    sql = """SELECT f.info_hash, f.path, f.file_name, f.extension, f.length, t.id AS torrent_id, t.name AS torrent_name
+             FROM torrent_files f LEFT JOIN torrents t ON t.info_hash = f.info_hash"""
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY f.length DESC LIMIT %s"
+    params.append(int(limit))
+    cursor = db_conn.cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+def save_torrent_to_db(db_conn: pymysql.connections.Connection, record: dict) -> bool:
+    """
+    写入一条种子记录：插入成功返回 True，info_hash 已存在返回 False；其他数据库错误记录日志后抛出
+    """
     cursor = db_conn.cursor()
     try:
-        base_cols = ['info_hash','name','title','introduction','description','mediainfo','category','medium','video_codec','audiocodec','standard','production_team','size','is_single_file','is_upload','multi_file_list','crawl_site','crawl_link','saved_path','meta_version','tags']
+        base_cols = ['info_hash','name','title','introduction','description','mediainfo','category','medium','video_codec','audiocodec','standard','production_team','size','is_single_file','is_upload','multi_file_list','crawl_site','crawl_link','saved_path','meta_version','promotion','promotion_until','tags']
         use_crawled = bool(record.get('crawledAt'))
         cols = base_cols[:]
-        values = [record.get('info_hash'), record.get('name'), record.get('title', ''), record.get('introduction', ''), record.get('description', ''), record.get('mediainfo', ''), record.get('category', ''), record.get('medium', ''), record.get('video_codec', ''), record.get('audiocodec', ''), record.get('standard', ''), record.get('production_team', ''), record.get('size'), record.get('is_single_file', 0), record.get('is_upload', 0), record.get('multi_file_list', ''), record.get('crawl_site', ''), record.get('crawl_link', ''), record.get('saved_path'), record.get('meta_version'), record.get('tags', '')]
+        values = [record.get('info_hash'), record.get('name'), record.get('title', ''), record.get('introduction', ''), record.get('description', ''), record.get('mediainfo', ''), record.get('category', ''), record.get('medium', ''), record.get('video_codec', ''), record.get('audiocodec', ''), record.get('standard', ''), record.get('production_team', ''), record.get('size'), record.get('is_single_file', 0), record.get('is_upload', 0), record.get('multi_file_list', ''), record.get('crawl_site', ''), record.get('crawl_link', ''), record.get('saved_path'), record.get('meta_version'), record.get('promotion'), record.get('promotion_until'), record.get('tags', '')]
         if use_crawled:
             cols.insert(-1, 'crawledAt')
             values.insert(-1, record.get('crawledAt'))
@@ -354,8 +610,34 @@ def save_torrent_to_db(db_conn: pymysql.connections.Connection, record: dict):
         sql = f"INSERT INTO torrents ({', '.join(cols)}) VALUES ({placeholders})"
         cursor.execute(sql, values)
         db_conn.commit()
-        print(f"  [DB] Saved {record.get('name')} to database.")
+        logger.debug("[DB] Saved %s to database.", record.get('name'))
+        return True
     except pymysql.err.IntegrityError:
-        print(f"  [DB] Torrent with info_hash {record.get('info_hash')} already exists, skipping.")
-    except Exception as e:
-        print(f"  [DB] Error saving {record.get('name')} to database: {e}")
+        logger.debug("[DB] Torrent with info_hash %s already exists, skipping.", record.get('info_hash'))
+        return False
+    except pymysql.err.Error as e:
+        logger.error("[DB] Error saving %s to database: %s", record.get('name'), e)
+        raise
+
+TORRENT_INSERT_COLUMNS = ['info_hash','name','title','introduction','description','mediainfo','category','medium','video_codec','audiocodec','standard','production_team','size','is_single_file','is_upload','multi_file_list','crawl_site','crawl_link','saved_path','meta_version','promotion','promotion_until','tags']
+_TORRENT_NULLABLE = ('info_hash', 'name', 'size', 'saved_path', 'meta_version', 'promotion', 'promotion_until')
+
+def bulk_save_torrents(db_conn: pymysql.connections.Connection, records: list[dict]) -> int:
+    """
+    多行 INSERT IGNORE 批量写入种子记录（已存在的 info_hash 跳过），返回实际插入的行数
+    """
+    if not records:
+        return 0
+    rows = []
+    for record in records:
+        rows.append([
+            record.get(c) if c in _TORRENT_NULLABLE else record.get(c, 0 if c in ('is_single_file', 'is_upload') else '')
+            for c in TORRENT_INSERT_COLUMNS
+        ])
+    cursor = db_conn.cursor()
+    cursor.executemany(
+        f"INSERT IGNORE INTO torrents ({', '.join(TORRENT_INSERT_COLUMNS)}) VALUES ({', '.join(['%s'] * len(TORRENT_INSERT_COLUMNS))})",
+        rows,
+    )
+    db_conn.commit()
+    return cursor.rowcount
@@ -0,0 +1,139 @@
+"""API 数据访问层：连接池 + 专用线程池。
+
+FastAPI 的 async 端点直接调用 pymysql 会阻塞事件循环，一个慢查询（如大表上的 /torrents）会拖住所有并发请求。
+端点改为 `await pool.run(fn, *args)`：fn(conn, *args) 在专用线程池中执行，连接从池中借出、用完归还；
+自行建连的同步函数（如 config_manager.get_system_setting）用 `await pool.run_blocking(fn, *args)`。
+线程数与连接数相同，并发超过池大小时在线程池中排队，数据库连接数有上限。
+"""
+import asyncio
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pymysql
+
+import storage
+from tracing import get_logger
+
+logger = get_logger('db_pool')
+
+
+class DatabaseUnavailable(RuntimeError):
+    """无法建立数据库连接"""
+
+
+class ConnectionPool:
+    """
+    线程安全的连接池：空闲连接后进先出复用；空闲超过 ping_interval 秒的连接借出前 ping 一次，
+    存活超过 recycle 秒的连接重建；执行中出现连接类错误的连接直接丢弃
+    """
+
+    def __init__(self, db_config: dict, size: int = 8, connect_timeout: int = 5,
+                 ping_interval: float = 30.0, recycle: float = 3600.0):
+        self.db_config = db_config
+        self.size = max(1, int(size))
+        self.connect_timeout = connect_timeout
+        self.ping_interval = ping_interval
+        self.recycle = recycle
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='db')
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+    def _create(self):
+        try:
+            conn = storage.connect(self.db_config, connect_timeout=self.connect_timeout)
+        except Exception as e:
+            raise DatabaseUnavailable(f"数据库连接失败: {e}") from e
+        self.stats['created'] += 1
+        now = time.monotonic()
+        return [conn, now, now]
+
+    def _checkout(self):
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create()
+            conn, created, last_used = entry
+            now = time.monotonic()
+            if now - created > self.recycle:
+                self._close(conn)
+                continue
+            if now - last_used > self.ping_interval:
+                try:
+                    conn.ping(reconnect=True)
+                except pymysql.err.Error:
+                    self._close(conn)
+                    continue
+            self.stats['reused'] += 1
+            return entry
+
+    def _checkin(self, entry):
+        conn = entry[0]
+        try:
+            # 结束本次借用中的事务：SQLite 提交批量写入，MySQL 回滚未提交的读快照
+            if isinstance(conn, storage.SQLiteConnection):
+                conn.flush()
+            else:
+                conn.rollback()
+        except pymysql.err.Error:
+            self._close(conn)
+            return
+        entry[2] = time.monotonic()
+        self._idle.put(entry)
+
+    def _close(self, conn):
+        self.stats['discarded'] += 1
+        logger.debug('丢弃连接 %r', conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接（同步），用完自动归还"""
+        self._slots.acquire()
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry[0]
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            if entry is not None:
+                self._close(entry[0])
+                entry = None
+            raise
+        finally:
+            if entry is not None:
+                self._checkin(entry)
+            self._slots.release()
+
+    def _call(self, fn, args, kwargs):
+        with self.connection() as conn:
+            return fn(conn, *args, **kwargs)
+
+    async def run(self, fn, *args, **kwargs):
+        """在线程池中执行 fn(conn, *args, **kwargs)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._call, fn, args, kwargs))
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """在同一线程池中执行不需要池连接的阻塞函数"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                conn = self._idle.get_nowait()[0]
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
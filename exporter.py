@@ -0,0 +1,259 @@
+"""种子库的流式导出：NDJSON / CSV / Parquet。
+
+使用服务端游标（SSDictCursor）逐批取行并逐块编码输出，内存占用与导出行数无关。
+Parquet 需要安装 pyarrow，未安装时只支持 NDJSON 与 CSV。
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+import pymysql
+import pymysql.cursors
+
+from config_manager import get_database_config
+import storage
+from tracing import get_logger, setup_logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = get_logger('exporter')
+
+# 可导出的列及其 Parquet 类型（None 为字符串）
+EXPORT_COLUMNS = {
+    'id': 'int64',
+    'info_hash': None,
+    'name': None,
+    'title': None,
+    'introduction': None,
+    'description': None,
+    'mediainfo': None,
+    'category': None,
+    'medium': None,
+    'video_codec': None,
+    'audiocodec': None,
+    'standard': None,
+    'production_team': None,
+    'size': 'int64',
+    'is_single_file': 'int8',
+    'is_upload': 'int8',
+    'multi_file_list': None,
+    'crawl_site': None,
+    'crawl_link': None,
+    'saved_path': None,
+    'meta_version': None,
+    'crawledAt': 'timestamp',
+    'tags': None,
+    'promotion': None,
+    'promotion_until': 'timestamp',
+}
+
+# 默认不导出体积大的长文本列，需要时通过 columns 显式指定
+DEFAULT_COLUMNS = [c for c in EXPORT_COLUMNS if c not in ('description', 'mediainfo', 'multi_file_list')]
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+FETCH_SIZE = 1000
+
+
+def parse_columns(columns: str | list[str] | None) -> list[str]:
+    if not columns:
+        return list(DEFAULT_COLUMNS)
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(',') if c.strip()]
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"不支持的列: {', '.join(unknown)}")
+    return list(dict.fromkeys(columns))
+
+
+def build_query(columns: list[str], filters: dict | None = None) -> tuple[str, list]:
+    """
+    filters 支持：crawl_site、category、is_upload、since / until（crawledAt 范围）、min_id / max_id
+    """
+    filters = filters or {}
+    where = []
+    params: list = []
+    for key in ('crawl_site', 'category'):
+        if filters.get(key):
+            where.append(f"{key} = %s")
+            params.append(filters[key])
+    if filters.get('is_upload') is not None:
+        where.append("is_upload = %s")
+        params.append(1 if filters['is_upload'] else 0)
+    if filters.get('since'):
+        where.append("crawledAt >= %s")
+        params.append(filters['since'])
+    if filters.get('until'):
+        where.append("crawledAt < %s")
+        params.append(filters['until'])
+    if filters.get('min_id') is not None:
+        where.append("id >= %s")
+        params.append(int(filters['min_id']))
+    if filters.get('max_id') is not None:
+        where.append("id <= %s")
+        params.append(int(filters['max_id']))
+    sql = f"SELECT {', '.join(columns)} FROM torrents"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id"
+    return sql, params
+
+
+def iter_batches(db_config: dict, columns: list[str], filters: dict | None = None, batch_size: int = FETCH_SIZE):
+    """
+    以服务端游标流式读取，每次产出最多 batch_size 行
+    """
+    sql, params = build_query(columns, filters)
+    conn = storage.connect(db_config, cursorclass=pymysql.cursors.SSDictCursor)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    raise TypeError(f'无法序列化 {type(value).__name__}')
+
+
+def _encode_ndjson(batches, columns):
+    for rows in batches:
+        yield ''.join(json.dumps(row, ensure_ascii=False, default=_json_default) + '\n' for row in rows).encode('utf-8')
+
+
+def _encode_csv(batches, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    # 带 BOM，便于 Excel 直接打开
+    yield ('\ufeff' + buf.getvalue()).encode('utf-8')
+    for rows in batches:
+        buf.seek(0)
+        buf.truncate()
+        for row in rows:
+            writer.writerow(['' if row[c] is None else row[c] for c in columns])
+        yield buf.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 的输出目标：缓存写入的字节，由生成器按块取走"""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = bytes(b)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema(columns):
+    types = {'int64': pa.int64(), 'int8': pa.int8(), 'timestamp': pa.timestamp('s'), None: pa.string()}
+    return pa.schema([(c, types[EXPORT_COLUMNS[c]]) for c in columns])
+
+
+def _encode_parquet(batches, columns):
+    schema = _parquet_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in batches:
+            # 每批写为一个 row group，写完即把已编码的字节交给调用方
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            data = sink.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.take()
+    if data:
+        yield data
+
+
+def export_stream(db_config: dict, fmt: str = 'ndjson', columns: str | list[str] | None = None,
+                  filters: dict | None = None, batch_size: int = FETCH_SIZE):
+    """
+    返回逐块产出导出字节的生成器；格式或列非法时立即抛出 ValueError
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'不支持的导出格式: {fmt}')
+    if fmt == 'parquet' and pa is None:
+        raise ValueError('导出 Parquet 需要安装 pyarrow')
+    cols = parse_columns(columns)
+    batches = iter_batches(db_config, cols, filters, batch_size)
+    encoder = {'ndjson': _encode_ndjson, 'csv': _encode_csv, 'parquet': _encode_parquet}[fmt]
+    return encoder(batches, cols)
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='流式导出种子库')
+    p.add_argument('--format', choices=list(FORMATS), default='ndjson')
+    p.add_argument('--out', default='-', help='输出文件，默认标准输出')
+    p.add_argument('--columns', help=f"逗号分隔的列名，默认: {','.join(DEFAULT_COLUMNS)}")
+    p.add_argument('--site', dest='crawl_site', help='按 crawl_site 过滤')
+    p.add_argument('--category', help='按分类过滤')
+    p.add_argument('--since', help='crawledAt 起始时间（含），如 2024-01-01')
+    p.add_argument('--until', help='crawledAt 截止时间（不含）')
+    p.add_argument('--min-id', type=int)
+    p.add_argument('--max-id', type=int)
+    args = p.parse_args(argv)
+    setup_logging()
+    filters = {k: getattr(args, k) for k in ('crawl_site', 'category', 'since', 'until', 'min_id', 'max_id')}
+    try:
+        stream = export_stream(get_database_config(), args.format, args.columns, filters)
+    except ValueError as e:
+        logger.error('%s', e)
+        return 2
+    out = sys.stdout.buffer if args.out == '-' else open(args.out, 'wb')
+    written = 0
+    try:
+        for chunk in stream:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    logger.info('导出完成: %d 字节', written)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""详情页字段提取配置（extraction profile）。
+
+站点或任务可声明只需要哪些字段，DetailExtractor 只在字段被请求时才调用对应的提取函数，
+未声明的字段（如需要序列化整段描述 HTML 的 description、mediainfo）不会被计算。
+
+配置值为逗号分隔的预设名或字段名，例如 'full'、'core'、'core,mediainfo'。
+"""
+from bs4 import BeautifulSoup
+
+from parser_utils import (
+    extract_basic_info,
+    extract_description,
+    extract_mediainfo,
+    extract_subtitle,
+    extract_tags,
+    extract_text_from_td_sibling,
+    extract_title,
+    prune_description,
+)
+from tracing import get_logger
+
+logger = get_logger('extraction')
+
+# 字段顺序即计算顺序，也是输出字段的顺序
+FIELDS = (
+    'description',
+    'mediainfo',
+    'category',
+    'medium',
+    'video_codec',
+    'audiocodec',
+    'standard',
+    'production_team',
+    'title',
+    'tags',
+    'introduction',
+    'size',
+)
+
+PROFILES = {
+    'full': frozenset(FIELDS),
+    'core': frozenset({'title', 'introduction', 'category', 'medium', 'video_codec', 'audiocodec',
+                       'standard', 'production_team', 'tags', 'size'}),
+    'minimal': frozenset({'title', 'size'}),
+}
+
+DEFAULT_PROFILE = 'full'
+
+# 基本信息块中的字段及其在页面表格中的兜底标签
+_BASIC_FALLBACK_LABELS = {
+    'category': r'(类型|類型|类别|類別)[：:]?',
+    'medium': r'(媒介|音频类|音頻類|音訊類)[：:]?',
+    'video_codec': r'(编码|編碼|视频编码|視頻編碼|視訊編碼)[：:]?',
+    'audiocodec': r'(音频编码|音頻編碼|音訊編碼)[：:]?',
+    'standard': r'(分辨率|解析度|标准|標準)[：:]?',
+    'production_team': r'(制作组|製作組)[：:]?',
+}
+
+
+def resolve_fields(spec: str | None) -> frozenset:
+    """
+    将配置值解析为字段集合；无法识别的项记录警告后忽略，结果为空时回退到默认预设
+    """
+    fields: set[str] = set()
+    for token in (spec or DEFAULT_PROFILE).split(','):
+        token = token.strip()
+        if not token:
+            continue
+        if token in PROFILES:
+            fields |= PROFILES[token]
+        elif token in FIELDS:
+            fields.add(token)
+        else:
+            logger.warning('未知的提取字段或预设: %s', token)
+    return frozenset(fields) if fields else PROFILES[DEFAULT_PROFILE]
+
+
+class DetailExtractor:
+    """
+    详情页字段的惰性提取器，每个字段只计算一次；基本信息块由多个字段共享，同样只解析一次。
+    传入站点适配器时优先使用其预编译的选择器与标签映射。
+    计算第一个字段前先移除描述中的无关 fieldset（其中可能含有 <pre>），
+    使 mediainfo 等字段的结果与是否提取 description 无关。
+    """
+
+    def __init__(self, soup: BeautifulSoup, adapter=None):
+        self.soup = soup
+        self.adapter = adapter
+        self._basic: dict | None = None
+        self._cache: dict[str, object] = {}
+        self._pruned = False
+
+    @property
+    def basic(self) -> dict:
+        if self._basic is None:
+            if self.adapter is not None:
+                self._basic = self.adapter.extract_basic_info(self.soup)
+            if self._basic is None:
+                self._basic = extract_basic_info(self.soup)
+        return self._basic
+
+    def _compute(self, field: str):
+        # 站点适配器声明了选择器的字段只走该选择器
+        if self.adapter is not None and field in self.adapter.fields:
+            return self.adapter.fields[field].extract(self.soup)
+        if field in _BASIC_FALLBACK_LABELS:
+            return self.basic.get(field) or extract_text_from_td_sibling(self.soup, _BASIC_FALLBACK_LABELS[field])
+        if field == 'size':
+            return self.basic.get('size_bytes')
+        if field == 'description':
+            return extract_description(self.soup)
+        if field == 'mediainfo':
+            return extract_mediainfo(self.soup)
+        if field == 'title':
+            return extract_title(self.soup)
+        if field == 'tags':
+            return extract_tags(self.soup)
+        if field == 'introduction':
+            return extract_subtitle(self.soup)
+        raise KeyError(field)
+
+    def get(self, field: str):
+        if not self._pruned:
+            prune_description(self.soup)
+            self._pruned = True
+        if field not in self._cache:
+            self._cache[field] = self._compute(field)
+        return self._cache[field]
+
+    def extract(self, fields: frozenset | None = None) -> dict:
+        """
+        按 FIELDS 的顺序提取给定字段，fields 为 None 时提取全部
+        """
+        return {f: self.get(f) for f in FIELDS if fields is None or f in fields}
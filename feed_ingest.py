@@ -0,0 +1,259 @@
+"""RSS 订阅入库：读取 NexusPHP 的 torrentrss.php，只下载新种子，不遍历列表页。
+
+- 响应按块交给 xml.etree.ElementTree.XMLPullParser 增量解析，每个 <item> 解析完立即处理并释放
+- 去重：<guid>（NexusPHP 为 info_hash）与去掉 passkey 的下载链接查已见集合（关闭 use_seen_set 时查库）
+- 新种子直接下载 <enclosure> 中的 .torrent，标题、大小、分类与描述取自订阅条目
+- feed_details 开启时改为抓取详情页，按提取配置补齐 MediaInfo、标签等字段（与 crawl() 相同）
+- 轮询时每个间隔只请求一次订阅；站点返回 ETag / Last-Modified 时带条件请求，未更新时为 304
+
+    python feed_ingest.py --site-id 1 --interval 300
+    python feed_ingest.py --site-id 1 --once --details
+"""
+import argparse
+import asyncio
+import re
+import time
+import xml.etree.ElementTree as ET
+from contextlib import nullcontext
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import pymysql
+import requests
+
+from config_manager import get_database_config
+from crawler import (
+    _download_torrent,
+    _fetch,
+    _fetch_detail,
+    _init_runtime,
+    _persist_torrent,
+    _save_torrent,
+    build_site_opts,
+    site_db_config,
+)
+from db_manager import crawl_link_exists, ensure_schema, get_site, torrent_exists
+from parser_utils import absolute_url, ensure_dir, get_headers
+from seen_set import get_seen_set, save_seen_set
+import storage
+from tracing import get_logger, redact, setup_logging
+
+logger = get_logger('feed_ingest')
+
+FEED_CHUNK_SIZE = 16 * 1024
+DEFAULT_INTERVAL = 300.0
+
+# NexusPHP 订阅标题末尾附带的大小，如 "Name [1.23 GB]"
+_SIZE_SUFFIX = re.compile(r'\s*\[\s*\d+(?:\.\d+)?\s*[KMGTP]?i?B\s*\]\s*$', re.I)
+_INFO_HASH = re.compile(r'[0-9a-fA-F]{40}|[0-9a-fA-F]{64}')
+
+
+def strip_passkey(url: str) -> str:
+    """去掉下载链接中的 passkey 参数，作为入库与去重用的 crawl_link"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() != 'passkey']
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _text(elem, tag: str) -> str | None:
+    child = elem.find(tag)
+    if child is None or not child.text:
+        return None
+    return child.text.strip() or None
+
+
+def parse_item(elem, base_url: str) -> dict:
+    enclosure = elem.find('enclosure')
+    download_url = enclosure.get('url') if enclosure is not None else None
+    length = (enclosure.get('length') or '').strip() if enclosure is not None else ''
+    title = _text(elem, 'title')
+    link = _text(elem, 'link')
+    guid = _text(elem, 'guid')
+    return {
+        'title': _SIZE_SUFFIX.sub('', title) if title else None,
+        'link': absolute_url(base_url, link) if link else None,
+        'download_url': absolute_url(base_url, download_url) if download_url else None,
+        'size': int(length) if length.isdigit() and int(length) > 0 else None,
+        'category': _text(elem, 'category'),
+        'description': _text(elem, 'description'),
+        'info_hash': guid.lower() if guid and _INFO_HASH.fullmatch(guid) else None,
+    }
+
+
+def iter_feed_items(chunks, base_url: str):
+    """
+    增量解析订阅，逐个产出条目；chunks 为字节块的可迭代对象（如 Response.iter_content）
+    """
+    parser = ET.XMLPullParser(events=('end',))
+
+    def drain():
+        for _, elem in parser.read_events():
+            if elem.tag == 'item':
+                yield parse_item(elem, base_url)
+                elem.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+
+def _is_known(item: dict, crawl_link: str, seen, db_conn) -> bool:
+    if seen is not None:
+        return (item['info_hash'] is not None and seen.has_hash(item['info_hash'])) or seen.has_link(crawl_link)
+    return (item['info_hash'] is not None and torrent_exists(db_conn, item['info_hash'])) \
+        or crawl_link_exists(db_conn, crawl_link)
+
+
+def _feed_fields(item: dict, opts) -> dict:
+    fields = {'title': item['title'], 'category': item['category'], 'size': item['size']}
+    extract_fields = getattr(opts, 'extract_fields', None)
+    if extract_fields is None or 'description' in extract_fields:
+        fields['description'] = item['description']
+    return fields
+
+
+async def ingest_feed(opts: argparse.Namespace) -> int:
+    """
+    请求一次订阅并入库其中的新种子，返回新增数。可选参数：
+    - feed_url: 订阅地址，可为相对 base_url 的路径（默认 /torrentrss.php?rows=50）
+    - feed_details: 为新种子抓取详情页，按 extract_fields 提取字段
+    - feed_validators: 上次响应的 ETag / Last-Modified，轮询时自动维护
+    - control: run_manager.RunControl，支持取消与条目预算
+    """
+    session = requests.Session()
+    headers = get_headers(opts.cookie, opts.user_agent)
+    _init_runtime(opts)
+    ensure_dir(opts.out_dir)
+    ensure_dir(opts.torrent_download_dir)
+    db_config = site_db_config(opts)
+    ensure_schema(db_config)
+    db_conn = storage.connect(db_config)
+    seen = None
+    if getattr(opts, 'use_seen_set', True):
+        seen = opts.seen = get_seen_set(db_conn, db_config, opts.out_dir)
+
+    parse_gate = getattr(opts, 'parse_gate', None) or nullcontext()
+    control = getattr(opts, 'control', None)
+    feed_url = absolute_url(opts.base_url, getattr(opts, 'feed_url', None) or '/torrentrss.php?rows=50')
+    validators = getattr(opts, 'feed_validators', None) or {}
+    stats = {'status': 'done', 'items': 0, 'known': 0, 'created': 0, 'skipped': 0, 'errors': 0}
+    safe_url = strip_passkey(feed_url)
+    logger.info('[feed] %s', safe_url)
+    r = None
+    try:
+        with opts.tracer.span('fetch_feed', safe_url):
+            r = _fetch(session, feed_url, {**headers, **validators}, opts, stream=True)
+        if r.status_code == 304:
+            stats['status'] = 'not_modified'
+        elif r.status_code != 200:
+            logger.warning('feed HTTP %s', r.status_code)
+            stats['status'] = 'failed'
+        else:
+            new_validators = {name: r.headers[header] for name, header in
+                              (('If-None-Match', 'ETag'), ('If-Modified-Since', 'Last-Modified'))
+                              if r.headers.get(header)}
+            for item in iter_feed_items(r.iter_content(FEED_CHUNK_SIZE), opts.base_url):
+                if control is not None and control.should_stop(stats['created']):
+                    stats['status'] = 'cancelled'
+                    break
+                stats['items'] += 1
+                if not item['download_url']:
+                    stats['skipped'] += 1
+                    continue
+                crawl_link = strip_passkey(item['download_url'])
+                if _is_known(item, crawl_link, seen, db_conn):
+                    stats['known'] += 1
+                    continue
+                try:
+                    if getattr(opts, 'feed_details', False) and item['link']:
+                        detail = _fetch_detail(session, headers, opts, item['link'], parse_gate)
+                        saved = detail is not None and _save_torrent(session, headers, db_conn, opts, *detail, parse_gate)
+                    else:
+                        downloaded = _download_torrent(session, headers, opts, item['download_url'])
+                        saved = downloaded is not None
+                        if saved:
+                            _persist_torrent(db_conn, opts, *downloaded, _feed_fields(item, opts), crawl_link)
+                except (requests.exceptions.RequestException, ValueError, OSError, pymysql.err.DataError) as e:
+                    logger.warning('error processing %s: %s', crawl_link, redact(e))
+                    stats['errors'] += 1
+                    saved = False
+                if saved:
+                    stats['created'] += 1
+                else:
+                    stats['skipped'] += 1
+            # 只有完整读完订阅才记下验证器；中途取消、超出预算或解析失败时下次仍请求完整订阅，未处理的条目不会被 304 跳过
+            if stats['status'] == 'done':
+                opts.feed_validators = new_validators
+    except ET.ParseError as e:
+        logger.warning('feed parse error: %s', e)
+        stats['status'] = 'failed'
+    finally:
+        if r is not None:
+            r.close()
+        db_conn.close()
+    if seen is not None and stats['created']:
+        save_seen_set(seen, opts.out_dir)
+    logger.info('feed done. status=%s items=%d known=%d created=%d skipped=%d',
+                stats['status'], stats['items'], stats['known'], stats['created'], stats['skipped'])
+    if isinstance(getattr(opts, 'stats', None), dict):
+        opts.stats.update(stats)
+    return stats['created']
+
+
+async def poll_feed(opts: argparse.Namespace, interval: float = DEFAULT_INTERVAL, max_polls: int | None = None) -> int:
+    """
+    每隔 interval 秒请求一次订阅，返回累计新增数；max_polls 为 None 时一直运行直到被取消
+    """
+    total = 0
+    polls = 0
+    control = getattr(opts, 'control', None)
+    while max_polls is None or polls < max_polls:
+        started = time.monotonic()
+        try:
+            total += await ingest_feed(opts)
+        except (requests.exceptions.RequestException, OSError) as e:
+            # 单次请求失败不终止轮询，下个间隔重试
+            logger.warning('feed poll failed: %s', redact(e))
+        polls += 1
+        if control is not None and control.should_stop(total):
+            break
+        if max_polls is not None and polls >= max_polls:
+            break
+        wait = max(0.0, interval - (time.monotonic() - started))
+        if control is not None:
+            # RunControl.sleep 是阻塞等待（可被取消唤醒），放到线程里以免卡住事件循环
+            await asyncio.to_thread(control.sleep, wait)
+        else:
+            await asyncio.sleep(wait)
+    return total
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='通过 RSS 订阅入库 NexusPHP 站点的新种子')
+    p.add_argument('--site-id', type=int, required=True)
+    p.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='轮询间隔（秒）')
+    p.add_argument('--once', action='store_true', help='只请求一次订阅')
+    p.add_argument('--details', action='store_true', help='为新种子抓取详情页以补齐描述、MediaInfo 等字段')
+    p.add_argument('--feed-url', help='覆盖站点的 feed_url')
+    args = p.parse_args(argv)
+    setup_logging()
+    conn = storage.connect(get_database_config())
+    try:
+        site = get_site(conn, args.site_id)
+    finally:
+        conn.close()
+    if not site:
+        logger.error('站点不存在: %s', args.site_id)
+        return 1
+    opts = build_site_opts(site)
+    if args.feed_url:
+        opts.feed_url = args.feed_url
+    if args.details:
+        opts.feed_details = True
+    asyncio.run(poll_feed(opts, args.interval, 1 if args.once else None))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
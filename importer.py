@@ -0,0 +1,293 @@
+"""从磁盘导入已有的 .torrent 文件与 metadata.jsonl，免去重新抓取。
+
+- metadata.jsonl：支持本项目抓取输出的记录格式，以及旧版独立脚本（scripts/pt-crawler）的记录格式
+- .torrent：在进程池中用 parse_torrent 解析，只入库元数据中没有的种子
+- 以内存已见集合按 info_hash 去重，按批次多行 INSERT IGNORE 写入 torrents 与 torrent_files
+- 进度记录在追加写的台账文件中（已完成的 .torrent 路径、jsonl 已提交的字节偏移），中断后重新执行即从断点继续
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config_manager import get_database_config, get_system_setting
+from db_manager import bootstrap_schema, bulk_save_torrents, save_torrent_files, torrent_file_rows
+from parser_utils import parse_torrent
+from seen_set import get_seen_set, save_seen_set
+import storage
+from tracing import get_logger, setup_logging
+
+logger = get_logger('importer')
+
+LEDGER_NAME = 'import_ledger.jsonl'
+
+
+class ImportLedger:
+    """追加写的导入台账：每批提交后记录一行，重启时据此跳过已完成的部分"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.torrents: set[str] = set()
+        self.offsets: dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 最后一行可能因中断而不完整
+                        continue
+                    if entry.get('type') == 'torrents':
+                        self.torrents.update(entry['paths'])
+                    elif entry.get('type') == 'jsonl':
+                        self.offsets[entry['path']] = max(self.offsets.get(entry['path'], 0), entry['offset'])
+
+    def _append(self, entry: dict):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def torrents_done(self, paths: list[str]):
+        self.torrents.update(paths)
+        self._append({'type': 'torrents', 'paths': paths})
+
+    def jsonl_offset(self, path: str, offset: int):
+        self.offsets[path] = offset
+        self._append({'type': 'jsonl', 'path': path, 'offset': offset})
+
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.scanned = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.errors = 0
+
+    def report(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            'scanned': self.scanned,
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'errors': self.errors,
+            'elapsed': round(elapsed, 2),
+            'rate': round(self.scanned / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def log(self, prefix: str):
+        r = self.report()
+        logger.info('%s 已处理 %d (新增 %d, 重复 %d, 错误 %d) %.1f 条/秒',
+                    prefix, r['scanned'], r['inserted'], r['duplicates'], r['errors'], r['rate'])
+
+
+def _walk(paths: list[str]):
+    """按路径列表递归列出 (jsonl 文件, torrent 文件)"""
+    jsonl_files: list[str] = []
+    torrent_files: list[str] = []
+    for root in paths:
+        if os.path.isfile(root):
+            candidates = [root]
+        else:
+            candidates = (os.path.join(d, name) for d, _, names in os.walk(root) for name in names)
+        for path in candidates:
+            lower = path.lower()
+            if lower.endswith('.jsonl'):
+                jsonl_files.append(os.path.abspath(path))
+            elif lower.endswith('.torrent'):
+                torrent_files.append(os.path.abspath(path))
+    return sorted(jsonl_files), sorted(torrent_files)
+
+
+def normalize_metadata(raw: dict) -> dict | None:
+    """
+    将 metadata.jsonl 的一行转换为 torrents 记录；同时兼容旧版脚本的字段名
+    """
+    if not raw.get('info_hash'):
+        return None
+    files = raw.get('files')
+    if files is None and raw.get('multi_file_list'):
+        try:
+            files = json.loads(raw['multi_file_list'])
+        except ValueError:
+            files = None
+    files = files if isinstance(files, list) else []
+    saved_path = raw.get('saved_path')
+    if saved_path:
+        saved_path = saved_path.replace('\\', '/')
+    record = {
+        'info_hash': raw['info_hash'],
+        'name': raw.get('name'),
+        'title': raw.get('title') or '',
+        'introduction': raw.get('introduction') or raw.get('subtitle') or raw.get('small_descr') or '',
+        'description': raw.get('description') or raw.get('descr_html') or '',
+        'mediainfo': raw.get('mediainfo') or raw.get('mediaInfo') or '',
+        'category': raw.get('category') or '',
+        'medium': raw.get('medium') or '',
+        'video_codec': raw.get('video_codec') or raw.get('videoCodec') or raw.get('codec') or '',
+        'audiocodec': raw.get('audiocodec') or raw.get('audioCodec') or '',
+        'standard': raw.get('standard') or raw.get('resolution') or '',
+        'production_team': raw.get('production_team') or raw.get('productionTeam') or raw.get('team') or '',
+        'size': raw.get('size'),
+        'is_single_file': raw.get('is_single_file', 1 if len(files) == 1 else 0),
+        'multi_file_list': json.dumps(files, ensure_ascii=False),
+        'crawl_site': raw.get('crawl_site') or raw.get('source') or '',
+        'crawl_link': raw.get('crawl_link') or raw.get('download_url') or '',
+        'saved_path': saved_path,
+        'meta_version': raw.get('meta_version'),
+        'tags': raw.get('tags') or '',
+        'promotion': raw.get('promotion'),
+        'promotion_until': raw.get('promotion_until'),
+    }
+    return {'record': record, 'files': files}
+
+
+def _parse_torrent_file(path: str):
+    """进程池任务：读取并解析单个 .torrent，返回 (路径, info 或 None, 错误信息)"""
+    try:
+        with open(path, 'rb') as f:
+            return path, parse_torrent(f.read()), None
+    except Exception as e:
+        # bencodepy 对损坏文件可能抛出各种异常，统一记为错误
+        return path, None, f'{type(e).__name__}: {e}'
+
+
+class Importer:
+    def __init__(self, db_config: dict, out_dir: str, workers: int | None = None, batch_size: int = 500,
+                 allow_v2: bool = False, ledger_path: str | None = None):
+        self.db_config = db_config
+        self.out_dir = out_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = max(1, int(batch_size))
+        self.allow_v2 = allow_v2
+        os.makedirs(out_dir, exist_ok=True)
+        self.ledger = ImportLedger(ledger_path or os.path.join(out_dir, LEDGER_NAME))
+        self.stats = ImportStats()
+        self.db_conn = None
+        self.seen = None
+
+    def _flush(self, items: list[dict]) -> int:
+        """items 为 normalize_metadata 的结果；去重后批量写入，返回新增数"""
+        fresh = []
+        batch_hashes = set()
+        for item in items:
+            info_hash = item['record']['info_hash']
+            if info_hash in batch_hashes or self.seen.has_hash(info_hash):
+                self.stats.duplicates += 1
+                continue
+            batch_hashes.add(info_hash)
+            fresh.append(item)
+        if not fresh:
+            return 0
+        inserted = bulk_save_torrents(self.db_conn, [item['record'] for item in fresh])
+        file_rows = []
+        for item in fresh:
+            file_rows.extend(torrent_file_rows(item['record']['info_hash'], item['files']))
+        save_torrent_files(self.db_conn, file_rows)
+        for item in fresh:
+            self.seen.add(item['record']['info_hash'], item['record'].get('crawl_link'))
+        self.stats.inserted += inserted
+        self.stats.duplicates += len(fresh) - inserted
+        return inserted
+
+    def import_jsonl(self, path: str):
+        offset = self.ledger.offsets.get(path, 0)
+        if offset >= os.path.getsize(path):
+            return
+        logger.info('导入 %s（从偏移 %d 开始）', path, offset)
+        batch: list[dict] = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                self.stats.scanned += 1
+                try:
+                    item = normalize_metadata(json.loads(line))
+                except ValueError:
+                    item = None
+                if item is None:
+                    self.stats.errors += 1
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    self.ledger.jsonl_offset(path, offset)
+                    self.stats.log('[jsonl]')
+                    batch = []
+        self._flush(batch)
+        self.ledger.jsonl_offset(path, offset)
+
+    def import_torrents(self, paths: list[str]):
+        pending = [p for p in paths if p not in self.ledger.torrents]
+        if not pending:
+            return
+        logger.info('解析 %d 个 .torrent 文件（%d 个进程）', len(pending), self.workers)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                batch = []
+                for path, info, error in pool.map(_parse_torrent_file, chunk,
+                                                   chunksize=max(1, len(chunk) // (self.workers * 4))):
+                    self.stats.scanned += 1
+                    if info is None:
+                        self.stats.errors += 1
+                        logger.warning('解析失败 %s: %s', path, error)
+                        continue
+                    if info['meta_version'] == 'v2' and not self.allow_v2:
+                        continue
+                    batch.append({
+                        'record': {
+                            'info_hash': info['info_hash'],
+                            'name': info['name'],
+                            'size': info['size'],
+                            'is_single_file': 1 if len(info['files']) == 1 else 0,
+                            'multi_file_list': json.dumps(info['files'], ensure_ascii=False),
+                            'saved_path': path,
+                            'meta_version': info['meta_version'],
+                        },
+                        'files': info['files'],
+                    })
+                self._flush(batch)
+                self.ledger.torrents_done(chunk)
+                self.stats.log('[torrent]')
+
+    def run(self, paths: list[str]) -> dict:
+        bootstrap_schema(self.db_config, ['torrents', 'torrent_files'])
+        self.db_conn = storage.connect(self.db_config)
+        try:
+            self.seen = get_seen_set(self.db_conn, self.db_config, self.out_dir)
+            jsonl_files, torrent_files = _walk(paths)
+            # 先导入元数据（字段更完整），再用 .torrent 文件补齐元数据中没有的种子
+            for path in jsonl_files:
+                self.import_jsonl(path)
+            self.import_torrents(torrent_files)
+        finally:
+            self.db_conn.close()
+            if self.seen is not None:
+                save_seen_set(self.seen, self.out_dir)
+        self.stats.log('[done]')
+        return self.stats.report()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='从磁盘导入 .torrent 文件与 metadata.jsonl')
+    p.add_argument('paths', nargs='+', help='目录或文件，目录会被递归扫描')
+    p.add_argument('--workers', type=int, help='解析进程数，默认 CPU 核数')
+    p.add_argument('--batch-size', type=int, default=500, help='每批写入的记录数')
+    p.add_argument('--out-dir', help='台账与去重快照所在目录，默认系统设置 out_dir')
+    p.add_argument('--ledger', help='台账文件路径，默认 <out_dir>/import_ledger.jsonl')
+    p.add_argument('--allow-v2', action='store_true', help='导入 v2/hybrid 种子')
+    args = p.parse_args(argv)
+    setup_logging()
+    out_dir = args.out_dir or get_system_setting('out_dir', './output')
+    importer = Importer(get_database_config(), out_dir, args.workers, args.batch_size, args.allow_v2, args.ledger)
+    report = importer.run(args.paths)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0 if report['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -12,13 +12,20 @@ from config_manager import load_config, get_system_settings_by_prefix, get_syste
 from db_manager import init_db, save_torrent_to_db
 from parser_utils import absolute_url, get_headers, find_detail_links, find_torrent_link, extract_descr_html, extract_imdb, decode_str, compute_info_hash, parse_torrent, extract_text_from_td_sibling, ensure_dir
 from crawler import crawl
+from tracing import setup_logging
 
 def main(argv=None) -> int:
     p = argparse.ArgumentParser(description='Standalone PT crawler: fetch .torrent files and basic metadata')
     p.add_argument('--config', help='JSON 配置文件路径（可选）。若未提供，将尝试加载脚本同目录下的 settings.json')
-    
+    p.add_argument('--all-sites', action='store_true', help='并发抓取 sites 表中所有启用的站点')
 
     args = p.parse_args(argv)
+    setup_logging()
+
+    if args.all_sites:
+        from orchestrator import overall_status, run_all_sites
+        results = asyncio.run(run_all_sites())
+        return 0 if overall_status(results) == 'done' else 1
 
     config_path_to_load = args.config
     if not config_path_to_load:
@@ -117,6 +124,8 @@ def main(argv=None) -> int:
         db_user=db_user,
         db_password=db_password,
         db_name=db_name,
+        db_backend=db_config.get('backend', 'mysql'),
+        db_path=db_config.get('path'),
     )
 
     # Call the crawl function
@@ -0,0 +1,270 @@
+"""本地模拟 NexusPHP 站点，用于端到端压测，不访问真实站点。
+
+- torrents.php?page=N：生成的列表页，第 1..pages 页每页 per_page 个种子，之后的页为空（抓取自然结束）；
+  页面上下带 NexusPHP 样式的分页条（首页、前后各两页与末页链接）
+- details.php?id=N：以 html/details.html、torrent.html 为模板的详情页，下载链接替换为 download.php?id=N
+- torrentrss.php?rows=N：NexusPHP 格式的 RSS，包含最新的 N 个种子（guid 为 info_hash，enclosure 带 passkey），支持 ETag
+- download.php?id=N：取仓库中已有的 v1 .torrent 文件，在 info 中写入 source=mock-<nonce>-<id>，保证每个 id 的 info_hash 不同
+- 可配置延迟（均值与抖动）、500 错误率、429 比例（带 Retry-After）
+
+    python mock_tracker.py --port 8765 --pages 20 --per-page 50 --latency-ms 30 --error-rate 0.01
+"""
+import argparse
+import functools
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import bencodepy
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEMPLATES = [os.path.join(ROOT, 'html', 'details.html'), os.path.join(ROOT, 'torrent.html')]
+DEFAULT_CORPUS = [os.path.join(ROOT, 'torrents'), os.path.join(ROOT, 'scripts', 'pt-crawler', 'output', 'torrents')]
+
+_DOWNLOAD_RE = re.compile(r'download\.php\?id=\d+')
+_TITLE_RE = re.compile(r'(<h1 align="center" id="top">)')
+
+
+def load_templates(paths: list[str]) -> list[str]:
+    templates = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        if _DOWNLOAD_RE.search(html):
+            html = _DOWNLOAD_RE.sub('download.php?id={id}', html.replace('{', '{{').replace('}', '}}'))
+            templates.append(_TITLE_RE.sub(r'\1[#{id}] ', html, count=1))
+    if not templates:
+        raise FileNotFoundError('没有可用的详情页模板')
+    return templates
+
+
+def load_corpus(dirs: list[str]) -> list[dict]:
+    """读取 v1 种子（含 pieces）的解码结果"""
+    corpus = []
+    for d in dirs:
+        if not os.path.isdir(d):
+            continue
+        for name in sorted(os.listdir(d)):
+            if not name.endswith('.torrent'):
+                continue
+            try:
+                with open(os.path.join(d, name), 'rb') as f:
+                    meta = bencodepy.decode(f.read())
+            except Exception:
+                continue
+            if isinstance(meta, dict) and b'pieces' in meta.get(b'info', {}):
+                corpus.append(meta)
+    if not corpus:
+        raise FileNotFoundError('没有可用的 .torrent 语料')
+    return corpus
+
+
+class MockTracker:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, pages: int = 10, per_page: int = 50,
+                 latency_ms: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, seed: int | None = None,
+                 templates: list[str] | None = None, corpus: list[str] | None = None):
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.nonce = uuid.uuid4().hex[:12]
+        self.templates = load_templates(templates or DEFAULT_TEMPLATES)
+        self.corpus = load_corpus(corpus or DEFAULT_CORPUS)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.counters = {'list': 0, 'detail': 0, 'download': 0, 'feed': 0, 'errors': 0, 'throttled': 0}
+        self._counters_lock = threading.Lock()
+        self.torrent_bytes = functools.lru_cache(maxsize=2048)(self._torrent_bytes)
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def total(self) -> int:
+        return self.pages * self.per_page
+
+    def _roll(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    def _count(self, key: str):
+        with self._counters_lock:
+            self.counters[key] += 1
+
+    def list_page(self, page: int) -> str:
+        rows = []
+        if 1 <= page <= self.pages:
+            first = (page - 1) * self.per_page + 1
+            for tid in range(first, first + self.per_page):
+                rows.append(
+                    f'<tr><td class="rowfollow"><a title="Mock torrent {tid}" href="details.php?id={tid}&amp;hit=1">'
+                    f'<b>Mock torrent {tid}</b></a></td>'
+                    f'<td class="rowfollow"><a href="download.php?id={tid}">下载</a></td></tr>'
+                )
+        pager = self.pager(page) if rows else ''
+        return ('<html><head><meta charset="utf-8"><meta name="generator" content="NexusPHP"><title>种子</title></head>'
+                f'<body>{pager}<table class="torrents">{"".join(rows)}</table>{pager}</body></html>')
+
+    def pager(self, page: int) -> str:
+        links = []
+        for n in sorted({1, *range(page - 2, page + 3), self.pages}):
+            if not 1 <= n <= self.pages:
+                continue
+            first, last = (n - 1) * self.per_page + 1, n * self.per_page
+            if n == page:
+                links.append(f'<font class="gray"><b>{first}&nbsp;-&nbsp;{last}</b></font>')
+            else:
+                links.append(f'<a href="?inclbookmarked=0&amp;page={n}"><b>{first}&nbsp;-&nbsp;{last}</b></a>')
+        return f'<p align="center">{" | ".join(links)}</p>'
+
+    def detail_page(self, tid: int) -> str:
+        return self.templates[tid % len(self.templates)].format(id=tid)
+
+    def feed(self, rows: int = 50) -> str:
+        items = []
+        for tid in range(self.total, max(0, self.total - rows), -1):
+            meta = bencodepy.decode(self.torrent_bytes(tid))
+            info_hash = hashlib.sha1(bencodepy.encode(meta[b'info'])).hexdigest()
+            items.append(
+                f'<item><title><![CDATA[Mock torrent {tid} [1.00 GB]]]></title>'
+                f'<link>{self.base_url}/details.php?id={tid}&amp;hit=1</link>'
+                f'<description><![CDATA[<b>Mock</b> torrent {tid}]]></description>'
+                f'<category domain="{self.base_url}/torrents.php?cat=401">Movies</category>'
+                f'<enclosure url="{self.base_url}/download.php?id={tid}&amp;passkey=mockpasskey" length="1073741824" '
+                f'type="application/x-bittorrent" />'
+                f'<guid isPermaLink="false">{info_hash}</guid></item>'
+            )
+        return ('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>Mock Torrents</title>'
+                f'<link>{self.base_url}</link>{"".join(items)}</channel></rss>')
+
+    def _torrent_bytes(self, tid: int) -> bytes:
+        meta = dict(self.corpus[tid % len(self.corpus)])
+        info = dict(meta[b'info'])
+        info[b'source'] = f'mock-{self.nonce}-{tid}'.encode()
+        meta[b'info'] = info
+        return bencodepy.encode(meta)
+
+    def _handler_class(self):
+        tracker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str, extra: dict | None = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for k, v in (extra or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if tracker.latency > 0:
+                    spread = tracker.latency * tracker.jitter
+                    with tracker._random_lock:
+                        delay = tracker._random.uniform(tracker.latency - spread, tracker.latency + spread)
+                    time.sleep(max(0.0, delay))
+                roll = tracker._roll()
+                if roll < tracker.throttle_rate:
+                    tracker._count('throttled')
+                    return self._send(429, b'Too Many Requests', 'text/plain',
+                                      {'Retry-After': f'{tracker.retry_after:g}'})
+                if roll < tracker.throttle_rate + tracker.error_rate:
+                    tracker._count('errors')
+                    return self._send(500, b'Internal Server Error', 'text/plain')
+                url = urlparse(self.path)
+                qs = parse_qs(url.query)
+                try:
+                    if url.path.endswith('/torrents.php'):
+                        tracker._count('list')
+                        page = int(qs.get('page', ['1'])[0])
+                        return self._send(200, tracker.list_page(page).encode('utf-8'), 'text/html; charset=utf-8')
+                    if url.path.endswith('/torrentrss.php'):
+                        tracker._count('feed')
+                        body = tracker.feed(int(qs.get('rows', ['50'])[0])).encode('utf-8')
+                        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                        if self.headers.get('If-None-Match') == etag:
+                            return self._send(304, b'', 'application/xml', {'ETag': etag})
+                        return self._send(200, body, 'application/xml; charset=utf-8', {'ETag': etag})
+                    tid = int(qs['id'][0])
+                except (KeyError, ValueError):
+                    return self._send(404, b'Not Found', 'text/plain')
+                if not 1 <= tid <= tracker.total:
+                    return self._send(404, b'Not Found', 'text/plain')
+                if url.path.endswith('/details.php'):
+                    tracker._count('detail')
+                    return self._send(200, tracker.detail_page(tid).encode('utf-8'), 'text/html; charset=utf-8')
+                if url.path.endswith('/download.php'):
+                    tracker._count('download')
+                    return self._send(200, tracker.torrent_bytes(tid), 'application/x-bittorrent',
+                                      {'Content-Disposition': f'attachment; filename="mock-{tid}.torrent"'})
+                return self._send(404, b'Not Found', 'text/plain')
+
+        return Handler
+
+    def start(self) -> 'MockTracker':
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-tracker', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_arguments(p: argparse.ArgumentParser):
+    p.add_argument('--pages', type=int, default=10, help='列表页数')
+    p.add_argument('--per-page', type=int, default=50, help='每页种子数')
+    p.add_argument('--latency-ms', type=float, default=0.0, help='每个请求的平均延迟（毫秒）')
+    p.add_argument('--jitter', type=float, default=0.5, help='延迟抖动比例，0.5 表示 ±50%%')
+    p.add_argument('--error-rate', type=float, default=0.0, help='返回 500 的比例')
+    p.add_argument('--throttle-rate', type=float, default=0.0, help='返回 429 的比例')
+    p.add_argument('--retry-after', type=float, default=1.0, help='429 响应的 Retry-After 秒数')
+    p.add_argument('--seed', type=int, help='随机种子，便于复现')
+
+
+def from_args(args, host: str = '127.0.0.1', port: int = 0) -> MockTracker:
+    return MockTracker(host, port, args.pages, args.per_page, args.latency_ms, args.jitter,
+                       args.error_rate, args.throttle_rate, args.retry_after, args.seed)
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='本地模拟 NexusPHP 站点')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    add_arguments(p)
+    args = p.parse_args(argv)
+    tracker = from_args(args, args.host, args.port)
+    print(f'mock tracker: {tracker.base_url}/torrents.php ({tracker.total} 个种子, 语料 {len(tracker.corpus)} 个)')
+    try:
+        tracker.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
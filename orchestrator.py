@@ -0,0 +1,332 @@
+"""多站点并发抓取编排器：在同一进程内同时抓取 sites 表中所有启用的站点；backfill 把单个站点的页码区间拆分并发回填。"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config_manager import get_database_config, get_system_setting
+from crawler import build_site_opts, crawl, discover_last_page, page_limit
+from db_manager import get_site, get_task, list_active_sites
+import storage
+from tracing import get_logger, setup_logging
+
+logger = get_logger('orchestrator')
+
+
+class SiteRateLimiter:
+    """
+    站点级请求限速器（令牌间隔）。
+    每个站点持有独立实例，保证单站点请求速率不超过 max_rps，
+    且一个站点的等待不会影响其他站点。
+    """
+
+    def __init__(self, max_rps: float):
+        self.interval = 1.0 / max_rps if max_rps and max_rps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+        self.requests = 0
+
+    def set_rate(self, max_rps: float):
+        """运行中调整速率，从下一次请求起生效"""
+        with self._lock:
+            self.interval = 1.0 / max_rps if max_rps and max_rps > 0 else 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+            self.requests += 1
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+class AdjustableGate:
+    """
+    可在运行中调整上限的并发闸门（用法同 BoundedSemaphore 的 with 语句）。
+    调小上限时不打断已在途的请求，只是新请求要等在途数降到新上限以下。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.inflight = 0
+        self._cond = threading.Condition()
+
+    def set_limit(self, limit: int):
+        with self._cond:
+            self.limit = max(1, int(limit))
+            self._cond.notify_all()
+
+    def __enter__(self):
+        with self._cond:
+            while self.inflight >= self.limit:
+                self._cond.wait()
+            self.inflight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify()
+        return False
+
+
+class CrawlOrchestrator:
+    """
+    多站点编排器。
+
+    - 每个站点运行在独立线程中，拥有独立的 requests 会话、数据库连接、限速器与统计，
+      单个站点的异常只记录在该站点的统计中，不会中断其他站点；
+    - max_inflight 为所有站点共享的在途 HTTP 请求上限；
+    - parse_workers 为所有站点共享的 HTML 解析并发上限；
+    - 三个参数都可在运行中通过系统设置（max_inflight_requests / parse_workers / site_max_rps）热更新。
+    """
+
+    def __init__(self, max_inflight: int = 8, parse_workers: int | None = None, site_max_rps: float = 2.0):
+        self.max_inflight = max(1, int(max_inflight))
+        self.parse_workers = max(1, int(parse_workers or os.cpu_count() or 1))
+        self.site_max_rps = float(site_max_rps)
+        self.http_gate = AdjustableGate(self.max_inflight)
+        self.parse_gate = AdjustableGate(self.parse_workers)
+
+    def _run_site(self, site: dict) -> dict:
+        stats = {
+            'site_id': site.get('id'),
+            'site_name': site.get('name') or site.get('base_url'),
+            'status': 'running',
+            'created': 0,
+            'skipped': 0,
+            'pages': 0,
+            'requests': 0,
+            'error': None,
+        }
+        started = time.monotonic()
+        limiter = SiteRateLimiter(self.site_max_rps)
+        try:
+            opts = build_site_opts(site)
+            opts.rate_limiter = limiter
+            opts.http_gate = self.http_gate
+            opts.parse_gate = self.parse_gate
+            opts.stats = stats
+            # status 由 crawl() 写入：done / interrupted / cancelled
+            asyncio.run(crawl(opts))
+        except Exception as e:
+            # 故障域隔离：只影响当前站点
+            stats['status'] = 'failed'
+            stats['error'] = str(e)
+            logger.error('站点 %s 抓取失败: %s', stats['site_name'], e)
+        stats['requests'] = limiter.requests
+        stats['elapsed'] = round(time.monotonic() - started, 3)
+        return stats
+
+    async def run(self, sites: list[dict]) -> list[dict]:
+        if not sites:
+            return []
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=len(sites), thread_name_prefix='site') as pool:
+            futures = [loop.run_in_executor(pool, self._run_site, site) for site in sites]
+            return list(await asyncio.gather(*futures))
+
+
+def split_page_range(start_page: int, end_page: int, parts: int) -> list[tuple[int, int]]:
+    """把 [start_page, end_page] 拆成至多 parts 段连续且大小相近的区间"""
+    total = end_page - start_page + 1
+    if total <= 0:
+        return []
+    parts = max(1, min(int(parts), total))
+    size, extra = divmod(total, parts)
+    ranges = []
+    first = start_page
+    for i in range(parts):
+        last = first + size - 1 + (1 if i < extra else 0)
+        ranges.append((first, last))
+        first = last + 1
+    return ranges
+
+
+class SiteBackfill:
+    """
+    单站点回填：先抓 start_page 读取分页条得到最后一页，与 end_page、pages 取最小值作为结束页，
+    再把区间拆成 workers 段，每段在独立线程中以 crawl(start_page, end_page) 抓取。
+
+    - 各段共享一个站点限速器，合计请求速率仍不超过 site_max_rps；在途请求与解析并发同样共享闸门；
+    - 回填遇到已存在的种子不提前停止（stop_on_seen=False），每段使用独立的检查点（run_key 带页码区间），
+      中断后重新执行同样的回填会从各段的断点继续。
+    """
+
+    def __init__(self, opts, workers: int = 4, max_inflight: int = 8, parse_workers: int | None = None,
+                 site_max_rps: float = 2.0):
+        self.opts = opts
+        self.workers = max(1, int(workers))
+        self.limiter = SiteRateLimiter(site_max_rps)
+        self.http_gate = AdjustableGate(max_inflight)
+        self.parse_gate = AdjustableGate(parse_workers or os.cpu_count() or 1)
+
+    def resolve_end_page(self) -> int | None:
+        opts = self.opts
+        opts.rate_limiter = self.limiter
+        opts.http_gate = self.http_gate
+        end_page = page_limit(opts)
+        last_page = discover_last_page(opts)
+        if last_page is not None:
+            logger.info('站点 %s 当前共 %d 页', opts.base_url, last_page)
+            end_page = min(end_page, last_page) if end_page else last_page
+        return end_page
+
+    def _run_range(self, first: int, last: int) -> dict:
+        stats = {'start_page': first, 'end_page': last, 'status': 'running',
+                 'created': 0, 'skipped': 0, 'errors': 0, 'pages': 0, 'retries': 0, 'error': None}
+        opts = argparse.Namespace(**vars(self.opts))
+        opts.start_page = first
+        opts.end_page = last
+        opts.pages = None
+        opts.stop_on_seen = False
+        if getattr(opts, 'db_backend', 'mysql') == 'sqlite':
+            # 批量提交会在等待 HTTP 时持有 SQLite 写锁，多段并发写入时逐条提交
+            opts.db_commit_batch = 1
+        opts.run_key = f'{self.opts.run_key}:backfill:{first}-{last}' if getattr(self.opts, 'run_key', None) else None
+        # 运行期对象每段独立创建
+        opts.tracer = opts.fetcher = opts.checkpoint = opts.progress = None
+        opts.rate_limiter = self.limiter
+        opts.http_gate = self.http_gate
+        opts.parse_gate = self.parse_gate
+        opts.stats = stats
+        try:
+            asyncio.run(crawl(opts))
+        except Exception as e:
+            stats['status'] = 'failed'
+            stats['error'] = str(e)
+            logger.error('回填 %d-%d 页失败: %s', first, last, e)
+        return stats
+
+    async def run(self) -> dict:
+        started = time.monotonic()
+        start_page = int(getattr(self.opts, 'start_page', 1) or 1)
+        loop = asyncio.get_running_loop()
+        end_page = await loop.run_in_executor(None, self.resolve_end_page)
+        if end_page is None:
+            raise ValueError('无法从分页条确定最后一页，请指定 end_page 或 pages')
+        ranges = split_page_range(start_page, end_page, self.workers)
+        logger.info('回填 %s 第 %d-%d 页，拆分为 %d 段', self.opts.base_url, start_page, end_page, len(ranges))
+        with ThreadPoolExecutor(max_workers=len(ranges) or 1, thread_name_prefix='backfill') as pool:
+            futures = [loop.run_in_executor(pool, self._run_range, first, last) for first, last in ranges]
+            results = list(await asyncio.gather(*futures))
+        summary = {
+            'start_page': start_page,
+            'end_page': end_page,
+            'status': overall_status(results),
+            'ranges': results,
+            'requests': self.limiter.requests,
+            'elapsed': round(time.monotonic() - started, 3),
+        }
+        for key in ('created', 'skipped', 'errors', 'pages', 'retries'):
+            summary[key] = sum(r.get(key) or 0 for r in results)
+        return summary
+
+
+def overall_status(results: list[dict]) -> str:
+    """
+    汇总多段或多站点的结束状态：全部为 done 时为 done，否则取最严重的一个（failed > interrupted > cancelled）
+    """
+    statuses = {r['status'] for r in results}
+    return next((s for s in ('failed', 'interrupted', 'cancelled', 'running') if s in statuses), 'done')
+
+
+def load_orchestrator_settings() -> dict:
+    """
+    从系统设置读取编排器参数，缺省时使用内置默认值
+    """
+    return {
+        'max_inflight': get_system_setting('max_inflight_requests', 8),
+        'parse_workers': get_system_setting('parse_workers', os.cpu_count() or 1),
+        'site_max_rps': get_system_setting('site_max_rps', 2.0),
+    }
+
+
+async def run_all_sites(max_inflight: int | None = None, parse_workers: int | None = None,
+                        site_max_rps: float | None = None) -> list[dict]:
+    """
+    读取 sites 表中所有启用的站点并并发抓取，返回每个站点的统计
+    """
+    db_config = get_database_config()
+    conn = storage.connect(db_config)
+    try:
+        sites = list_active_sites(conn)
+    finally:
+        conn.close()
+
+    settings = load_orchestrator_settings()
+    orchestrator = CrawlOrchestrator(
+        max_inflight=max_inflight if max_inflight is not None else settings['max_inflight'],
+        parse_workers=parse_workers if parse_workers is not None else settings['parse_workers'],
+        site_max_rps=site_max_rps if site_max_rps is not None else settings['site_max_rps'],
+    )
+    logger.info('并发抓取 %d 个站点 (max_inflight=%d, parse_workers=%d, site_max_rps=%s)',
+                len(sites), orchestrator.max_inflight, orchestrator.parse_workers, orchestrator.site_max_rps)
+    results = await orchestrator.run(sites)
+    for s in results:
+        logger.info('%s: status=%s created=%s skipped=%s pages=%s requests=%s elapsed=%ss',
+                    s['site_name'], s['status'], s['created'], s['skipped'], s['pages'], s['requests'], s['elapsed'])
+    return results
+
+
+async def backfill_site(site_id: int, task_id: int | None = None, start_page: int | None = None,
+                        end_page: int | None = None, pages: int | None = None, workers: int = 4,
+                        max_inflight: int | None = None, parse_workers: int | None = None,
+                        site_max_rps: float | None = None) -> dict:
+    """
+    并发回填单个站点的列表页区间；未给出的页码参数取任务行（start_page）或分页条（最后一页）
+    """
+    conn = storage.connect(get_database_config())
+    try:
+        site = get_site(conn, site_id)
+        task = get_task(conn, task_id) if task_id is not None else None
+    finally:
+        conn.close()
+    if not site:
+        raise ValueError(f'站点不存在: {site_id}')
+
+    opts = build_site_opts(site, task)
+    if start_page is not None:
+        opts.start_page = start_page
+    opts.end_page = end_page
+    opts.pages = pages
+    settings = load_orchestrator_settings()
+    backfill = SiteBackfill(
+        opts, workers=workers,
+        max_inflight=max_inflight if max_inflight is not None else settings['max_inflight'],
+        parse_workers=parse_workers if parse_workers is not None else settings['parse_workers'],
+        site_max_rps=site_max_rps if site_max_rps is not None else settings['site_max_rps'],
+    )
+    summary = await backfill.run()
+    logger.info('%s 回填完成: status=%s pages=%d-%d created=%s skipped=%s requests=%s elapsed=%ss',
+                site.get('name') or site['base_url'], summary['status'], summary['start_page'], summary['end_page'],
+                summary['created'], summary['skipped'], summary['requests'], summary['elapsed'])
+    return summary
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='并发抓取所有启用的站点，或并发回填单个站点的页码区间')
+    p.add_argument('--max-inflight', type=int, help='全局在途请求上限')
+    p.add_argument('--parse-workers', type=int, help='全局解析并发上限')
+    p.add_argument('--site-max-rps', type=float, help='单站点每秒请求数上限')
+    p.add_argument('--backfill', type=int, metavar='SITE_ID', help='回填指定站点')
+    p.add_argument('--task-id', type=int, help='回填时使用的任务（读取 start_page 与提取配置）')
+    p.add_argument('--start-page', type=int)
+    p.add_argument('--end-page', type=int, help='缺省时由分页条确定最后一页')
+    p.add_argument('--pages', type=int, help='从 start_page 起最多回填的页数')
+    p.add_argument('--workers', type=int, default=4, help='回填并发段数')
+    args = p.parse_args(argv)
+    setup_logging()
+    if args.backfill is not None:
+        summary = asyncio.run(backfill_site(args.backfill, args.task_id, args.start_page, args.end_page, args.pages,
+                                            args.workers, args.max_inflight, args.parse_workers, args.site_max_rps))
+        return 0 if summary['status'] == 'done' else 1
+    results = asyncio.run(run_all_sites(args.max_inflight, args.parse_workers, args.site_max_rps))
+    return 0 if overall_status(results) == 'done' else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
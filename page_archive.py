@@ -0,0 +1,242 @@
+"""原始页面归档与离线重新提取。
+
+开启系统设置 archive_pages 后，抓取到的列表页与详情页以 zlib 压缩后追加写入 out_dir/page_archive 下的分段文件，
+每个进程写自己的分段（超过 segment_max_bytes 后滚动到新分段），index.jsonl 记录每个页面所在的分段、偏移与长度。
+同一页面多次归档时以最后一条为准。
+
+修复解析问题后，用 reextract 子命令把归档的详情页交给当前的提取逻辑重新解析（进程池并行），
+只对字段有变化的种子批量 UPDATE，不产生任何网络请求：
+
+    python page_archive.py reextract [--site https://example.org] [--fields title,tags] [--dry-run]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from config_manager import get_database_config, get_system_setting
+import storage
+from tracing import get_logger, setup_logging
+
+logger = get_logger('page_archive')
+
+INDEX_NAME = 'index.jsonl'
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+def page_key(url: str) -> str:
+    """详情页以种子 id 为键，无法识别时使用完整 URL"""
+    qs = parse_qs(urlparse(url).query)
+    return qs['id'][0] if qs.get('id') else url
+
+
+class PageArchive:
+    def __init__(self, directory: str, segment_max_bytes: int = DEFAULT_SEGMENT_BYTES, level: int = 6):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.level = level
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._prefix = f'seg-{time.strftime("%Y%m%d%H%M%S")}-{os.getpid()}'
+        self._seq = 0
+        self._segment = None
+        self._segment_name = None
+
+    def _roll(self):
+        if self._segment is not None:
+            self._segment.close()
+        self._seq += 1
+        self._segment_name = f'{self._prefix}-{self._seq:04d}.z'
+        self._segment = open(os.path.join(self.directory, self._segment_name), 'ab')
+
+    def put(self, kind: str, site: str, url: str, html: str, **extra):
+        """
+        归档一个页面；kind 为 'detail' 或 'list'，extra 会原样写入索引（如 torrent_url）
+        """
+        blob = zlib.compress(html.encode('utf-8'), self.level)
+        with self._lock:
+            if self._segment is None or self._segment.tell() >= self.segment_max_bytes:
+                self._roll()
+            offset = self._segment.tell()
+            self._segment.write(blob)
+            self._segment.flush()
+            entry = {
+                'kind': kind, 'site': site, 'key': page_key(url), 'url': url,
+                'segment': self._segment_name, 'offset': offset, 'length': len(blob),
+                'ts': int(time.time()), **extra,
+            }
+            # 单次 write 追加一行，多个进程同时写索引也不会交错
+            with open(os.path.join(self.directory, INDEX_NAME), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+
+
+def read_page(directory: str, entry: dict) -> str:
+    with open(os.path.join(directory, entry['segment']), 'rb') as f:
+        f.seek(entry['offset'])
+        return zlib.decompress(f.read(entry['length'])).decode('utf-8')
+
+
+def load_index(directory: str, kind: str | None = None, site: str | None = None) -> dict:
+    """读取索引，返回 {(site, kind, key): 最新条目}"""
+    latest: dict = {}
+    path = os.path.join(directory, INDEX_NAME)
+    if not os.path.exists(path):
+        return latest
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if kind and entry.get('kind') != kind:
+                continue
+            if site and entry.get('site') != site:
+                continue
+            latest[(entry.get('site'), entry.get('kind'), entry.get('key'))] = entry
+    return latest
+
+
+_archives: dict[str, PageArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(directory: str) -> PageArchive:
+    """进程内每个目录共用一个归档实例（各站点线程共享分段文件）"""
+    directory = os.path.abspath(directory)
+    with _archives_lock:
+        archive = _archives.get(directory)
+        if archive is None:
+            archive = _archives[directory] = PageArchive(directory)
+        return archive
+
+
+# 重新提取的字段与 torrents 列的对应关系；size 以种子文件为准，不参与重新提取
+REEXTRACT_COLUMNS = {
+    'title': 'title',
+    'introduction': 'introduction',
+    'description': 'description',
+    'mediainfo': 'mediainfo',
+    'category': 'category',
+    'medium': 'medium',
+    'video_codec': 'video_codec',
+    'audiocodec': 'audiocodec',
+    'standard': 'standard',
+    'production_team': 'production_team',
+    'tags': 'tags',
+}
+
+
+def _reextract_one(args):
+    """进程池任务：解压并用当前提取逻辑解析一个详情页"""
+    directory, entry, adapter_ref, fields = args
+    from bs4 import BeautifulSoup
+    from extraction import DetailExtractor
+    from site_adapters import get_adapter
+    try:
+        soup = BeautifulSoup(read_page(directory, entry), 'html.parser')
+        values = DetailExtractor(soup, get_adapter(adapter_ref)).extract(frozenset(fields))
+    except Exception as e:
+        return entry, None, f'{type(e).__name__}: {e}'
+    for f in ('description', 'mediainfo'):
+        if f in values:
+            values[f] = values[f] or ''
+    return entry, values, None
+
+
+def reextract(db_config: dict, directory: str, site: str | None = None, fields: list[str] | None = None,
+              workers: int | None = None, batch_size: int = 500, dry_run: bool = False) -> dict:
+    """
+    用归档的详情页重新提取字段，批量更新有变化的种子，返回统计；
+    changed 为实际更新的种子数，dry_run 时只统计 would_change，不写数据库
+    """
+    fields = [f for f in (fields or REEXTRACT_COLUMNS) if f in REEXTRACT_COLUMNS]
+    entries = [e for e in load_index(directory, 'detail', site).values() if e.get('torrent_url')]
+    stats = {'pages': len(entries), 'matched': 0, 'changed': 0, 'would_change': 0, 'errors': 0}
+    if not entries:
+        return stats
+    columns = [REEXTRACT_COLUMNS[f] for f in fields]
+    conn = storage.connect(db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT base_url, adapter FROM sites")
+        adapters = {row['base_url']: row.get('adapter') for row in cursor.fetchall()}
+
+        # 只按归档页面的 crawl_link 分批查询当前值，不扫描站点下的全部种子
+        links = sorted({e['torrent_url'] for e in entries})
+        current: dict[str, dict] = {}
+        for i in range(0, len(links), batch_size):
+            chunk = links[i:i + batch_size]
+            cursor.execute(
+                f"SELECT info_hash, crawl_link, {', '.join(columns)} FROM torrents "
+                f"WHERE crawl_link IN ({', '.join(['%s'] * len(chunk))})",
+                chunk,
+            )
+            for row in cursor.fetchall():
+                current[row['crawl_link']] = row
+
+        jobs = [(directory, e, adapters.get(e['site']), fields) for e in entries if e['torrent_url'] in current]
+        stats['matched'] = len(jobs)
+        updates: list[tuple] = []
+        sql = f"UPDATE torrents SET {', '.join(f'{c} = %s' for c in columns)} WHERE info_hash = %s"
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            for entry, values, error in pool.map(_reextract_one, jobs, chunksize=16):
+                if values is None:
+                    stats['errors'] += 1
+                    logger.warning('重新提取失败 %s: %s', entry['url'], error)
+                    continue
+                row = current[entry['torrent_url']]
+                if all(values.get(f) == row[REEXTRACT_COLUMNS[f]] for f in fields):
+                    continue
+                if dry_run:
+                    stats['would_change'] += 1
+                    continue
+                updates.append((*[values.get(f) for f in fields], row['info_hash']))
+                if len(updates) >= batch_size:
+                    cursor.executemany(sql, updates)
+                    conn.commit()
+                    stats['changed'] += len(updates)
+                    updates = []
+        if updates:
+            cursor.executemany(sql, updates)
+            conn.commit()
+            stats['changed'] += len(updates)
+    finally:
+        conn.close()
+    return stats
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='原始页面归档工具')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    r = sub.add_parser('reextract', help='用归档的详情页重新提取字段并更新数据库')
+    r.add_argument('--dir', help='归档目录，默认 <out_dir>/page_archive')
+    r.add_argument('--site', help='只处理该站点（base_url）')
+    r.add_argument('--fields', help=f"逗号分隔的字段，默认全部: {','.join(REEXTRACT_COLUMNS)}")
+    r.add_argument('--workers', type=int)
+    r.add_argument('--dry-run', action='store_true', help='只统计变化，不写数据库')
+    args = p.parse_args(argv)
+    setup_logging()
+    directory = args.dir or os.path.join(get_system_setting('out_dir', './output'), 'page_archive')
+    fields = [f.strip() for f in args.fields.split(',')] if args.fields else None
+    stats = reextract(get_database_config(), directory, args.site, fields, args.workers, dry_run=args.dry_run)
+    if args.dry_run:
+        logger.info('重新提取完成（未写入）: 归档页面 %d, 匹配种子 %d, 将更新 %d, 错误 %d',
+                    stats['pages'], stats['matched'], stats['would_change'], stats['errors'])
+    else:
+        logger.info('重新提取完成: 归档页面 %d, 匹配种子 %d, 已更新 %d, 错误 %d',
+                    stats['pages'], stats['matched'], stats['changed'], stats['errors'])
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
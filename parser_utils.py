@@ -1,5 +1,6 @@
 import hashlib
 import re
+from datetime import datetime
 from urllib.parse import urljoin
 
 import bencodepy
@@ -90,12 +91,10 @@ def extract_mediainfo(soup: BeautifulSoup) -> str | None:
         return None
     return pre.get_text('\n', strip=False) or None
 
-def extract_description(soup: BeautifulSoup) -> str | None:
+def prune_description(soup: BeautifulSoup) -> Tag | None:
     """
-    从 BeautifulSoup 对象中提取描述内容。
-
-    优先查找 #kdescr、#descr、.descr 元素，移除其中不包含“官组作品”或“原作者”文本的 <fieldset> 标签，
-    返回处理后的 HTML 字符串；若未找到目标节点或结果为空，则返回 None。
+    查找描述节点（#kdescr、#descr、.descr），就地移除其中不包含“官组作品”或“原作者”文本的 <fieldset> 标签，
+    返回描述节点；未找到时返回 None。重复调用结果不变。
     """
     node = soup.select_one('#kdescr') or soup.select_one('#descr') or soup.select_one('.descr')
     if not node:
@@ -109,6 +108,17 @@ def extract_description(soup: BeautifulSoup) -> str | None:
     for fs in list(node.find_all('fieldset')):
         if not _keep_fieldset(fs):
             fs.decompose()
+    return node
+
+def extract_description(soup: BeautifulSoup) -> str | None:
+    """
+    从 BeautifulSoup 对象中提取描述内容。
+
+    先经 prune_description 移除无关的 <fieldset>，返回处理后的 HTML 字符串；若未找到目标节点或结果为空，则返回 None。
+    """
+    node = prune_description(soup)
+    if not node:
+        return None
     return node.decode_contents() or None
 
 def extract_imdb(text: str) -> str | None:
@@ -227,6 +237,7 @@ def extract_title(soup: BeautifulSoup) -> str | None:
     移除其中的“免费/免費”标记和“剩余时间/剩餘時間”信息，
     并将多余空白压缩为单个空格，最终返回处理后的标题字符串；
     若未找到对应 <h1> 或处理结果为空，则返回 None。
+    促销类型与到期时间由 extract_promotion 单独提取。
     """
     h = soup.find('h1', id='top')
     if not h:
@@ -237,6 +248,64 @@ def extract_title(soup: BeautifulSoup) -> str | None:
     t = re.sub(r'\s+', ' ', t).strip()
     return t or None
 
+# NexusPHP 促销：详情页标题中 <font class="..."> 的类名、列表页 <img class="pro_..."> 的类名与标记文字
+PROMOTION_CLASSES = {
+    'free': 'free',
+    'twoup': 'twoup',
+    'twoupfree': 'twoupfree',
+    'halfdown': 'halfdown',
+    'twouphalfdown': 'twouphalfdown',
+    'thirtypercent': 'thirtypercent',
+    'pro_free': 'free',
+    'pro_2up': 'twoup',
+    'pro_free2up': 'twoupfree',
+    'pro_50pctdown': 'halfdown',
+    'pro_50pctdown2up': 'twouphalfdown',
+    'pro_30pctdown': 'thirtypercent',
+}
+PROMOTION_LABELS = (
+    (r'2X\s*(免费|免費)', 'twoupfree'),
+    (r'2X\s*50%', 'twouphalfdown'),
+    (r'免费|免費', 'free'),
+    (r'50%', 'halfdown'),
+    (r'30%', 'thirtypercent'),
+    (r'2X', 'twoup'),
+)
+_DATETIME_RE = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?')
+
+def extract_promotion(node: Tag | BeautifulSoup) -> tuple[str | None, datetime | None]:
+    """
+    提取促销类型与到期时间，返回 (promotion, promotion_until)。
+
+    node 为详情页 soup 时只在 id 为 'top' 的 <h1> 中查找，也可直接传入列表页的种子行。
+    促销类型按 PROMOTION_CLASSES 识别元素类名，找不到时按 “[免费]” 一类的标记文字识别；
+    到期时间取 “剩余时间/剩餘時間” 后 <span title="YYYY-MM-DD HH:MM:SS"> 中的时间（站点本地时间）。
+    没有促销时返回 (None, None)；有促销但无期限时到期时间为 None。
+    """
+    if isinstance(node, BeautifulSoup):
+        node = node.find('h1', id='top')
+        if node is None:
+            return None, None
+    promotion = None
+    for el in node.find_all(class_=True):
+        promotion = next((PROMOTION_CLASSES[c] for c in el.get('class') if c in PROMOTION_CLASSES), None)
+        if promotion:
+            break
+    if promotion is None:
+        for marker in re.finditer(r'\[\s*([^\[\]]+?)\s*\]', node.get_text(' ', strip=True)):
+            promotion = next((p for pattern, p in PROMOTION_LABELS if re.fullmatch(pattern, marker.group(1))), None)
+            if promotion:
+                break
+    if promotion is None:
+        return None, None
+    until = None
+    for span in node.find_all('span', title=_DATETIME_RE):
+        if re.search(r'剩余|剩餘', span.parent.get_text()):
+            title = _DATETIME_RE.search(span['title']).group(0)
+            until = datetime.strptime(title, '%Y-%m-%d %H:%M:%S' if title.count(':') == 2 else '%Y-%m-%d %H:%M')
+            break
+    return promotion, until
+
 def extract_subtitle(soup: BeautifulSoup) -> str | None:
     """
     从 BeautifulSoup 对象中提取副标题文本。
@@ -324,11 +393,26 @@ def extract_basic_info(soup: BeautifulSoup) -> dict:
                     return result
             else:
                 return result
+    if target_td is None:
+        return result
+    return parse_labelled_block(target_td)
+
+def parse_labelled_block(target_td: Tag, label_map: dict[str, str] | None = None) -> dict:
+    """
+    解析“<b>标签</b> 值 <b>标签</b> 值 ...”形式的信息块。
+
+    label_map 为去掉冒号后的标签文本到字段名的精确映射（站点适配器提供）；
+    未提供时使用内置的 NexusPHP 标签归一化规则。
+    """
+    result: dict[str, str] = {}
     current_key: str | None = None
     for node in target_td.children:
         if isinstance(node, Tag) and node.name == 'b':
             label = node.get('title') or node.get_text(strip=True)
-            key = _normalize_label(label)
+            if label_map is not None:
+                key = label_map.get(label.strip().replace(':', '').replace('：', ''))
+            else:
+                key = _normalize_label(label)
             current_key = key
             if current_key and current_key not in result:
                 result[current_key] = ''
@@ -0,0 +1,161 @@
+"""抓取运行的按需性能剖析。
+
+- cpu: 后台线程定时采样被剖析线程的调用栈（sys._current_frames），输出火焰图可用的折叠栈
+- alloc: 使用 tracemalloc 记录内存分配，输出按分配栈折叠的字节数与分配位置排行
+
+产物写入 <out_dir>/profiles/：
+- <label>-<mode>.folded   折叠栈，每行 "frame;frame;frame count"，可直接交给 flamegraph.pl / speedscope
+- <label>-<mode>.top.txt  排行：cpu 为自身采样数最多的函数，alloc 为分配字节数最多的代码行
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from tracing import get_logger
+
+logger = get_logger('profiling')
+
+PROFILE_MODES = ('cpu', 'alloc')
+TOP_N = 50
+
+# tracemalloc 为进程级全局状态，同一时间只允许一个 alloc 剖析
+_alloc_lock = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+def top_path(folded_path: str) -> str:
+    """折叠栈文件对应的排行文件路径"""
+    return folded_path[:-len('.folded')] + '.top.txt' if folded_path.endswith('.folded') else folded_path + '.top.txt'
+
+
+class SamplingProfiler:
+    """
+    采样式 CPU 剖析器：每 interval 秒读取一次目标线程的栈帧。
+    被剖析线程不做任何插桩，开销只在采样线程上。
+    """
+
+    mode = 'cpu'
+
+    def __init__(self, interval: float = 0.005, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._started = 0.0
+        self.elapsed = 0.0
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.monotonic() - self._started
+
+    def write(self, folded_path: str):
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        self_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack.rsplit(';', 1)[-1]] += count
+        with open(top_path(folded_path), 'w', encoding='utf-8') as f:
+            f.write(f'# cpu samples={self.samples} interval={self.interval * 1000:.1f}ms elapsed={self.elapsed:.1f}s\n')
+            f.write('# self_samples  percent  function\n')
+            for func, count in self_counts.most_common(TOP_N):
+                f.write(f'{count:>14}  {count / max(1, self.samples) * 100:6.2f}%  {func}\n')
+
+
+class AllocProfiler:
+    """基于 tracemalloc 的内存分配剖析器"""
+
+    mode = 'alloc'
+
+    def __init__(self, nframes: int = 25):
+        self.nframes = nframes
+        self.snapshot = None
+        self._owned = False
+
+    def start(self):
+        if not _alloc_lock.acquire(blocking=False):
+            raise RuntimeError('已有内存剖析正在进行')
+        if tracemalloc.is_tracing():
+            _alloc_lock.release()
+            raise RuntimeError('tracemalloc 已被其他代码启用')
+        self._owned = True
+        tracemalloc.start(self.nframes)
+
+    def stop(self):
+        try:
+            self.snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ))
+        finally:
+            tracemalloc.stop()
+            if self._owned:
+                self._owned = False
+                _alloc_lock.release()
+
+    def write(self, folded_path: str):
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            for stat in self.snapshot.statistics('traceback'):
+                # traceback 按从外到内排列，与折叠栈的根在前一致
+                stack = ';'.join(f'{os.path.basename(fr.filename)}:{fr.lineno}' for fr in stat.traceback)
+                f.write(f'{stack} {stat.size}\n')
+        stats = self.snapshot.statistics('lineno')
+        total = sum(s.size for s in stats)
+        with open(top_path(folded_path), 'w', encoding='utf-8') as f:
+            f.write(f'# alloc live_bytes={total} sites={len(stats)}\n')
+            f.write('# size_kib  count  location\n')
+            for stat in stats[:TOP_N]:
+                fr = stat.traceback[0]
+                f.write(f'{stat.size / 1024:>10.1f}  {stat.count:>5}  {fr.filename}:{fr.lineno}\n')
+
+
+def start_profiler(mode: str | None):
+    """
+    按模式启动剖析器；mode 为空时返回 None。在被剖析的线程中调用
+    """
+    if not mode:
+        return None
+    if mode not in PROFILE_MODES:
+        raise ValueError(f'不支持的剖析模式: {mode}')
+    profiler = SamplingProfiler() if mode == 'cpu' else AllocProfiler()
+    profiler.start()
+    logger.info('[profile] 开始 %s 剖析', mode)
+    return profiler
+
+
+def stop_profiler(profiler, out_dir: str, label: str) -> str:
+    """
+    停止剖析并写入产物，返回折叠栈文件路径
+    """
+    profiler.stop()
+    profile_dir = os.path.join(out_dir, 'profiles')
+    os.makedirs(profile_dir, exist_ok=True)
+    folded_path = os.path.join(profile_dir, f'{label}-{profiler.mode}.folded')
+    profiler.write(folded_path)
+    logger.info('[profile] %s 剖析结果已保存: %s', profiler.mode, folded_path)
+    return folded_path
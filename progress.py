@@ -0,0 +1,123 @@
+"""运行进度的进程内发布/订阅。
+
+抓取线程通过 RunProgress 上报计数（页数、新增、跳过、错误），按时间间隔节流后发布到以任务 id 为频道的 ProgressHub；
+订阅方是事件循环中的 asyncio 队列（/tasks/{id}/events 的 SSE 连接），跨线程投递使用 call_soon_threadsafe。
+每个频道保留最后一条事件，新连接先收到当前状态。
+"""
+import asyncio
+import json
+import threading
+import time
+
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, channel, loop: asyncio.AbstractEventLoop):
+        self.channel = channel
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+
+    def _put(self, event: dict):
+        # 进度事件都是完整快照，订阅方跟不上时丢弃最旧的一条即可
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class ProgressHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict = {}
+        self._last: dict = {}
+
+    def subscribe(self, channel) -> Subscription:
+        """在事件循环中调用"""
+        sub = Subscription(channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.channel)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.channel]
+
+    def publish(self, channel, event: dict):
+        """可在任意线程调用"""
+        with self._lock:
+            self._last[channel] = event
+            subs = list(self._subscribers.get(channel, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(sub)
+
+    def last(self, channel) -> dict | None:
+        with self._lock:
+            return self._last.get(channel)
+
+
+PROGRESS_HUB = ProgressHub()
+
+
+class RunProgress:
+    """
+    单次运行的进度上报器；update 按 interval 节流，start / finish 总是立即发布
+    """
+
+    def __init__(self, task_id, hub: ProgressHub | None = None, interval: float = 1.0):
+        self.task_id = task_id
+        self.hub = hub or PROGRESS_HUB
+        self.interval = interval
+        self.run_id = None
+        self.started = time.monotonic()
+        self.counters = {'pages': 0, 'created': 0, 'skipped': 0, 'errors': 0}
+        self._last_publish = 0.0
+        self._last_created = 0
+
+    def _event(self, kind: str, status: str, **extra) -> dict:
+        now = time.monotonic()
+        elapsed = now - self.started
+        window = now - self._last_publish if self._last_publish else elapsed
+        created = self.counters['created']
+        event = {
+            'event': kind,
+            'status': status,
+            'task_id': self.task_id,
+            'run_id': self.run_id,
+            **self.counters,
+            'elapsed': round(elapsed, 1),
+            'rate': round((created - self._last_created) / window, 2) if window > 0 else 0.0,
+            'avg_rate': round(created / elapsed, 2) if elapsed > 0 else 0.0,
+            'ts': int(time.time()),
+            **extra,
+        }
+        self._last_publish = now
+        self._last_created = created
+        return event
+
+    def start(self, run_id=None):
+        self.run_id = run_id
+        self.started = time.monotonic()
+        self._last_publish = 0.0
+        self._last_created = 0
+        self.hub.publish(self.task_id, self._event('started', 'running'))
+
+    def update(self, force: bool = False, **counters):
+        self.counters.update(counters)
+        if force or time.monotonic() - self._last_publish >= self.interval:
+            self.hub.publish(self.task_id, self._event('progress', 'running'))
+
+    def finish(self, status: str = 'done', error: str | None = None, **counters):
+        self.counters.update(counters)
+        self.hub.publish(self.task_id, self._event('finished', status, error=error))
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event.get('event', 'message')}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
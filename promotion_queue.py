@@ -0,0 +1,67 @@
+"""按促销优先级排序待处理的种子：免费优先，同一级别内到期时间近的优先，其余保持原有顺序。
+
+- 下载：crawl() 按列表顺序抓完一页的详情页后，对其中未入库的种子按促销信息排序再逐个下载
+- 上传：upload_torrents.fetch_pending 以 PENDING_UPLOAD_ORDER 在 SQL 中按同样的规则排序
+已过期的促销视同没有促销；促销类型见 parser_utils.PROMOTION_CLASSES。
+"""
+import heapq
+import itertools
+import math
+from datetime import datetime
+
+FREE_PROMOTIONS = frozenset({'free', 'twoupfree'})
+
+# 与 priority_key 一致的 SQL 排序（torrents.promotion / promotion_until），同级别内新入库的优先
+_ACTIVE_UNTIL = "CASE WHEN promotion IS NOT NULL AND promotion_until > NOW() THEN promotion_until END"
+PENDING_UPLOAD_ORDER = (
+    "CASE WHEN promotion IS NULL OR promotion_until <= NOW() THEN 2 "
+    "WHEN promotion IN ('free', 'twoupfree') THEN 0 ELSE 1 END, "
+    f"({_ACTIVE_UNTIL}) IS NULL, {_ACTIVE_UNTIL}, id DESC"
+)
+
+
+def promotion_rank(promotion: str | None, until: datetime | None, now: datetime | None = None) -> int:
+    """0 为免费，1 为其他促销，2 为无促销或促销已过期"""
+    if not promotion:
+        return 2
+    if until is not None and until <= (now or datetime.now()):
+        return 2
+    return 0 if promotion in FREE_PROMOTIONS else 1
+
+
+def priority_key(promotion: str | None, until: datetime | None, now: datetime | None = None) -> tuple:
+    rank = promotion_rank(promotion, until, now)
+    return rank, until.timestamp() if rank < 2 and until is not None else math.inf
+
+
+class PromotionQueue:
+    """堆实现的优先队列，优先级相同的条目按加入顺序出队"""
+
+    def __init__(self, now: datetime | None = None):
+        self.now = now or datetime.now()
+        self._heap: list[tuple] = []
+        self._seq = itertools.count()
+
+    def push(self, item, promotion: str | None = None, until: datetime | None = None):
+        heapq.heappush(self._heap, (priority_key(promotion, until, self.now), next(self._seq), item))
+
+    def pop(self):
+        return heapq.heappop(self._heap)[-1]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def drain(self) -> list:
+        return [self.pop() for _ in range(len(self._heap))]
+
+
+def prioritize(items: list, promotions: dict) -> list:
+    """
+    按 promotions（item -> (promotion, promotion_until)）排序 items，没有促销信息的条目排在最后并保持原有顺序
+    """
+    if not promotions:
+        return list(items)
+    queue = PromotionQueue()
+    for item in items:
+        queue.push(item, *promotions.get(item, (None, None)))
+    return queue.drain()
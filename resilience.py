@@ -0,0 +1,224 @@
+"""抓取请求的容错层：按状态码分类重试、指数退避（带抖动）、Retry-After 与站点级熔断器。"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from tracing import get_logger, redact
+
+logger = get_logger('resilience')
+
+# 重试分类：throttle 类优先遵守 Retry-After，且退避基数更大
+RETRY_CLASSES = {
+    'throttle': {429, 503},
+    'server': {500, 502, 504, 520, 521, 522, 523, 524},
+    'timeout': {408, 425},
+}
+
+
+# Retry-After 的上限，避免异常响应头让抓取长时间挂起
+MAX_RETRY_AFTER = 600.0
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """站点熔断中，请求未发出"""
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    解析 Retry-After 头：支持秒数与 HTTP 日期两种格式，返回需等待的秒数
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    重试策略。第 n 次重试的等待时间为 [0, min(max_delay, base * 2**n)] 内的随机值（full jitter）。
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 throttle_base_delay: float = 5.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.throttle_base_delay = float(throttle_base_delay)
+
+    @staticmethod
+    def classify(status_code: int) -> str | None:
+        for name, codes in RETRY_CLASSES.items():
+            if status_code in codes:
+                return name
+        return None
+
+    def backoff(self, attempt: int, retry_class: str) -> float:
+        base = self.throttle_base_delay if retry_class == 'throttle' else self.base_delay
+        return random.uniform(0, min(self.max_delay, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    站点级熔断器：连续失败 failure_threshold 次后打开，reset_timeout 秒内拒绝请求；
+    之后进入半开状态只放行一个试探请求，成功则关闭，失败则重新打开。
+    试探进行中其他调用方每隔 TRIAL_POLL 秒重新检查；试探超过 reset_timeout 仍无结果时视为丢失，另放行一个。
+    """
+
+    TRIAL_POLL = 1.0
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = None
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """
+        距离允许请求还需等待的秒数，0 表示可以请求；半开状态下返回 0 即占用了唯一的试探名额，
+        调用方必须随后以 record_success / record_failure 报告结果
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'closed':
+                return 0.0
+            if self.state == 'open':
+                left = self.opened_at + self.reset_timeout - now
+                if left > 0:
+                    return left
+                self.state = 'half_open'
+                self.trial_started = None
+            if self.trial_started is not None:
+                trial_left = self.trial_started + self.reset_timeout - now
+                if trial_left > 0:
+                    return min(self.TRIAL_POLL, trial_left)
+            self.trial_started = now
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning('[breaker] 连续失败 %d 次，暂停站点 %.0fs', self.failures, self.reset_timeout)
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self.trial_started = None
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(site_key: str, failure_threshold: int = 5, reset_timeout: float = 60.0) -> CircuitBreaker:
+    """
+    按站点（主机名）获取进程内共享的熔断器，同一站点的多个任务共用熔断状态
+    """
+    key = urlparse(site_key).netloc or site_key
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(failure_threshold, reset_timeout)
+            _breakers[key] = breaker
+        return breaker
+
+
+class ResilientFetcher:
+    """
+    对单次请求函数施加重试/退避/熔断。
+
+    - 网络错误与 RETRY_CLASSES 中的状态码会重试，最多 policy.max_attempts 次
+    - 其他状态码（200、404 等）直接返回，并视为站点可用
+    - 熔断打开时：pause_on_open 为 True 则等待冷却后继续（暂停该站点），否则抛出 CircuitOpenError
+    """
+
+    def __init__(self, policy: RetryPolicy, breaker: CircuitBreaker, pause_on_open: bool = True,
+                 sleep=time.sleep):
+        self.policy = policy
+        self.breaker = breaker
+        self.pause_on_open = pause_on_open
+        self.sleep = sleep
+        self.retries = 0
+
+    @classmethod
+    def for_site(cls, base_url: str, opts=None) -> 'ResilientFetcher':
+        policy = RetryPolicy(
+            max_attempts=getattr(opts, 'retry_max_attempts', 4),
+            base_delay=getattr(opts, 'retry_base_delay', 1.0),
+            max_delay=getattr(opts, 'retry_max_delay', 60.0),
+        )
+        breaker = get_breaker(
+            base_url,
+            failure_threshold=getattr(opts, 'breaker_failure_threshold', 5),
+            reset_timeout=getattr(opts, 'breaker_reset_timeout', 60.0),
+        )
+        return cls(policy, breaker)
+
+    def _wait_for_breaker(self):
+        left = self.breaker.remaining()
+        if left <= 0:
+            return
+        if not self.pause_on_open:
+            raise CircuitOpenError(f'circuit open, retry in {left:.1f}s')
+        logger.info('[breaker] 站点熔断中，等待 %.1fs', left)
+        # 冷却结束后可能已有其他调用方占用试探名额，醒来后重新检查
+        while left > 0:
+            self.sleep(left)
+            left = self.breaker.remaining()
+
+    def request(self, url: str, send) -> requests.Response:
+        """
+        send 为无参函数，执行一次实际请求并返回 Response
+        """
+        attempts = self.policy.max_attempts
+        for attempt in range(attempts):
+            self._wait_for_breaker()
+            last = attempt == attempts - 1
+            try:
+                resp = send()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.breaker.record_failure()
+                if last:
+                    raise
+                delay = self.policy.backoff(attempt, 'network')
+                logger.info('[retry] %s: %s，%.1fs 后重试 (%d/%d)', redact(url), e.__class__.__name__, delay, attempt + 1, attempts)
+                self.retries += 1
+                self.sleep(delay)
+                continue
+
+            retry_class = self.policy.classify(resp.status_code)
+            if retry_class is None:
+                self.breaker.record_success()
+                return resp
+            self.breaker.record_failure()
+            if last:
+                return resp
+            delay = self.policy.backoff(attempt, retry_class)
+            retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, MAX_RETRY_AFTER))
+            logger.info('[retry] %s: HTTP %s，%.1fs 后重试 (%d/%d)', redact(url), resp.status_code, delay, attempt + 1, attempts)
+            self.retries += 1
+            self.sleep(delay)
+        raise requests.exceptions.RetryError(f'retries exhausted for {redact(url)}')
@@ -0,0 +1,126 @@
+"""进程内 API 响应缓存：TTL + 按标签失效 + ETag。
+
+读接口以 `await RESPONSE_CACHE.get_or_load(key, loader, tags, ttl)` 取得已序列化的 JSON 与 ETag：
+- 命中且未过期直接返回；未命中时同一 key 的并发请求只执行一次 loader
+- 写接口与抓取入库调用 `invalidate(*tags)`（线程安全，可在运行池线程中调用），带有这些标签的条目立即删除；
+  loader 执行期间标签被失效时，结果返回给本次请求但不写入缓存
+- stats() 提供命中、未命中、304 与失效次数
+
+其他进程（worker、importer）的写入不会触发失效，只能等 TTL 过期。
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    __slots__ = ('body', 'etag', 'expires', 'tags')
+
+    def __init__(self, body: bytes, tags: tuple, expires: float):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.expires = expires
+        self.tags = tags
+
+
+def encode_json(value) -> bytes:
+    """与 FastAPI JSONResponse 相同的紧凑编码；datetime 等类型需先经 jsonable_encoder 转换"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+class ResponseCache:
+    def __init__(self, default_ttl: float = 30.0, max_entries: int = 256, encoder=encode_json):
+        self.default_ttl = float(default_ttl)
+        self.max_entries = max_entries
+        self.encoder = encoder
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0, 'evictions': 0}
+
+    def _generation(self, tags: tuple) -> tuple:
+        return tuple(self._generations.get(t, 0) for t in tags)
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value, tags: tuple = (), ttl: float | None = None, generation: tuple | None = None) -> CacheEntry:
+        entry = CacheEntry(self.encoder(value), tuple(tags),
+                           time.monotonic() + (self.default_ttl if ttl is None else ttl))
+        with self._lock:
+            if generation is not None and generation != self._generation(entry.tags):
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+        return entry
+
+    async def get_or_load(self, key: str, loader, tags: tuple = (), ttl: float | None = None) -> CacheEntry:
+        """loader 为无参协程函数，返回可 JSON 序列化的值"""
+        entry = self.get(key)
+        if entry is not None:
+            self.counters['hits'] += 1
+            return entry
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.counters['hits'] += 1
+            return await asyncio.shield(pending)
+        self.counters['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            with self._lock:
+                generation = self._generation(tuple(tags))
+            value = await loader()
+            entry = self.put(key, value, tags, ttl, generation)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "Future exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, *tags: str) -> int:
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [k for k, e in self._entries.items() if any(t in e.tags for t in tags)]
+            for k in stale:
+                del self._entries[k]
+            self.counters['invalidations'] += 1
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def not_modified(self):
+        self.counters['not_modified'] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'entries': len(self._entries),
+            'hit_rate': round(self.counters['hits'] / lookups, 4) if lookups else 0.0,
+        }
+
+
+RESPONSE_CACHE = ResponseCache()
@@ -0,0 +1,150 @@
+"""抓取运行池：手动与定时运行都在独立的工作线程中执行，不占用 API 的事件循环。
+
+- 每次运行持有一个 RunControl：取消标志、墙钟时间预算与条目预算，crawl() 在每个详情页之间检查；
+- 取消或超出预算时 crawl() 正常退出循环，照常保存检查点、去重快照并发布结束事件（状态 cancelled，下次运行从断点继续）；
+- 同一任务同时只允许一个运行；每个任务保留最近一次运行的句柄，按句柄 id 查询与取消（排队中的运行尚无 crawl_runs 记录）。
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from tracing import get_logger
+
+logger = get_logger('run_manager')
+
+# 排队、执行中与取消中的运行视为活动运行
+ACTIVE_STATUSES = ('queued', 'running', 'cancelling')
+_handle_ids = itertools.count(1)
+
+
+class RunControl:
+    """
+    单次运行的控制对象；max_seconds / max_items 为 None 或 0 时不限制
+    """
+
+    def __init__(self, max_seconds: float | None = None, max_items: int | None = None):
+        self.max_seconds = float(max_seconds) if max_seconds else None
+        self.max_items = int(max_items) if max_items else None
+        self.started = time.monotonic()
+        self.run_id = None
+        self.reason = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self, reason: str = '已取消'):
+        if not self._cancel.is_set():
+            self.reason = reason
+            self._cancel.set()
+
+    def should_stop(self, created: int = 0) -> bool:
+        """检查取消标志与预算；超出预算时视同取消并记录原因"""
+        if self.max_seconds and time.monotonic() - self.started >= self.max_seconds:
+            self.cancel(f'超出时间预算 {self.max_seconds:g}s')
+        elif self.max_items and created >= self.max_items:
+            self.cancel(f'达到条目预算 {self.max_items}')
+        return self._cancel.is_set()
+
+    def sleep(self, seconds: float) -> bool:
+        """可被取消打断的 sleep；返回是否已取消"""
+        return self._cancel.wait(seconds)
+
+
+class RunHandle:
+    def __init__(self, task_id, control: RunControl):
+        self.id = next(_handle_ids)
+        self.task_id = task_id
+        self.control = control
+        self.submitted_at = time.time()
+        self.future: Future | None = None
+
+    @property
+    def status(self) -> str:
+        if self.future is None or not self.future.done():
+            if self.control.cancelled:
+                return 'cancelling'
+            return 'running' if self.future is not None and self.future.running() else 'queued'
+        if self.future.exception() is not None:
+            return 'failed'
+        return 'cancelled' if self.control.cancelled else 'done'
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'task_id': self.task_id,
+            'run_id': self.control.run_id,
+            'status': self.status,
+            'submitted_at': int(self.submitted_at),
+            'reason': self.control.reason,
+            'max_seconds': self.control.max_seconds,
+            'max_items': self.control.max_items,
+        }
+
+
+class RunManager:
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max(1, int(max_workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='crawl-run')
+        self._lock = threading.Lock()
+        self._runs: dict = {}
+
+    def submit(self, task_id, target: Callable[[RunControl], object],
+               max_seconds: float | None = None, max_items: int | None = None) -> RunHandle:
+        """
+        提交一次运行，target(control) 在工作线程中执行；该任务已有运行时抛出 RuntimeError
+        """
+        with self._lock:
+            current = self._runs.get(task_id)
+            if current is not None and current.status in ACTIVE_STATUSES:
+                raise RuntimeError(f'任务 {task_id} 正在运行')
+            handle = RunHandle(task_id, RunControl(max_seconds, max_items))
+            self._runs[task_id] = handle
+
+        def _run():
+            # 排队期间已取消的运行不再执行
+            if handle.control.cancelled:
+                return None
+            # 时间预算从真正开始执行时计算，排队时间不计入
+            handle.control.started = time.monotonic()
+            try:
+                return target(handle.control)
+            except Exception:
+                logger.exception('任务 %s 运行失败', task_id)
+                raise
+
+        handle.future = self._pool.submit(_run)
+        return handle
+
+    def get_run(self, handle_id: int) -> RunHandle | None:
+        """按句柄 id 查找运行（只保留每个任务最近一次的运行）"""
+        with self._lock:
+            return next((h for h in self._runs.values() if h.id == handle_id), None)
+
+    def cancel_run(self, handle_id: int, reason: str = '已取消') -> RunHandle | None:
+        """
+        取消排队中或执行中的运行；运行不存在时返回 None，已结束时抛出 RuntimeError
+        """
+        handle = self.get_run(handle_id)
+        if handle is None:
+            return None
+        if handle.status not in ACTIVE_STATUSES:
+            raise RuntimeError(f'运行 {handle_id} 已结束（{handle.status}）')
+        handle.control.cancel(reason)
+        logger.info('取消运行 %s（任务 %s）', handle_id, handle.task_id)
+        return handle
+
+    def active(self) -> list[dict]:
+        with self._lock:
+            return [h.to_dict() for h in self._runs.values() if h.status in ACTIVE_STATUSES]
+
+    def shutdown(self, wait: bool = True):
+        """取消所有运行并等待它们保存检查点后退出"""
+        with self._lock:
+            handles = list(self._runs.values())
+        for handle in handles:
+            handle.control.cancel('服务停止')
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,237 @@
+"""抓取去重用的内存已见集合。
+
+每个 crawl_link / info_hash 以 blake2b 取 64 位摘要保存：
+- 布隆过滤器先行判断，绝大多数“未见过”的查询直接返回，不碰精确集合
+- 精确集合为有序的 uint64 数组（每项 8 字节）加一个近期新增的小集合，用于确认布隆过滤器的阳性结果
+
+进程内按数据库共享一个实例：首次使用时加载 out_dir 下的快照，再按 torrents.id 高水位增量补齐；
+检测到有行被删除（行数对不上）时全量重建。每次运行结束写回快照，下次启动只需增量加载。
+"""
+import bisect
+import hashlib
+import json
+import math
+import os
+import threading
+from array import array
+
+import pymysql
+import pymysql.cursors
+
+import storage
+from tracing import get_logger
+
+logger = get_logger('seen_set')
+
+SNAPSHOT_NAME = 'seen_set.bin'
+SNAPSHOT_VERSION = 1
+RECENT_MERGE_SIZE = 50000
+
+
+def _digest(kind: str, value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f'{kind}:{value}'.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class BloomFilter:
+    """以 64 位摘要为输入的布隆过滤器（双重哈希派生 k 个位置）"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001, bits: bytearray | None = None):
+        self.capacity = max(1000, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bits if bits is not None and len(bits) == (self.size + 7) // 8 else bytearray((self.size + 7) // 8)
+
+    def _positions(self, d: int):
+        h1 = d & 0xFFFFFFFF
+        h2 = (d >> 32) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, d: int):
+        for pos in self._positions(d):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, d: int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(d))
+
+
+class SeenSet:
+    """
+    已见过的抓取链接与 info_hash 集合。线程安全：多个站点线程共享同一实例
+    """
+
+    def __init__(self, capacity: int = 100000):
+        self._sorted = array('Q')
+        self._recent: set[int] = set()
+        self.bloom = BloomFilter(capacity)
+        self.max_id = 0
+        self.rows = 0
+        self.lookups = 0
+        self.bloom_negatives = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def _contains_digest(self, d: int) -> bool:
+        self.lookups += 1
+        if d not in self.bloom:
+            self.bloom_negatives += 1
+            return False
+        if d in self._recent:
+            return True
+        i = bisect.bisect_left(self._sorted, d)
+        return i < len(self._sorted) and self._sorted[i] == d
+
+    def _add_digest(self, d: int):
+        if d in self.bloom and (d in self._recent or self._contains_sorted(d)):
+            return
+        self._recent.add(d)
+        self.bloom.add(d)
+        if len(self._recent) >= RECENT_MERGE_SIZE:
+            self._merge()
+        if len(self) > self.bloom.capacity:
+            self._rebuild_bloom(len(self) * 2)
+
+    def _contains_sorted(self, d: int) -> bool:
+        i = bisect.bisect_left(self._sorted, d)
+        return i < len(self._sorted) and self._sorted[i] == d
+
+    def _merge(self):
+        if self._recent:
+            self._sorted = array('Q', sorted(set(self._sorted).union(self._recent)))
+            self._recent = set()
+
+    def _rebuild_bloom(self, capacity: int):
+        self._merge()
+        self.bloom = BloomFilter(capacity, self.bloom.error_rate)
+        for d in self._sorted:
+            self.bloom.add(d)
+
+    def has_link(self, crawl_link: str) -> bool:
+        with self._lock:
+            return self._contains_digest(_digest('link', crawl_link))
+
+    def has_hash(self, info_hash: str) -> bool:
+        with self._lock:
+            return self._contains_digest(_digest('hash', info_hash))
+
+    def add(self, info_hash: str | None = None, crawl_link: str | None = None):
+        with self._lock:
+            if info_hash:
+                self._add_digest(_digest('hash', info_hash))
+            if crawl_link:
+                self._add_digest(_digest('link', crawl_link))
+
+    def load_rows(self, db_conn: pymysql.connections.Connection) -> int:
+        """
+        用服务端游标流式读取 id 高水位之后的行并加入集合，返回新增行数
+        """
+        cursor = db_conn.cursor(pymysql.cursors.SSCursor)
+        added = 0
+        digests = []
+        try:
+            cursor.execute("SELECT id, info_hash, crawl_link FROM torrents WHERE id > %s ORDER BY id", (self.max_id,))
+            for row_id, info_hash, crawl_link in cursor:
+                if info_hash:
+                    digests.append(_digest('hash', info_hash))
+                if crawl_link:
+                    digests.append(_digest('link', crawl_link))
+                self.max_id = max(self.max_id, row_id)
+                added += 1
+        finally:
+            cursor.close()
+        with self._lock:
+            if digests:
+                self._recent.update(digests)
+                self._merge()
+                if len(self) > self.bloom.capacity:
+                    self._rebuild_bloom(len(self) * 2)
+                else:
+                    for d in digests:
+                        self.bloom.add(d)
+            self.rows += added
+        return added
+
+    def save(self, path: str):
+        """写入快照：一行 JSON 头，随后依次为布隆过滤器位图与有序摘要数组"""
+        with self._lock:
+            self._merge()
+            header = {
+                'version': SNAPSHOT_VERSION,
+                'max_id': self.max_id,
+                'rows': self.rows,
+                'capacity': self.bloom.capacity,
+                'error_rate': self.bloom.error_rate,
+                'bloom_bytes': len(self.bloom.bits),
+                'digests': len(self._sorted),
+            }
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                f.write(self.bloom.bits)
+                self._sorted.tofile(f)
+            os.replace(tmp, path)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> 'SeenSet | None':
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('version') != SNAPSHOT_VERSION:
+                    return None
+                bits = bytearray(f.read(header['bloom_bytes']))
+                digests = array('Q')
+                digests.fromfile(f, header['digests'])
+        except (OSError, ValueError, KeyError, EOFError) as e:
+            logger.warning('读取去重快照失败，将全量加载: %s', e)
+            return None
+        seen = cls(header['capacity'])
+        seen.bloom = BloomFilter(header['capacity'], header['error_rate'], bits)
+        seen._sorted = digests
+        seen.max_id = header['max_id']
+        seen.rows = header['rows']
+        return seen
+
+
+_instances: dict[tuple, SeenSet] = {}
+_instances_lock = threading.Lock()
+
+
+def _table_state(db_conn: pymysql.connections.Connection) -> tuple[int, int]:
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT COUNT(*) AS n, COALESCE(MAX(id), 0) AS max_id FROM torrents")
+    row = cursor.fetchone()
+    if isinstance(row, dict):
+        return int(row['n']), int(row['max_id'])
+    return int(row[0]), int(row[1])
+
+
+def get_seen_set(db_conn: pymysql.connections.Connection, db_config: dict, out_dir: str) -> SeenSet:
+    """
+    获取（必要时加载并增量刷新）当前数据库对应的已见集合
+    """
+    key = storage.config_key(db_config)
+    with _instances_lock:
+        seen = _instances.get(key)
+        if seen is None:
+            seen = SeenSet.from_snapshot(os.path.join(out_dir, SNAPSHOT_NAME)) or SeenSet()
+        seen.load_rows(db_conn)
+        # 先增量加载再取行数：加载期间的并发插入只会让行数偏大，不会误判
+        count, max_id = _table_state(db_conn)
+        if seen.rows > count or seen.max_id > max_id:
+            # 有行被删除（或快照属于另一个库），全量重建
+            logger.info('去重集合与 torrents 表不一致 (rows %d/%d, max_id %d/%d)，全量重建',
+                        seen.rows, count, seen.max_id, max_id)
+            seen = SeenSet(capacity=max(100000, count * 4))
+            seen.load_rows(db_conn)
+        _instances[key] = seen
+    return seen
+
+
+def save_seen_set(seen: SeenSet, out_dir: str):
+    try:
+        seen.save(os.path.join(out_dir, SNAPSHOT_NAME))
+    except OSError as e:
+        logger.warning('保存去重快照失败: %s', e)
@@ -0,0 +1,207 @@
+"""站点适配器：以声明式配置描述站点的页面结构。
+
+sites.adapter 列可为内置适配器名（如 'nexusphp'），或一段 JSON 配置；JSON 中未给出的项沿用 NexusPHP 默认值。
+配置在首次使用时编译（CSS 选择器预编译为 soupsieve 对象）并按配置文本缓存，之后的解析只执行这些选择器。
+
+配置结构：
+{
+  "name": "mysite",
+  "list": {"detail_link": "<CSS>", "page_param": "page", "page_offset": 0, "pager": "<CSS，分页链接>"},
+  "detail": {
+    "torrent_link": "<CSS>",
+    "basic_info": "<CSS，指向 <b>标签</b> 值 形式的信息块>",
+    "labels": {"大小": "size", "类型": "category", ...},
+    "fields": {"title": "<CSS>", "tags": {"selector": "<CSS>", "all": true}, "description": {"selector": "<CSS>", "html": true}}
+  }
+}
+
+JSON 可用 "extends" 指定基于哪个内置适配器（默认 nexusphp）。
+fields 中声明的字段只通过对应选择器提取；未声明的字段使用 parser_utils 中的通用 NexusPHP 提取函数。
+"""
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from parser_utils import _parse_size_text, absolute_url, extract_promotion, parse_labelled_block
+from tracing import get_logger
+
+logger = get_logger('site_adapters')
+
+DEFAULT_ADAPTER = 'nexusphp'
+
+# NexusPHP 默认规则，与 find_detail_links / find_torrent_link 的匹配规则一致
+NEXUSPHP_SPEC = {
+    'name': 'nexusphp',
+    'list': {
+        'detail_link': 'a[href*="details.php?id="], a[href*="/details/"], a[href*="view.php?id="]',
+        'page_param': 'page',
+        'page_offset': 0,
+        # 分页条中的页码链接（NexusPHP 在列表上下各输出一条，末页链接带最大页码）
+        'pager': 'a[href*="page="]',
+    },
+    'detail': {
+        'torrent_link': 'a[href*="download.php?id="], a[href$=".torrent"]',
+        'basic_info': None,
+        'labels': None,
+        'fields': {},
+    },
+}
+
+BUILTIN_SPECS = {
+    'nexusphp': NEXUSPHP_SPEC,
+}
+
+
+class FieldRule:
+    """单个字段的选择器规则"""
+
+    def __init__(self, field: str, rule):
+        if isinstance(rule, str):
+            rule = {'selector': rule}
+        self.field = field
+        self.selector = soupsieve.compile(rule['selector'])
+        self.attr = rule.get('attr')
+        self.all = bool(rule.get('all'))
+        self.html = bool(rule.get('html'))
+        self.separator = rule.get('separator', ',')
+
+    def _value(self, node) -> str | None:
+        if self.attr:
+            return node.get(self.attr)
+        if self.html:
+            return node.decode_contents()
+        return node.get_text(strip=True)
+
+    def extract(self, soup: BeautifulSoup):
+        if self.all:
+            values = [v for v in (self._value(n) for n in self.selector.select(soup)) if v]
+            value = self.separator.join(values)
+        else:
+            node = self.selector.select_one(soup)
+            value = self._value(node) if node is not None else None
+        if not value:
+            return None
+        if self.field == 'size':
+            return _parse_size_text(value)
+        return value
+
+
+class SiteAdapter:
+    """编译后的站点适配器"""
+
+    def __init__(self, spec: dict):
+        self.name = spec.get('name') or 'custom'
+        list_spec = spec['list']
+        detail_spec = spec['detail']
+        self.detail_link = soupsieve.compile(list_spec['detail_link'])
+        self.page_param = list_spec.get('page_param') or 'page'
+        self.page_offset = int(list_spec.get('page_offset') or 0)
+        self.pager = soupsieve.compile(list_spec['pager']) if list_spec.get('pager') else None
+        self.torrent_link = soupsieve.compile(detail_spec['torrent_link'])
+        self.basic_info = soupsieve.compile(detail_spec['basic_info']) if detail_spec.get('basic_info') else None
+        self.labels = detail_spec.get('labels')
+        self.fields = {f: FieldRule(f, rule) for f, rule in (detail_spec.get('fields') or {}).items()}
+
+    def find_detail_links(self, soup: BeautifulSoup, base_url: str) -> list[str]:
+        links: dict[str, None] = {}
+        for a in self.detail_link.select(soup):
+            if a.get('href'):
+                links.setdefault(absolute_url(base_url, a['href']))
+        return list(links)
+
+    def list_promotions(self, soup: BeautifulSoup, base_url: str) -> dict[str, tuple]:
+        """
+        读取列表页每个种子行上的促销标记，返回 {详情页链接: (promotion, promotion_until)}，只包含有促销的种子
+        """
+        promotions: dict[str, tuple] = {}
+        for a in self.detail_link.select(soup):
+            row = a.find_parent('tr')
+            if row is None or not a.get('href'):
+                continue
+            link = absolute_url(base_url, a['href'])
+            if link not in promotions:
+                promotion, until = extract_promotion(row)
+                if promotion:
+                    promotions[link] = (promotion, until)
+        return promotions
+
+    def find_torrent_link(self, soup: BeautifulSoup, base_url: str) -> str | None:
+        a = self.torrent_link.select_one(soup)
+        if a is None or not a.get('href'):
+            return None
+        return absolute_url(base_url, a['href'])
+
+    def page_query(self, page: int) -> str:
+        return f'{self.page_param}={page + self.page_offset}'
+
+    def last_page(self, soup: BeautifulSoup) -> int | None:
+        """
+        从列表页的分页条读取最大页码（已换算为 page_query 使用的页码）；没有分页条时返回 None
+        """
+        if self.pager is None:
+            return None
+        last = None
+        for a in self.pager.select(soup):
+            values = parse_qs(urlparse(a.get('href') or '').query).get(self.page_param)
+            if not values:
+                continue
+            try:
+                page = int(values[-1]) - self.page_offset
+            except ValueError:
+                continue
+            if last is None or page > last:
+                last = page
+        return last
+
+    def extract_basic_info(self, soup: BeautifulSoup) -> dict | None:
+        """
+        配置了 basic_info 选择器时按其定位信息块并用 labels 精确映射；未配置时返回 None，由调用方使用通用规则
+        """
+        if self.basic_info is None:
+            return None
+        node = self.basic_info.select_one(soup)
+        if node is None:
+            return {}
+        return parse_labelled_block(node, self.labels)
+
+
+def _merge(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict) and key != 'fields' and key != 'labels':
+            merged[key] = _merge(base[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+_cache: dict[str, SiteAdapter] = {}
+_cache_lock = threading.RLock()
+
+
+def get_adapter(ref: str | None) -> SiteAdapter:
+    """
+    按站点的 adapter 配置获取编译后的适配器；配置无效时记录错误并回退到默认适配器
+    """
+    key = (ref or DEFAULT_ADAPTER).strip()
+    adapter = _cache.get(key)
+    if adapter is not None:
+        return adapter
+    with _cache_lock:
+        adapter = _cache.get(key)
+        if adapter is None:
+            try:
+                if key.startswith('{'):
+                    spec = json.loads(key)
+                    spec = _merge(BUILTIN_SPECS.get(spec.get('extends') or DEFAULT_ADAPTER, NEXUSPHP_SPEC), spec)
+                else:
+                    spec = BUILTIN_SPECS[key]
+                adapter = SiteAdapter(spec)
+            except (KeyError, ValueError, TypeError, soupsieve.SelectorSyntaxError) as e:
+                logger.error('站点适配器配置无效，使用默认适配器: %s', e)
+                adapter = get_adapter(None) if key != DEFAULT_ADAPTER else SiteAdapter(NEXUSPHP_SPEC)
+            _cache[key] = adapter
+    return adapter
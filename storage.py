@@ -0,0 +1,394 @@
+"""存储后端：MySQL（pymysql）与内嵌的 SQLite（sqlite3）。
+
+config.yaml 中 db_backend 选择后端（默认 mysql）；为 sqlite 时 db_path 指定数据库文件（默认 ./output/pt_crawler.sqlite3），
+get_database_config() 返回的配置中带有 backend / path 两个键。
+
+各模块通过 connect(db_config) 取得连接，用法与 pymysql 的 DictCursor 连接相同：
+%s 占位符、字典行（传入 SSCursor / Cursor 时为元组行）、lastrowid / rowcount、commit / rollback。
+SQLite 连接在执行前把 MySQL 专有语法（INSERT IGNORE、ON DUPLICATE KEY UPDATE、NOW()、INTERVAL、IF()、
+FOR UPDATE SKIP LOCKED、SHOW COLUMNS）改写为等价写法，异常转换为 pymysql.err 中的同类异常，
+因此调用方的 SQL 与异常处理无需区分后端。
+
+SQLite 使用 WAL 日志与 synchronous=NORMAL；写事务按批提交：commit() 累计 commit_every 次
+或距事务开始超过 commit_interval 秒才真正提交，空闲连接由后台线程按时提交，close() 时提交剩余部分。
+依赖写入已对其他连接可见的动作（如失效 API 响应缓存）用 after_commit(conn, fn, *args) 挂到真正提交之后。
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from datetime import datetime
+
+import pymysql
+import pymysql.cursors
+
+MYSQL_KEYS = ('host', 'port', 'user', 'password', 'database')
+DEFAULT_SQLITE_PATH = './output/pt_crawler.sqlite3'
+DEFAULT_COMMIT_EVERY = 50
+DEFAULT_COMMIT_INTERVAL = 0.5
+
+
+def backend_of(db_config: dict) -> str:
+    return (db_config.get('backend') or 'mysql').lower()
+
+
+def config_key(db_config: dict) -> tuple:
+    """用于进程内缓存（表结构检查、去重集合）的数据库标识"""
+    if backend_of(db_config) == 'sqlite':
+        return ('sqlite', os.path.abspath(db_config.get('path') or DEFAULT_SQLITE_PATH))
+    return (db_config['host'], db_config['port'], db_config['database'])
+
+
+def connect(db_config: dict, cursorclass=None, **kwargs):
+    """
+    按 db_config 的 backend 建立连接；kwargs 只对 MySQL 生效（如 connect_timeout、charset）
+    """
+    if backend_of(db_config) == 'sqlite':
+        return SQLiteConnection(
+            db_config.get('path') or DEFAULT_SQLITE_PATH,
+            cursorclass=cursorclass,
+            commit_every=int(db_config.get('commit_every', DEFAULT_COMMIT_EVERY)),
+            commit_interval=float(db_config.get('commit_interval', DEFAULT_COMMIT_INTERVAL)),
+        )
+    params = {k: db_config[k] for k in MYSQL_KEYS if k in db_config}
+    return pymysql.connect(**params, cursorclass=cursorclass or pymysql.cursors.DictCursor, **kwargs)
+
+
+# ---------------------------------------------------------------- SQL 方言改写
+
+_REWRITES = [
+    (re.compile(r'\bINSERT\s+IGNORE\s+INTO\b', re.I), 'INSERT OR IGNORE INTO'),
+    (re.compile(r'\bNOW\(\)\s*\+\s*INTERVAL\s+%s\s+SECOND\b', re.I), "datetime('now', 'localtime', '+' || %s || ' seconds')"),
+    (re.compile(r'\bNOW\(\)', re.I), "datetime('now', 'localtime')"),
+    (re.compile(r'\bIF\(', re.I), 'IIF('),
+    (re.compile(r'\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED)?', re.I), ''),
+    (re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.I), 'ON CONFLICT DO UPDATE SET'),
+    (re.compile(r'\bVALUES\((\w+)\)', re.I), r'excluded.\1'),
+    # MySQL 的 LIKE 默认以反斜杠转义，SQLite 需显式声明
+    (re.compile(r"\bLIKE\s+%s(?!\s+ESCAPE)", re.I), "LIKE %s ESCAPE '\\'"),
+    (re.compile(r"^\s*SHOW\s+COLUMNS\s+FROM\s+(\w+)\s+LIKE\s+'([^']*)'\s*$", re.I | re.S),
+     r"SELECT name AS Field FROM pragma_table_info('\1') WHERE name LIKE '\2'"),
+]
+_FOR_UPDATE = re.compile(r'\bFOR\s+UPDATE\b', re.I)
+_READ_ONLY = re.compile(r'^\s*(SELECT|WITH|PRAGMA|SHOW|EXPLAIN)\b', re.I)
+
+
+def after_commit(conn, fn, *args):
+    """
+    conn 上已 commit() 的写入真正提交后调用 fn(*args)：SQLite 批量事务未提交时挂到下次提交之后
+    （同一 fn/args 只挂一次），其余情况立即调用
+    """
+    if isinstance(conn, SQLiteConnection):
+        conn.after_commit(fn, *args)
+    else:
+        fn(*args)
+
+
+def translate(sql: str) -> str:
+    """把 MySQL 写法的语句改写为 SQLite 可执行的语句（占位符 %s 改为 ?）"""
+    for pattern, repl in _REWRITES:
+        sql = pattern.sub(repl, sql)
+    return sql.replace('%s', '?')
+
+
+_DDL_LINE_KEY = re.compile(r'^\s*(UNIQUE\s+)?(KEY|INDEX)\s+(\w+)\s*\(([^)]*(?:\(\d+\))?[^)]*)\)\s*,?\s*$', re.I)
+_PREFIX_LEN = re.compile(r'(\w+)\(\d+\)')
+_ON_UPDATE = re.compile(r'\bON\s+UPDATE\s+CURRENT_TIMESTAMP\b', re.I)
+
+
+def sqlite_ddl(create_sql: str) -> list[str]:
+    """
+    把 TABLE_DEFINITIONS 中的 MySQL 建表语句转换为 SQLite 语句列表：
+    建表语句 + 表内 KEY / INDEX 对应的 CREATE INDEX（索引名加表名前缀，SQLite 中索引名全库唯一）
+    + ON UPDATE CURRENT_TIMESTAMP 列对应的触发器
+    """
+    table = re.search(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', create_sql, re.I).group(1)
+    columns, indexes = [], []
+    body = create_sql[create_sql.index('(') + 1:create_sql.rindex(')')]
+    for line in body.split('\n'):
+        if not line.strip():
+            continue
+        m = _DDL_LINE_KEY.match(line)
+        if m:
+            cols = _PREFIX_LEN.sub(r'\1', m.group(4))
+            unique = 'UNIQUE ' if m.group(1) else ''
+            indexes.append(f"CREATE {unique}INDEX IF NOT EXISTS {table}_{m.group(3)} ON {table} ({cols})")
+            continue
+        ddl = line.strip().rstrip(',')
+        if _ON_UPDATE.search(ddl):
+            indexes.append(touch_trigger(table, ddl.split()[0]))
+        columns.append(sqlite_column(ddl))
+    statements = [f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ',\n    '.join(columns) + '\n)']
+    return statements + indexes
+
+
+def touch_trigger(table: str, column: str) -> str:
+    """用触发器实现 ON UPDATE CURRENT_TIMESTAMP（未显式修改该列时，更新行后写入当前时间）"""
+    return (f"CREATE TRIGGER IF NOT EXISTS {table}_{column}_touch AFTER UPDATE ON {table} "
+            f"FOR EACH ROW WHEN NEW.{column} IS OLD.{column} BEGIN "
+            f"UPDATE {table} SET {column} = datetime('now', 'localtime') WHERE rowid = NEW.rowid; END")
+
+
+def sqlite_column(ddl: str, alter: bool = False) -> str:
+    """
+    单个列定义的转换；alter=True 时用于 ALTER TABLE ADD COLUMN（SQLite 不允许非常量默认值）
+    """
+    ddl = re.sub(r'\b(BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', 'INTEGER PRIMARY KEY AUTOINCREMENT', ddl, flags=re.I)
+    ddl = _ON_UPDATE.sub('', ddl).rstrip()
+    if alter:
+        ddl = re.sub(r'\s+DEFAULT\s+CURRENT_TIMESTAMP', '', ddl, flags=re.I)
+    else:
+        # 与 MySQL 的 NOW() 一致使用本地时间
+        ddl = re.sub(r'\bDEFAULT\s+CURRENT_TIMESTAMP\b', "DEFAULT (datetime('now', 'localtime'))", ddl, flags=re.I)
+    return ddl
+
+
+def table_columns(db_conn, table: str) -> list[str]:
+    cursor = db_conn.cursor()
+    if isinstance(db_conn, SQLiteConnection):
+        cursor.execute(f"SELECT name FROM pragma_table_info('{table}')")
+    else:
+        cursor.execute(
+            "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
+        )
+    return [row['name'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+
+
+# ---------------------------------------------------------------- SQLite 连接
+
+_ERRORS = [
+    (sqlite3.IntegrityError, pymysql.err.IntegrityError),
+    (sqlite3.ProgrammingError, pymysql.err.ProgrammingError),
+    (sqlite3.OperationalError, pymysql.err.OperationalError),
+    (sqlite3.DatabaseError, pymysql.err.DatabaseError),
+    (sqlite3.Error, pymysql.err.Error),
+]
+
+
+def _convert_error(e: sqlite3.Error) -> pymysql.err.Error:
+    for source, target in _ERRORS:
+        if isinstance(e, source):
+            # OperationalError: no such table 对应 MySQL 的 1146（ProgrammingError）
+            if isinstance(e, sqlite3.OperationalError) and 'no such table' in str(e):
+                return pymysql.err.ProgrammingError(1146, str(e))
+            return target(0, str(e))
+    return pymysql.err.Error(0, str(e))
+
+
+def _tuple_rows(cursorclass) -> bool:
+    return cursorclass is not None and not issubclass(cursorclass, pymysql.cursors.DictCursorMixin)
+
+
+class SQLiteCursor:
+    def __init__(self, conn: 'SQLiteConnection', tuple_rows: bool):
+        self.connection = conn
+        self._cursor = conn._raw.cursor()
+        self._tuple_rows = tuple_rows
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def _row(self, row):
+        if row is None or self._tuple_rows:
+            return row
+        return {d[0]: v for d, v in zip(self._cursor.description, row)}
+
+    def execute(self, sql: str, params=None):
+        with self.connection._lock:
+            self.connection._before(sql)
+            try:
+                self._cursor.execute(translate(sql), tuple(params) if params is not None else ())
+            except sqlite3.Error as e:
+                raise _convert_error(e) from e
+            self.rowcount = self._cursor.rowcount
+            self.lastrowid = self._cursor.lastrowid
+        return self.rowcount
+
+    def executemany(self, sql: str, seq_of_params):
+        rows = [tuple(p) for p in seq_of_params]
+        if not rows:
+            self.rowcount = 0
+            return 0
+        with self.connection._lock:
+            self.connection._before(sql)
+            try:
+                self._cursor.executemany(translate(sql), rows)
+            except sqlite3.Error as e:
+                raise _convert_error(e) from e
+            self.rowcount = self._cursor.rowcount
+        return self.rowcount
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class SQLiteConnection:
+    """
+    pymysql 风格的 SQLite 连接；写语句前以 BEGIN IMMEDIATE 开启事务，commit() 按批真正提交
+    """
+
+    def __init__(self, path: str, cursorclass=None, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 commit_interval: float = DEFAULT_COMMIT_INTERVAL, timeout: float = 30.0):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.cursorclass = cursorclass
+        self.commit_every = max(1, int(commit_every))
+        self.commit_interval = float(commit_interval)
+        self._raw = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False,
+                                    detect_types=sqlite3.PARSE_DECLTYPES)
+        self._raw.execute('PRAGMA journal_mode=WAL')
+        self._raw.execute('PRAGMA synchronous=NORMAL')
+        self._raw.execute(f'PRAGMA busy_timeout={int(timeout * 1000)}')
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._txn_started = 0.0
+        self._after_commit: list[tuple] = []
+        self.open = True
+        if self.commit_every > 1:
+            _flusher.register(self)
+
+    def _before(self, sql: str):
+        """写语句（以及 SELECT ... FOR UPDATE）执行前确保处于写事务中"""
+        if self._raw.in_transaction:
+            return
+        if _READ_ONLY.match(sql) and not _FOR_UPDATE.search(sql):
+            return
+        self._raw.execute('BEGIN IMMEDIATE')
+        self._txn_started = time.monotonic()
+
+    def cursor(self, cursorclass=None) -> SQLiteCursor:
+        return SQLiteCursor(self, _tuple_rows(cursorclass or self.cursorclass))
+
+    def commit(self):
+        with self._lock:
+            if not self._raw.in_transaction:
+                self._pending = 0
+                return
+            self._pending += 1
+            if self._pending >= self.commit_every or time.monotonic() - self._txn_started >= self.commit_interval:
+                self.flush()
+
+    def after_commit(self, fn, *args):
+        """当前批量事务提交后调用 fn(*args)；没有未提交的事务时立即调用"""
+        with self._lock:
+            if self._raw.in_transaction:
+                if (fn, args) not in self._after_commit:
+                    self._after_commit.append((fn, args))
+                return
+        fn(*args)
+
+    def flush(self):
+        """立即提交当前事务"""
+        with self._lock:
+            if self._raw.in_transaction:
+                try:
+                    self._raw.execute('COMMIT')
+                except sqlite3.Error as e:
+                    raise _convert_error(e) from e
+            self._pending = 0
+            callbacks, self._after_commit = self._after_commit, []
+        for fn, args in callbacks:
+            fn(*args)
+
+    def _flush_if_due(self):
+        with self._lock:
+            if self.open and self._raw.in_transaction and self._pending and \
+                    time.monotonic() - self._txn_started >= self.commit_interval:
+                self.flush()
+
+    def rollback(self):
+        with self._lock:
+            if self._raw.in_transaction:
+                self._raw.execute('ROLLBACK')
+            self._pending = 0
+            self._after_commit = []
+
+    def ping(self, reconnect: bool = True):
+        return True
+
+    def close(self):
+        with self._lock:
+            if not self.open:
+                return
+            try:
+                self.flush()
+            finally:
+                self.open = False
+                self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _Flusher:
+    """后台线程：定期提交空闲连接中已到期的批量事务，避免长时间持有写锁"""
+
+    def __init__(self):
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, conn: SQLiteConnection):
+        with self._lock:
+            self._connections.add(conn)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sqlite-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(DEFAULT_COMMIT_INTERVAL / 2)
+            with self._lock:
+                connections = list(self._connections)
+            for conn in connections:
+                try:
+                    conn._flush_if_due()
+                except pymysql.err.Error:
+                    pass
+
+
+_flusher = _Flusher()
+
+
+def _convert_datetime(value: bytes):
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+# DATETIME / TIMESTAMP 列与 pymysql 一样返回 datetime；写入 datetime 参数时存为 'YYYY-MM-DD HH:MM:SS'
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(' ', timespec='seconds'))
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('TIMESTAMP', _convert_datetime)
@@ -0,0 +1,25 @@
+"""测试公共夹具：项目模块位于仓库根目录，测试数据库使用临时 SQLite 文件（无需 MySQL 服务）。"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+from db_manager import ensure_schema  # noqa: E402
+
+
+@pytest.fixture
+def db_config(tmp_path):
+    """每个测试独立的 SQLite 库，commit_every=1 使每次 commit() 立即提交"""
+    config = {'backend': 'sqlite', 'path': str(tmp_path / 'pt_crawler.sqlite3'), 'commit_every': 1}
+    ensure_schema(config)
+    return config
+
+
+@pytest.fixture
+def db_conn(db_config):
+    conn = storage.connect(db_config)
+    yield conn
+    conn.close()
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from checkpoint import CheckpointBusy, CrawlCheckpoint
+
+
+def _row(db_conn, run_id):
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT * FROM crawl_runs WHERE id = %s", (run_id,))
+    return cursor.fetchone()
+
+
+def test_new_run_has_no_pending_links(db_conn):
+    cp = CrawlCheckpoint.open(db_conn, 'site:1', 3)
+    assert not cp.resumed
+    assert cp.current_page == 3
+    assert cp.pending_links() is None
+
+
+def test_resume_inflight_first(db_conn):
+    cp = CrawlCheckpoint.open(db_conn, 'site:1', 1)
+    cp.set_page(2, ['a', 'b', 'c'])
+    cp.begin('a')
+    cp.done('a', created=1, skipped=0)
+    cp.begin('b')
+    cp.finish('interrupted', created=1, skipped=0, error='boom')
+
+    resumed = CrawlCheckpoint.open(db_conn, 'site:1', 1)
+    assert resumed.resumed
+    assert resumed.run_id == cp.run_id
+    assert resumed.current_page == 2
+    assert resumed.pending_links() == ['b', 'c']
+    assert resumed.created == 1
+    row = _row(db_conn, cp.run_id)
+    assert (row['status'], row['resumed_count']) == ('running', 1)
+
+
+def test_done_clears_checkpoint(db_conn):
+    cp = CrawlCheckpoint.open(db_conn, 'site:1', 1)
+    cp.set_page(1, ['a'])
+    cp.finish('done', created=0, skipped=1)
+    row = _row(db_conn, cp.run_id)
+    assert row['status'] == 'done'
+    assert row['frontier'] is None and row['finished_at'] is not None
+    assert not CrawlCheckpoint.open(db_conn, 'site:1', 1).resumed
+
+
+def test_running_checkpoint_is_busy_until_stale(db_conn):
+    cp = CrawlCheckpoint.open(db_conn, 'site:1', 1)
+    cp.set_page(4, ['x'])
+    with pytest.raises(CheckpointBusy):
+        CrawlCheckpoint.open(db_conn, 'site:1', 1)
+
+    # checkpoint_at 与比较参数都只精确到秒，跨过一秒后原检查点才早于接管阈值
+    time.sleep(1.1)
+    taken = CrawlCheckpoint.open(db_conn, 'site:1', 1, stale_after=0)
+    assert taken.run_id == cp.run_id
+    assert taken.current_page == 4
+    assert taken.pending_links() == ['x']
+
+
+def test_guard_detaches_checkpoint(db_conn):
+    owner = {'ok': True}
+    cp = CrawlCheckpoint.open(db_conn, 'unit:1', 1, guard=lambda conn: owner['ok'])
+    cp.set_page(1, ['a', 'b'])
+    owner['ok'] = False
+    assert not cp.save()
+    assert cp.detached
+    cp.finish('cancelled', created=5, skipped=0)
+    row = _row(db_conn, cp.run_id)
+    assert (row['status'], row['created']) == ('running', 0)
@@ -0,0 +1,49 @@
+from feed_ingest import iter_feed_items, strip_passkey
+
+FEED = '''<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Mock</title>
+<item>
+  <title>Show S01E01 2160p WEB-DL [12.5 GB]</title>
+  <link>details.php?id=11</link>
+  <enclosure url="download.php?id=11&amp;passkey=secret" length="13421772800" type="application/x-bittorrent"/>
+  <category>TV</category>
+  <guid isPermaLink="false">ABCDEF0123456789ABCDEF0123456789ABCDEF01</guid>
+</item>
+<item>
+  <title>Movie 1080p</title>
+  <link>https://mock.example/details.php?id=12</link>
+  <guid>https://mock.example/details.php?id=12</guid>
+</item>
+</channel></rss>'''.encode('utf-8')
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_iter_feed_items():
+    items = list(iter_feed_items(_chunks(FEED, 37), 'https://mock.example/'))
+    assert len(items) == 2
+    first, second = items
+    assert first['title'] == 'Show S01E01 2160p WEB-DL'
+    assert first['link'] == 'https://mock.example/details.php?id=11'
+    assert first['download_url'] == 'https://mock.example/download.php?id=11&passkey=secret'
+    assert first['size'] == 13421772800
+    assert first['category'] == 'TV'
+    assert first['info_hash'] == 'abcdef0123456789abcdef0123456789abcdef01'
+    assert second['title'] == 'Movie 1080p'
+    assert second['download_url'] is None and second['size'] is None
+    assert second['info_hash'] is None
+
+
+def test_iter_feed_items_single_chunk_matches_stream():
+    assert list(iter_feed_items([FEED], 'https://mock.example/')) == \
+        list(iter_feed_items(_chunks(FEED, 5), 'https://mock.example/'))
+
+
+def test_strip_passkey():
+    assert strip_passkey('https://mock.example/download.php?id=11&passkey=secret') == \
+        'https://mock.example/download.php?id=11'
+    assert strip_passkey('https://mock.example/download.php?PassKey=secret&id=11&https=1') == \
+        'https://mock.example/download.php?id=11&https=1'
+    assert strip_passkey('https://mock.example/download.php?id=11') == 'https://mock.example/download.php?id=11'
@@ -0,0 +1,61 @@
+import json
+
+from importer import normalize_metadata
+
+
+def test_requires_info_hash():
+    assert normalize_metadata({'name': 'x.torrent'}) is None
+    assert normalize_metadata({'info_hash': '', 'name': 'x.torrent'}) is None
+
+
+def test_current_keys():
+    files = [{'path': 'Show/E01.mkv', 'length': 10}]
+    result = normalize_metadata({
+        'info_hash': 'a' * 40, 'name': 'x.torrent', 'title': 'Title', 'introduction': 'Intro',
+        'video_codec': 'H264', 'production_team': 'TEAM', 'files': files,
+        'crawl_link': 'http://mock/details.php?id=1', 'saved_path': 'torrents\\mock\\x.torrent',
+        'promotion': 'free', 'promotion_until': '2030-01-01 00:00:00',
+    })
+    record = result['record']
+    assert result['files'] == files
+    assert record['is_single_file'] == 1
+    assert json.loads(record['multi_file_list']) == files
+    assert record['saved_path'] == 'torrents/mock/x.torrent'
+    assert (record['title'], record['introduction'], record['video_codec'], record['production_team']) == \
+        ('Title', 'Intro', 'H264', 'TEAM')
+    assert (record['promotion'], record['promotion_until']) == ('free', '2030-01-01 00:00:00')
+
+
+def test_legacy_keys():
+    files = [{'path': 'a.mkv', 'length': 1}, {'path': 'b.mkv', 'length': 2}]
+    record = normalize_metadata({
+        'info_hash': 'b' * 40,
+        'small_descr': 'Subtitle',
+        'descr_html': '<p>desc</p>',
+        'mediaInfo': 'General',
+        'codec': 'HEVC',
+        'audioCodec': 'AAC',
+        'resolution': '2160p',
+        'team': 'TEAM',
+        'source': 'mock',
+        'download_url': 'http://mock/download.php?id=2',
+        'multi_file_list': json.dumps(files),
+    })['record']
+    assert record['introduction'] == 'Subtitle'
+    assert record['description'] == '<p>desc</p>'
+    assert record['mediainfo'] == 'General'
+    assert record['video_codec'] == 'HEVC'
+    assert record['audiocodec'] == 'AAC'
+    assert record['standard'] == '2160p'
+    assert record['production_team'] == 'TEAM'
+    assert record['crawl_site'] == 'mock'
+    assert record['crawl_link'] == 'http://mock/download.php?id=2'
+    assert record['is_single_file'] == 0
+    assert json.loads(record['multi_file_list']) == files
+
+
+def test_bad_legacy_file_list():
+    result = normalize_metadata({'info_hash': 'c' * 40, 'multi_file_list': '{not json'})
+    assert result['files'] == []
+    assert result['record']['multi_file_list'] == '[]'
+    assert result['record']['title'] == ''
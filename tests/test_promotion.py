@@ -0,0 +1,74 @@
+import os
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+from parser_utils import extract_promotion
+from promotion_queue import PromotionQueue, prioritize, promotion_rank
+
+DETAILS_HTML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'html', 'details.html')
+
+
+def _soup(html):
+    return BeautifulSoup(html, 'html.parser')
+
+
+def test_extract_promotion_from_details_page():
+    with open(DETAILS_HTML, encoding='utf-8') as f:
+        soup = _soup(f.read())
+    assert extract_promotion(soup) == ('free', datetime(2025, 11, 17, 0, 54, 35))
+
+
+def test_extract_promotion_from_label_text():
+    soup = _soup('<h1 id="top">Name <b>[2X 免费]</b></h1>')
+    assert extract_promotion(soup) == ('twoupfree', None)
+
+
+def test_extract_promotion_from_list_row():
+    row = _soup('<tr><td><img class="pro_50pctdown" alt="50%"/>'
+                '<span>剩余时间：<span title="2030-01-02 03:04">5天</span></span></td></tr>').tr
+    assert extract_promotion(row) == ('halfdown', datetime(2030, 1, 2, 3, 4))
+
+
+def test_extract_promotion_without_promotion():
+    assert extract_promotion(_soup('<h1 id="top">Name</h1>')) == (None, None)
+    assert extract_promotion(_soup('<h1>Name [免费]</h1>')) == (None, None)
+
+
+def test_promotion_rank():
+    now = datetime(2030, 1, 1)
+    assert promotion_rank('free', None, now) == 0
+    assert promotion_rank('twoupfree', now + timedelta(hours=1), now) == 0
+    assert promotion_rank('halfdown', None, now) == 1
+    assert promotion_rank('free', now - timedelta(hours=1), now) == 2
+    assert promotion_rank(None, None, now) == 2
+
+
+def test_prioritize_orders_free_then_expiring_first():
+    soon = datetime.now() + timedelta(hours=1)
+    later = datetime.now() + timedelta(days=2)
+    expired = datetime.now() - timedelta(hours=1)
+    items = ['plain', 'half', 'free_later', 'expired_free', 'free_soon', 'free_forever', 'plain2']
+    promotions = {
+        'half': ('halfdown', soon),
+        'free_later': ('free', later),
+        'expired_free': ('free', expired),
+        'free_soon': ('twoupfree', soon),
+        'free_forever': ('free', None),
+    }
+    assert prioritize(items, promotions) == [
+        'free_soon', 'free_later', 'free_forever', 'half', 'plain', 'expired_free', 'plain2',
+    ]
+
+
+def test_prioritize_keeps_order_without_promotions():
+    assert prioritize(['c', 'a', 'b'], {}) == ['c', 'a', 'b']
+    assert prioritize(['c', 'a', 'b'], {'x': ('free', None)}) == ['c', 'a', 'b']
+
+
+def test_queue_is_stable_within_a_rank():
+    queue = PromotionQueue()
+    for item in ('a', 'b', 'c'):
+        queue.push(item, 'free')
+    assert len(queue) == 3
+    assert queue.drain() == ['a', 'b', 'c']
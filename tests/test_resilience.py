@@ -0,0 +1,121 @@
+import pytest
+import requests
+
+from resilience import CircuitBreaker, CircuitOpenError, ResilientFetcher, RetryPolicy, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr('resilience.time.monotonic', fake.monotonic)
+    return fake
+
+
+def _response(status, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    return resp
+
+
+@pytest.mark.parametrize('status, expected', [
+    (429, 'throttle'), (503, 'throttle'), (502, 'server'), (408, 'timeout'), (200, None), (404, None),
+])
+def test_classify(status, expected):
+    assert RetryPolicy.classify(status) == expected
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=3.0, throttle_base_delay=5.0)
+    for attempt in range(6):
+        assert 0 <= policy.backoff(attempt, 'server') <= min(3.0, 2 ** attempt)
+        assert 0 <= policy.backoff(attempt, 'throttle') <= 3.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_breaker_transitions(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.remaining() == 0
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.remaining() == 10
+
+    clock.now += 10
+    assert breaker.remaining() == 0
+    assert breaker.state == 'half_open'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    clock.now += 10
+    assert breaker.remaining() == 0
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+
+def test_half_open_admits_one_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.remaining() == 0
+    # 试探请求未返回前，其他调用方继续等待
+    assert breaker.remaining() == CircuitBreaker.TRIAL_POLL
+    assert breaker.remaining() > 0
+    # 试探请求丢失（超过 reset_timeout 无结果）后另放行一个
+    clock.now += 10
+    assert breaker.remaining() == 0
+    assert breaker.remaining() > 0
+    breaker.record_success()
+    assert breaker.remaining() == 0 and breaker.remaining() == 0
+
+
+def test_fetcher_retries_then_succeeds(clock):
+    responses = [_response(503, {'Retry-After': '7'}), _response(502), _response(200)]
+    fetcher = ResilientFetcher(RetryPolicy(max_attempts=4, max_delay=1.0), CircuitBreaker(5, 60), sleep=clock.sleep)
+    resp = fetcher.request('http://mock/x', lambda: responses.pop(0))
+    assert resp.status_code == 200
+    assert fetcher.retries == 2
+    assert clock.slept[0] == 7.0
+    assert fetcher.breaker.failures == 0
+
+
+def test_fetcher_returns_last_retryable_response(clock):
+    fetcher = ResilientFetcher(RetryPolicy(max_attempts=2, max_delay=0), CircuitBreaker(5, 60), sleep=clock.sleep)
+    assert fetcher.request('http://mock/x', lambda: _response(500)).status_code == 500
+    assert fetcher.breaker.failures == 2
+
+
+def test_fetcher_raises_when_open_without_pause(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    fetcher = ResilientFetcher(RetryPolicy(), breaker, pause_on_open=False, sleep=clock.sleep)
+    with pytest.raises(CircuitOpenError):
+        fetcher.request('http://mock/x', lambda: _response(200))
+
+
+def test_fetcher_pauses_until_breaker_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    fetcher = ResilientFetcher(RetryPolicy(), breaker, sleep=clock.sleep)
+    assert fetcher.request('http://mock/x', lambda: _response(200)).status_code == 200
+    assert clock.slept == [30]
+    assert breaker.state == 'closed'
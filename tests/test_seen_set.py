@@ -0,0 +1,69 @@
+from db_manager import delete_torrent, save_torrent_to_db
+from seen_set import SNAPSHOT_NAME, SeenSet, get_seen_set, save_seen_set
+
+
+def _save(db_conn, n):
+    save_torrent_to_db(db_conn, {'info_hash': f'{n:040x}', 'name': f'{n}.torrent',
+                                 'crawl_link': f'http://mock/details.php?id={n}'})
+
+
+def test_add_and_has():
+    seen = SeenSet(capacity=100)
+    assert not seen.has_hash('a' * 40)
+    seen.add('a' * 40, 'http://mock/details.php?id=1')
+    seen.add('a' * 40)
+    assert seen.has_hash('a' * 40)
+    assert seen.has_link('http://mock/details.php?id=1')
+    # 摘要按类型区分，链接与 info_hash 互不命中
+    assert not seen.has_link('a' * 40)
+    assert not seen.has_hash('http://mock/details.php?id=1')
+    assert len(seen) == 2
+
+
+def test_grows_past_capacity():
+    seen = SeenSet(capacity=10)
+    for i in range(100):
+        seen.add(f'{i:040x}')
+    assert all(seen.has_hash(f'{i:040x}') for i in range(100))
+    assert seen.bloom.capacity >= 100
+
+
+def test_snapshot_round_trip(tmp_path):
+    seen = SeenSet(capacity=100)
+    seen.add('a' * 40, 'http://mock/details.php?id=1')
+    seen.max_id, seen.rows = 7, 1
+    save_seen_set(seen, str(tmp_path))
+    loaded = SeenSet.from_snapshot(str(tmp_path / SNAPSHOT_NAME))
+    assert loaded.has_hash('a' * 40)
+    assert loaded.has_link('http://mock/details.php?id=1')
+    assert (loaded.max_id, loaded.rows) == (7, 1)
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    (tmp_path / SNAPSHOT_NAME).write_bytes(b'not a snapshot')
+    assert SeenSet.from_snapshot(str(tmp_path / SNAPSHOT_NAME)) is None
+
+
+def test_get_seen_set_loads_incrementally(db_conn, db_config, tmp_path):
+    for n in (1, 2):
+        _save(db_conn, n)
+    seen = get_seen_set(db_conn, db_config, str(tmp_path))
+    assert seen.rows == 2 and seen.has_link('http://mock/details.php?id=2')
+
+    _save(db_conn, 3)
+    assert get_seen_set(db_conn, db_config, str(tmp_path)) is seen
+    assert seen.rows == 3 and seen.has_hash(f'{3:040x}')
+
+
+def test_get_seen_set_rebuilds_after_delete(db_conn, db_config, tmp_path):
+    for n in (1, 2):
+        _save(db_conn, n)
+    get_seen_set(db_conn, db_config, str(tmp_path))
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT id FROM torrents WHERE info_hash = %s", (f'{1:040x}',))
+    delete_torrent(db_conn, cursor.fetchone()['id'])
+
+    seen = get_seen_set(db_conn, db_config, str(tmp_path))
+    assert seen.rows == 1
+    assert not seen.has_hash(f'{1:040x}')
+    assert seen.has_hash(f'{2:040x}')
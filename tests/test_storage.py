@@ -0,0 +1,89 @@
+import pymysql
+import pytest
+
+import storage
+from db_manager import delete_torrent, list_torrent_files, save_torrent_files, save_torrent_to_db, torrent_exists, torrent_file_rows
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("INSERT IGNORE INTO t (a) VALUES (%s)", "INSERT OR IGNORE INTO t (a) VALUES (?)"),
+    ("UPDATE t SET at = NOW() WHERE id = %s", "UPDATE t SET at = datetime('now', 'localtime') WHERE id = ?"),
+    ("UPDATE t SET until = NOW() + INTERVAL %s SECOND",
+     "UPDATE t SET until = datetime('now', 'localtime', '+' || ? || ' seconds')"),
+    ("SELECT IF(a, 1, 0) FROM t", "SELECT IIF(a, 1, 0) FROM t"),
+    ("SELECT * FROM t WHERE id = %s FOR UPDATE SKIP LOCKED", "SELECT * FROM t WHERE id = ?"),
+    ("INSERT INTO t (k, v) VALUES (%s, %s) ON DUPLICATE KEY UPDATE v = VALUES(v)",
+     "INSERT INTO t (k, v) VALUES (?, ?) ON CONFLICT DO UPDATE SET v = excluded.v"),
+    ("SELECT * FROM t WHERE name LIKE %s", "SELECT * FROM t WHERE name LIKE ? ESCAPE '\\'"),
+    ("SHOW COLUMNS FROM torrents LIKE 'tags'",
+     "SELECT name AS Field FROM pragma_table_info('torrents') WHERE name LIKE 'tags'"),
+])
+def test_translate(sql, expected):
+    assert storage.translate(sql) == expected
+
+
+def _record(info_hash, **extra):
+    return {'info_hash': info_hash, 'name': f'{info_hash}.torrent', 'title': 'Title', 'size': 1024,
+            'crawl_site': 'mock', 'crawl_link': f'http://mock/details.php?id={info_hash}', **extra}
+
+
+def test_torrent_round_trip(db_conn):
+    assert save_torrent_to_db(db_conn, _record('a' * 40, promotion='free', tags='中字'))
+    assert save_torrent_to_db(db_conn, _record('a' * 40)) is False
+    assert torrent_exists(db_conn, 'a' * 40)
+    assert not torrent_exists(db_conn, 'b' * 40)
+
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT id, title, promotion, tags, crawledAt FROM torrents WHERE info_hash = %s", ('a' * 40,))
+    row = cursor.fetchone()
+    assert (row['title'], row['promotion'], row['tags']) == ('Title', 'free', '中字')
+    assert row['crawledAt'] is not None
+
+
+def test_delete_torrent_removes_files(db_conn):
+    for h in ('a' * 40, 'b' * 40):
+        save_torrent_to_db(db_conn, _record(h))
+        save_torrent_files(db_conn, torrent_file_rows(h, [{'path': 'Show/E01.mkv', 'length': 10},
+                                                          {'path': 'Show/E02.mkv', 'length': 20}]))
+    assert [f['extension'] for f in list_torrent_files(db_conn, 'a' * 40)] == ['mkv', 'mkv']
+
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT id FROM torrents WHERE info_hash = %s", ('a' * 40,))
+    torrent_id = cursor.fetchone()['id']
+    assert delete_torrent(db_conn, torrent_id)
+    assert not torrent_exists(db_conn, 'a' * 40)
+    assert list_torrent_files(db_conn, 'a' * 40) == []
+    assert len(list_torrent_files(db_conn, 'b' * 40)) == 2
+    assert not delete_torrent(db_conn, torrent_id)
+
+
+def test_errors_use_pymysql_types(db_conn):
+    cursor = db_conn.cursor()
+    with pytest.raises(pymysql.err.ProgrammingError):
+        cursor.execute("SELECT * FROM no_such_table")
+    db_conn.rollback()
+    save_torrent_to_db(db_conn, _record('c' * 40))
+    with pytest.raises(pymysql.err.IntegrityError):
+        cursor.execute("INSERT INTO torrents (info_hash, name) VALUES (%s, %s)", ('c' * 40, 'dup'))
+    db_conn.rollback()
+
+
+def test_batched_commit_runs_after_commit_callbacks(tmp_path):
+    conn = storage.connect({'backend': 'sqlite', 'path': str(tmp_path / 'batch.sqlite3'),
+                            'commit_every': 50, 'commit_interval': 60})
+    try:
+        cursor = conn.cursor()
+        cursor.execute("CREATE TABLE t (x INT)")
+        conn.flush()
+        calls = []
+        cursor.execute("INSERT INTO t VALUES (%s)", (1,))
+        conn.commit()
+        storage.after_commit(conn, calls.append, 'torrents')
+        storage.after_commit(conn, calls.append, 'torrents')
+        assert calls == []
+        conn.flush()
+        assert calls == ['torrents']
+        storage.after_commit(conn, calls.append, 'idle')
+        assert calls == ['torrents', 'idle']
+    finally:
+        conn.close()
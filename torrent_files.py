@@ -0,0 +1,77 @@
+"""torrent_files 表回填：把 torrents.multi_file_list 中的 JSON 文件列表展开为逐文件的行。
+
+用服务端游标（SSCursor）流式读取尚未展开的种子，另一个连接按批次多行写入，内存占用与表大小无关；
+只处理 torrent_files 中还没有记录的 info_hash，中断后重新执行即从剩余部分继续。
+"""
+import argparse
+import json
+import time
+
+import pymysql
+import pymysql.cursors
+
+from config_manager import get_database_config
+from db_manager import bootstrap_schema, save_torrent_files, torrent_file_rows
+import storage
+from tracing import get_logger, setup_logging
+
+logger = get_logger('torrent_files')
+
+
+def backfill_torrent_files(db_config: dict, batch_size: int = 1000) -> dict:
+    """
+    回填缺失的文件行，返回 {'torrents', 'files', 'invalid', 'elapsed'}
+    """
+    bootstrap_schema(db_config, ['torrents', 'torrent_files'])
+    reader = storage.connect(db_config, cursorclass=pymysql.cursors.SSCursor)
+    writer = storage.connect(db_config)
+    stats = {'torrents': 0, 'files': 0, 'invalid': 0}
+    started = time.monotonic()
+    pending: list[tuple] = []
+    try:
+        cursor = reader.cursor()
+        cursor.execute(
+            """SELECT t.info_hash, t.multi_file_list, t.name, t.size FROM torrents t
+               WHERE t.info_hash IS NOT NULL
+                 AND NOT EXISTS (SELECT 1 FROM torrent_files f WHERE f.info_hash = t.info_hash)"""
+        )
+        for info_hash, file_list, name, size in cursor:
+            try:
+                files = json.loads(file_list) if file_list else []
+            except ValueError:
+                files = None
+            if not isinstance(files, list):
+                stats['invalid'] += 1
+                continue
+            if not files:
+                # 旧数据可能没有保存文件列表，按单文件种子处理
+                files = [{'path': name or '', 'length': size or 0}]
+            pending.extend(torrent_file_rows(info_hash, files))
+            stats['torrents'] += 1
+            if len(pending) >= batch_size:
+                stats['files'] += save_torrent_files(writer, pending)
+                pending = []
+                logger.info('已回填 %d 个种子 / %d 个文件', stats['torrents'], stats['files'])
+        if pending:
+            stats['files'] += save_torrent_files(writer, pending)
+        cursor.close()
+    finally:
+        reader.close()
+        writer.close()
+    stats['elapsed'] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='将 torrents.multi_file_list 回填到 torrent_files 表')
+    p.add_argument('--batch-size', type=int, default=1000, help='每批写入的文件行数')
+    args = p.parse_args(argv)
+    setup_logging()
+    stats = backfill_torrent_files(get_database_config(), args.batch_size)
+    logger.info('回填完成: %d 个种子, %d 个文件, %d 条无效记录, 用时 %.1fs',
+                stats['torrents'], stats['files'], stats['invalid'], stats['elapsed'])
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
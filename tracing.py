@@ -0,0 +1,158 @@
+"""日志与阶段追踪。
+
+- setup_logging(): 为 "pt-crawler" 日志树配置异步队列处理器，调用方只做入队，
+  实际的 stdout/文件写入在后台 QueueListener 线程中完成；日志级别取自 config.yaml 的 log_level
+- redact(): 把文本中的 passkey 等凭据替换为 ***，记录下载链接或含链接的异常信息前调用
+- Tracer: 按阶段（fetch_list / fetch_detail / parse / download / persist）计时，
+  汇总次数、耗时分位数；单个 span 的日志按 sample_rate 采样输出
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+LOGGER_NAME = 'pt-crawler'
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# 下载链接中的凭据参数（NexusPHP 的 passkey，部分站点为 authkey / torrent_pass）
+_SECRET_PARAM = re.compile(r'((?:passkey|authkey|torrent_pass)=)[^&#\s\'"]+', re.I)
+
+_listener: logging.handlers.QueueListener | None = None
+_setup_lock = threading.Lock()
+
+
+def _default_level() -> str:
+    path = '/config/config.yaml'
+    if os.path.exists(path):
+        from config_manager import load_config
+        try:
+            return str(load_config(path).get('log_level', 'INFO'))
+        except Exception:
+            pass
+    return 'INFO'
+
+
+def setup_logging(level: str | None = None, log_file: str | None = None) -> logging.Logger:
+    """
+    配置 pt-crawler 日志树（幂等）。再次调用只更新日志级别。
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    level_name = str(level or _default_level()).upper()
+    logger.setLevel(getattr(logging, level_name, logging.INFO))
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers: list[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+        if log_file:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+                handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+            except OSError as e:
+                # 日志系统尚未就绪，直接写 stderr，避免混入 stdout 的正常输出
+                sys.stderr.write(f'无法打开日志文件 {log_file}: {e}\n')
+        for h in handlers:
+            h.setFormatter(formatter)
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+    return logger
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def redact(text) -> str:
+    """
+    隐去文本中的 passkey 等凭据参数，可传入 URL 或异常对象（requests 的异常信息中常带有完整链接）
+    """
+    return _SECRET_PARAM.sub(r'\1***', str(text))
+
+
+class StageStats:
+    """单个阶段的耗时统计，保留最近 max_samples 个样本用于分位数"""
+
+    def __init__(self, max_samples: int = 10000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.samples: list[float] = []
+        self.max_samples = max_samples
+
+    def add(self, elapsed: float, error: bool = False):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if error:
+            self.errors += 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append(elapsed)
+        else:
+            self.samples[random.randrange(self.max_samples)] = elapsed
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+        return ordered[idx]
+
+
+class Tracer:
+    """
+    阶段追踪器。span() 的开销只有两次 perf_counter 与一次加锁累加；
+    只有被采样且 DEBUG 级别开启时才格式化并输出日志。
+    """
+
+    def __init__(self, sample_rate: float = 0.0, logger: logging.Logger | None = None):
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate or 0.0)))
+        self.logger = logger or get_logger('trace')
+        self.stages: dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, detail: str = ''):
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self.stages.get(stage)
+                if stats is None:
+                    stats = self.stages[stage] = StageStats()
+                stats.add(elapsed, error)
+            if self.sample_rate and random.random() < self.sample_rate and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('span %s %.1fms%s %s', stage, elapsed * 1000, ' error' if error else '', redact(detail))
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                stage: {
+                    'count': s.count,
+                    'errors': s.errors,
+                    'total_ms': round(s.total * 1000, 1),
+                    'avg_ms': round(s.total / s.count * 1000, 2) if s.count else 0.0,
+                    'p50_ms': round(s.percentile(50) * 1000, 2),
+                    'p99_ms': round(s.percentile(99) * 1000, 2),
+                    'max_ms': round(s.max * 1000, 2),
+                }
+                for stage, s in self.stages.items()
+            }
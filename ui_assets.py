@@ -0,0 +1,133 @@
+"""前端页面与静态资源的发送。
+
+- UIPage：index.html 只在文件变化时读取一次，把 /static/ 下的资源引用改写为带内容指纹的文件名，
+  预先生成 gzip（以及安装了 brotli 时的 br）压缩版本；按 Accept-Encoding 选择版本发送，带强 ETag，
+  浏览器重新验证时返回 304
+- FingerprintedStaticFiles：/static/<name>.<hash>.<ext> 映射到实际文件并带一年的 immutable 缓存头；
+  未带指纹的旧路径仍可访问，但要求每次重新验证
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # 可选依赖：未安装时只提供 gzip
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+def fingerprint(path: str, length: int = 10) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.manifest: dict[str, str] = {}  # 原文件名 -> 带指纹的文件名
+        self._reverse: dict[str, str] = {}
+        self.refresh()
+
+    def refresh(self):
+        """重新计算目录下所有文件的指纹"""
+        manifest = {}
+        if os.path.isdir(self.directory):
+            for dirpath, _, filenames in os.walk(self.directory):
+                for filename in filenames:
+                    full = os.path.join(dirpath, filename)
+                    name = os.path.relpath(full, self.directory).replace(os.sep, '/')
+                    manifest[name] = fingerprinted_name(name, fingerprint(full))
+        self.manifest = manifest
+        self._reverse = {v: k for k, v in manifest.items()}
+
+    def url(self, name: str, prefix: str = '/static') -> str:
+        return f"{prefix}/{self.manifest.get(name, name)}"
+
+    async def get_response(self, path: str, scope):
+        original = self._reverse.get(path.replace(os.sep, '/'))
+        response = await super().get_response(original or path, scope)
+        if response.status_code in (200, 304):
+            response.headers['Cache-Control'] = IMMUTABLE if original else REVALIDATE
+        return response
+
+
+class UIPage:
+    """预压缩的单页 HTML；assets 提供 /static 资源的指纹 URL"""
+
+    _STATIC_REF = re.compile(r'(["\'])/static/([^"\'?#]+)\1')
+
+    def __init__(self, path: str, assets: FingerprintedStaticFiles | None = None, gzip_level: int = 9):
+        self.path = path
+        self.assets = assets
+        self.gzip_level = gzip_level
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.variants: dict[str, bytes] = {}
+        self.etags: dict[str, str] = {}
+
+    def _build(self, html: str):
+        if self.assets is not None:
+            html = self._STATIC_REF.sub(lambda m: f'{m.group(1)}{self.assets.url(m.group(2))}{m.group(1)}', html)
+        raw = html.encode('utf-8')
+        variants = {'identity': raw, 'gzip': gzip.compress(raw, self.gzip_level, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(raw, quality=11)
+        digest = hashlib.sha256(raw).hexdigest()[:24]
+        # 强 ETag 按编码区分：同一内容的不同压缩版本字节不同
+        self.etags = {enc: f'"{digest}"' if enc == 'identity' else f'"{digest}-{enc}"' for enc in variants}
+        self.variants = variants
+
+    def load(self) -> bool:
+        """文件修改时间变化时重新读取并压缩，返回页面是否可用"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return bool(self.variants)
+        if mtime == self._mtime:
+            return True
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._build(f.read())
+                self._mtime = mtime
+        return True
+
+    @staticmethod
+    def _accepts(header: str) -> set[str]:
+        accepted = set()
+        for part in header.split(','):
+            token, _, params = part.strip().partition(';')
+            if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(token.strip().lower())
+        return accepted
+
+    def response(self, request) -> Response | None:
+        if not self.load():
+            return None
+        accepted = self._accepts(request.headers.get('accept-encoding', ''))
+        encoding = next((e for e in ('br', 'gzip') if e in self.variants and (e in accepted or '*' in accepted)),
+                        'identity')
+        headers = {'ETag': self.etags[encoding], 'Cache-Control': REVALIDATE, 'Vary': 'Accept-Encoding'}
+        inm = request.headers.get('if-none-match', '')
+        if inm and self.etags[encoding] in [t.strip().removeprefix('W/') for t in inm.split(',')]:
+            return Response(status_code=304, headers=headers)
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(self.variants[encoding], media_type='text/html; charset=utf-8', headers=headers)
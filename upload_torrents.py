@@ -7,11 +7,14 @@ from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 import pymysql
 from config_manager import get_database_config
+from promotion_queue import PENDING_UPLOAD_ORDER
+import storage
 from urllib.parse import urlparse
 
 def fetch_pending(conn, limit):
     cur = conn.cursor()
-    cur.execute("SELECT id, info_hash, name, title, introduction, description, mediainfo, category, medium, video_codec, audiocodec, standard, production_team, crawl_site, saved_path, tags FROM torrents WHERE is_upload = 0 ORDER BY id DESC LIMIT %s", (limit,))
+    # 免费与即将到期的促销种子先上传，见 promotion_queue
+    cur.execute(f"SELECT id, info_hash, name, title, introduction, description, mediainfo, category, medium, video_codec, audiocodec, standard, production_team, crawl_site, saved_path, tags, promotion, promotion_until FROM torrents WHERE is_upload = 0 ORDER BY {PENDING_UPLOAD_ORDER} LIMIT %s", (limit,))
     return cur.fetchall()
 
 def mark_uploaded(conn, tid):
@@ -162,7 +165,7 @@ def main():
     args = p.parse_args()
 
     db = get_database_config()
-    conn = pymysql.connect(host=db['host'], port=db['port'], user=db['user'], password=db['password'], database=db['database'], cursorclass=pymysql.cursors.DictCursor)
+    conn = storage.connect(db)
     rows = fetch_pending(conn, args.limit)
     overrides = {
         "region": args.region,
@@ -0,0 +1,161 @@
+"""基于 MySQL 行锁的分布式抓取工作队列（crawl_work_units 表）。
+
+多个 worker 通过 `SELECT ... FOR UPDATE SKIP LOCKED` 租用工作单元，互不阻塞且不会重复抓取；
+租约带超时，worker 需定期心跳续约，过期租约会被其他 worker 自动回收。
+需要 MySQL 8.0+（SKIP LOCKED）。
+"""
+import pymysql
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def enqueue_page_ranges(db_conn: pymysql.connections.Connection, site_id: int, start_page: int, end_page: int,
+                        chunk_size: int = 10) -> int:
+    """
+    将 [start_page, end_page] 按 chunk_size 切分为页码区间工作单元入队，已存在的单元忽略
+    """
+    chunk_size = max(1, int(chunk_size))
+    rows = []
+    for s in range(int(start_page), int(end_page) + 1, chunk_size):
+        rows.append((site_id, 'pages', s, min(s + chunk_size - 1, int(end_page)), ''))
+    return _insert_units(db_conn, rows)
+
+
+def enqueue_torrent_ids(db_conn: pymysql.connections.Connection, site_id: int, torrent_ids: list) -> int:
+    """
+    将单个种子 id 作为工作单元入队，已存在的单元忽略
+    """
+    rows = [(site_id, 'torrent', 0, 0, str(tid)) for tid in torrent_ids]
+    return _insert_units(db_conn, rows)
+
+
+def _insert_units(db_conn, rows: list[tuple]) -> int:
+    if not rows:
+        return 0
+    cursor = db_conn.cursor()
+    cursor.executemany(
+        "INSERT IGNORE INTO crawl_work_units (site_id, unit_type, page_start, page_end, torrent_id) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        rows,
+    )
+    db_conn.commit()
+    return cursor.rowcount
+
+
+def lease_units(db_conn: pymysql.connections.Connection, worker_id: str, limit: int = 1,
+                lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> list[dict]:
+    """
+    租用最多 limit 个可用单元：待处理的，或租约已过期的（自动回收）。
+    被其他事务锁住的行直接跳过，因此多个 worker 并发租用时不会互相等待。
+    """
+    cursor = db_conn.cursor()
+    try:
+        cursor.execute(
+            """SELECT id FROM crawl_work_units
+               WHERE (status = 'pending' OR (status = 'leased' AND lease_expires_at < NOW()))
+                 AND attempts < %s
+               ORDER BY id
+               LIMIT %s
+               FOR UPDATE SKIP LOCKED""",
+            (max_attempts, limit),
+        )
+        ids = [row['id'] for row in cursor.fetchall()]
+        if not ids:
+            db_conn.commit()
+            return []
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(
+            f"""UPDATE crawl_work_units
+                SET status = 'leased', lease_owner = %s, attempts = attempts + 1,
+                    lease_expires_at = NOW() + INTERVAL %s SECOND, heartbeat_at = NOW()
+                WHERE id IN ({placeholders})""",
+            [worker_id, int(lease_seconds), *ids],
+        )
+        db_conn.commit()
+    except pymysql.err.Error:
+        db_conn.rollback()
+        raise
+    cursor.execute(f"SELECT * FROM crawl_work_units WHERE id IN ({placeholders}) ORDER BY id", ids)
+    return cursor.fetchall()
+
+
+def heartbeat(db_conn: pymysql.connections.Connection, unit_id: int, worker_id: str,
+              lease_seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+    """
+    续约；返回 False 表示租约已丢失（已过期并被其他 worker 回收）
+    """
+    cursor = db_conn.cursor()
+    cursor.execute(
+        """UPDATE crawl_work_units
+           SET lease_expires_at = NOW() + INTERVAL %s SECOND, heartbeat_at = NOW()
+           WHERE id = %s AND lease_owner = %s AND status = 'leased'""",
+        (int(lease_seconds), unit_id, worker_id),
+    )
+    db_conn.commit()
+    return cursor.rowcount > 0
+
+
+def holds_lease(db_conn: pymysql.connections.Connection, unit_id: int, worker_id: str) -> bool:
+    """
+    worker 是否仍持有未过期的租约。以 FOR UPDATE 锁住单元行直到调用方提交，
+    期间其他 worker 无法回收该单元，用于在同一事务中写入只属于持有者的数据（如检查点）
+    """
+    cursor = db_conn.cursor()
+    cursor.execute(
+        """SELECT id FROM crawl_work_units
+           WHERE id = %s AND lease_owner = %s AND status = 'leased' AND lease_expires_at > NOW()
+           FOR UPDATE""",
+        (unit_id, worker_id),
+    )
+    return cursor.fetchone() is not None
+
+
+def complete_unit(db_conn: pymysql.connections.Connection, unit_id: int, worker_id: str) -> bool:
+    cursor = db_conn.cursor()
+    cursor.execute(
+        """UPDATE crawl_work_units
+           SET status = 'done', lease_expires_at = NULL, last_error = NULL
+           WHERE id = %s AND lease_owner = %s""",
+        (unit_id, worker_id),
+    )
+    db_conn.commit()
+    return cursor.rowcount > 0
+
+
+def fail_unit(db_conn: pymysql.connections.Connection, unit_id: int, worker_id: str, error: str,
+              max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> bool:
+    """
+    标记失败：未达最大尝试次数时放回队列，否则置为 failed
+    """
+    cursor = db_conn.cursor()
+    cursor.execute(
+        """UPDATE crawl_work_units
+           SET status = IF(attempts >= %s, 'failed', 'pending'),
+               lease_owner = NULL, lease_expires_at = NULL, last_error = %s
+           WHERE id = %s AND lease_owner = %s""",
+        (max_attempts, (error or '')[:2000], unit_id, worker_id),
+    )
+    db_conn.commit()
+    return cursor.rowcount > 0
+
+
+def reclaim_expired_units(db_conn: pymysql.connections.Connection, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+    """
+    将租约过期的单元放回队列（超过最大尝试次数的置为 failed），返回受影响行数
+    """
+    cursor = db_conn.cursor()
+    cursor.execute(
+        """UPDATE crawl_work_units
+           SET status = IF(attempts >= %s, 'failed', 'pending'), lease_owner = NULL, lease_expires_at = NULL
+           WHERE status = 'leased' AND lease_expires_at < NOW()""",
+        (max_attempts,),
+    )
+    db_conn.commit()
+    return cursor.rowcount
+
+
+def queue_stats(db_conn: pymysql.connections.Connection) -> dict:
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT status, COUNT(*) AS n FROM crawl_work_units GROUP BY status")
+    return {row['status']: row['n'] for row in cursor.fetchall()}
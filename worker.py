@@ -0,0 +1,210 @@
+"""分布式抓取 worker：从 crawl_work_units 租用工作单元并执行抓取。
+
+用法：
+    python worker.py enqueue --site-id 1 --start-page 1 --end-page 500 --chunk-size 10
+    python worker.py enqueue --site-id 1 --torrent-ids 1001 1002
+    python worker.py run --worker-id w1
+    python worker.py stats
+可在多个容器/进程中同时运行 `run`，它们共享同一 MySQL 队列。
+"""
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import pymysql
+import pymysql.cursors
+
+from config_manager import get_database_config
+from crawler import build_site_opts, crawl
+from db_manager import ensure_schema, get_site
+from parser_utils import absolute_url
+from run_manager import RunControl
+import storage
+from tracing import get_logger, setup_logging
+from work_queue import (
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    complete_unit,
+    enqueue_page_ranges,
+    enqueue_torrent_ids,
+    fail_unit,
+    heartbeat,
+    holds_lease,
+    lease_units,
+    queue_stats,
+    reclaim_expired_units,
+)
+
+logger = get_logger('worker')
+
+
+def _connect(db_config: dict):
+    return storage.connect(db_config)
+
+
+class LeaseHeartbeat(threading.Thread):
+    """
+    后台续约线程：使用独立连接，每隔 lease_seconds/3 续约一次，直到 stop()。
+    租约丢失时置 lost 并取消 control，正在运行的抓取在下一个详情页前停止
+    """
+
+    def __init__(self, db_config: dict, unit_id: int, worker_id: str, lease_seconds: int,
+                 control: RunControl | None = None):
+        super().__init__(daemon=True, name=f'heartbeat-{unit_id}')
+        self.db_config = db_config
+        self.unit_id = unit_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.control = control
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        conn = _connect(self.db_config)
+        try:
+            while not self._stop_event.wait(interval):
+                try:
+                    if not heartbeat(conn, self.unit_id, self.worker_id, self.lease_seconds):
+                        self.lost = True
+                        if self.control is not None:
+                            self.control.cancel('租约已丢失')
+                        logger.warning('[worker %s] 单元 %s 租约已丢失', self.worker_id, self.unit_id)
+                        return
+                except pymysql.err.Error as e:
+                    logger.warning('[worker %s] 单元 %s 心跳失败: %s', self.worker_id, self.unit_id, e)
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def run_unit(unit: dict, site: dict, control: RunControl | None = None, stats: dict | None = None,
+             lease_seconds: int = DEFAULT_LEASE_SECONDS, worker_id: str | None = None) -> int:
+    """
+    执行单个工作单元：页码区间完整抓取（不因已存在链接提前停止），或抓取单个种子详情页。
+    stats 中的 status 为 crawl() 的结束状态，只有 'done' 表示单元完整处理；
+    给出 worker_id 时检查点只在仍持有租约时写入
+    """
+    opts = build_site_opts(site)
+    opts.stop_on_seen = False
+    opts.control = control
+    opts.stats = stats if stats is not None else {}
+    # 每个单元独立检查点：单元被回收后由新持有者从中断处继续
+    opts.run_key = f"unit:{unit['id']}"
+    # 租约过期即视为原持有者已退出，其检查点超过一个租约周期未更新时可直接接管
+    opts.checkpoint_stale_after = lease_seconds
+    if worker_id is not None:
+        # 租约被回收后不再写检查点，避免覆盖新持有者的进度
+        opts.checkpoint_guard = lambda conn: holds_lease(conn, unit['id'], worker_id)
+    if unit['unit_type'] == 'torrent':
+        opts.detail_urls = [absolute_url(site['base_url'], f"details.php?id={unit['torrent_id']}")]
+    else:
+        opts.start_page = int(unit['page_start'])
+        opts.end_page = int(unit['page_end'])
+    return asyncio.run(crawl(opts))
+
+
+def worker_loop(worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                idle_sleep: float = 10.0, exit_when_idle: bool = False) -> int:
+    db_config = get_database_config()
+    ensure_schema(db_config)
+    conn = _connect(db_config)
+    processed = 0
+    try:
+        while True:
+            reclaim_expired_units(conn, max_attempts)
+            units = lease_units(conn, worker_id, 1, lease_seconds, max_attempts)
+            if not units:
+                if exit_when_idle:
+                    break
+                time.sleep(idle_sleep)
+                continue
+            unit = units[0]
+            site = get_site(conn, unit['site_id'])
+            if not site:
+                fail_unit(conn, unit['id'], worker_id, f"site {unit['site_id']} not found", max_attempts=0)
+                continue
+            logger.info('[worker %s] 租用单元 %s (%s %s-%s %s) 站点 %s', worker_id, unit['id'], unit['unit_type'],
+                        unit['page_start'], unit['page_end'], unit['torrent_id'], site.get('name'))
+            control = RunControl()
+            stats = {}
+            hb = LeaseHeartbeat(db_config, unit['id'], worker_id, lease_seconds, control)
+            hb.start()
+            try:
+                created = run_unit(unit, site, control, stats, lease_seconds, worker_id)
+            except Exception as e:
+                hb.stop()
+                fail_unit(conn, unit['id'], worker_id, str(e), max_attempts)
+                logger.error('[worker %s] 单元 %s 失败: %s', worker_id, unit['id'], e)
+                continue
+            hb.stop()
+            if hb.lost:
+                logger.warning('[worker %s] 单元 %s 租约已被回收，停止抓取，结果以新持有者为准', worker_id, unit['id'])
+                continue
+            status = stats.get('status')
+            if status != 'done':
+                # 列表页请求失败等中断：检查点保留，单元放回队列由下次租用从断点继续
+                fail_unit(conn, unit['id'], worker_id, f'crawl {status}', max_attempts)
+                logger.warning('[worker %s] 单元 %s 未完成（%s），放回队列', worker_id, unit['id'], status)
+                continue
+            if complete_unit(conn, unit['id'], worker_id):
+                processed += 1
+                logger.info('[worker %s] 单元 %s 完成，新增 %d 个种子', worker_id, unit['id'], created)
+            else:
+                logger.warning('[worker %s] 单元 %s 完成但租约已被回收，结果以新持有者为准', worker_id, unit['id'])
+    finally:
+        conn.close()
+    return processed
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='分布式抓取 worker')
+    sub = p.add_subparsers(dest='cmd', required=True)
+
+    pe = sub.add_parser('enqueue', help='向队列添加工作单元')
+    pe.add_argument('--site-id', type=int, required=True)
+    pe.add_argument('--start-page', type=int)
+    pe.add_argument('--end-page', type=int)
+    pe.add_argument('--chunk-size', type=int, default=10)
+    pe.add_argument('--torrent-ids', nargs='*', default=[])
+
+    pr = sub.add_parser('run', help='运行 worker')
+    pr.add_argument('--worker-id', default=f'{socket.gethostname()}-{os.getpid()}')
+    pr.add_argument('--lease-seconds', type=int, default=DEFAULT_LEASE_SECONDS)
+    pr.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS)
+    pr.add_argument('--idle-sleep', type=float, default=10.0)
+    pr.add_argument('--exit-when-idle', action='store_true', help='队列为空时退出')
+
+    sub.add_parser('stats', help='查看队列状态')
+
+    args = p.parse_args(argv)
+    setup_logging()
+    if args.cmd == 'run':
+        worker_loop(args.worker_id, args.lease_seconds, args.max_attempts, args.idle_sleep, args.exit_when_idle)
+        return 0
+
+    db_config = get_database_config()
+    ensure_schema(db_config)
+    conn = _connect(db_config)
+    try:
+        if args.cmd == 'enqueue':
+            added = 0
+            if args.start_page is not None and args.end_page is not None:
+                added += enqueue_page_ranges(conn, args.site_id, args.start_page, args.end_page, args.chunk_size)
+            if args.torrent_ids:
+                added += enqueue_torrent_ids(conn, args.site_id, args.torrent_ids)
+            print(f'入队 {added} 个工作单元')
+        else:
+            print(queue_stats(conn))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())